@@ -0,0 +1,70 @@
+import numpy as np
+from lsst.afw.cameraGeom import FIELD_ANGLE, FOCAL_PLANE, PIXELS
+from lsst.sims.coordUtils.CameraUtils import getDetectorNameTable
+from lsst.sims.coordUtils.DistortionSurrogateUtils import ChebyshevTransformSurrogate
+from lsst.sims.coordUtils.DetectorAffineTableUtils import DetectorAffineTable
+from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+from lsst.sims.coordUtils.CompiledCameraUtils import _compiled_camera_version
+
+__all__ = ["compileCamera"]
+
+
+def compileCamera(camera, file_name, tolerance_pixels=1.0e-4):
+    """
+    Compile the geometry of a camera into a .npz file that can be loaded
+    as a CompiledCamera without afw or the camera's obs package.
+
+    The file holds the detector names, types, bounding boxes, pixel sizes,
+    orientations, centers (as given by afw) and FOCAL_PLANE corners (see
+    CameraGeometryTable), the affine FOCAL_PLANE<->PIXELS matrices of every
+    detector (see DetectorAffineTable) and Chebyshev fits to the
+    FIELD_ANGLE<->FOCAL_PLANE distortion (see ChebyshevTransformSurrogate).
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [in] file_name is the name of the .npz file to write
+
+    @param [in] tolerance_pixels is the largest error (in pixels) allowed
+    for the distortion fits at the points where they are checked (default
+    1.0e-4); the bound is empirical (see ChebyshevTransformSurrogate)
+    """
+    names = getDetectorNameTable(camera)
+
+    affine_table = DetectorAffineTable(camera, pixelType=PIXELS)
+    if not affine_table.is_affine.all():
+        raise RuntimeError("Cannot compile camera %s; the PIXELS transforms of these "
+                           "detectors are not affine: %s"
+                           % (camera.getName(), str(list(names[~affine_table.is_affine]))))
+
+    surrogates = {}
+    for fromSys, toSys, label in ((FIELD_ANGLE, FOCAL_PLANE, 'field_to_focal'),
+                                  (FOCAL_PLANE, FIELD_ANGLE, 'focal_to_field')):
+        surrogate = ChebyshevTransformSurrogate(camera, fromSys, toSys,
+                                                tolerance_pixels=tolerance_pixels)
+        if not surrogate.converged:
+            raise RuntimeError("Cannot compile camera %s; the %s distortion could only "
+                               "be fit to %.3e pixels" % (camera.getName(), label,
+                                                          surrogate.max_residual_pixels))
+        surrogates[label] = surrogate
+
+    geometry = getCameraGeometryTable(camera)
+
+    np.savez(file_name,
+             version=np.array(_compiled_camera_version),
+             camera_name=np.array(camera.getName()),
+             names=names,
+             det_ids=geometry.ids,
+             det_types=geometry.det_types,
+             bbox=geometry.bbox,
+             pixel_size=geometry.pixel_size,
+             corners=geometry.corners_mm,
+             orientation=geometry.orientation,
+             center_mm=geometry.center_mm,
+             center_pix=geometry.center_pix,
+             affine_forward=affine_table.forward,
+             affine_inverse=affine_table.inverse,
+             field_to_focal_coeffs=np.array(surrogates['field_to_focal']._coeffs),
+             field_radius=np.array(surrogates['field_to_focal'].radius),
+             focal_to_field_coeffs=np.array(surrogates['focal_to_field']._coeffs),
+             focal_radius=np.array(surrogates['focal_to_field'].radius),
+             tolerance_pixels=np.array(tolerance_pixels))
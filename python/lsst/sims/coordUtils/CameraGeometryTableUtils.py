@@ -0,0 +1,168 @@
+import numpy as np
+from lsst.sims.coordUtils.CameraTransformCacheUtils import getCameraTransformCache
+from lsst.sims.coordUtils.CameraUtils import getDetectorNameTable
+from lsst.sims.coordUtils.CompiledCameraUtils import CompiledCamera
+
+__all__ = ["CameraGeometryTable", "getCameraGeometryTable"]
+
+
+class CameraGeometryTable(object):
+    """
+    A read-only columnar table of the geometry of every detector in a
+    camera, built from afw in a single pass.  Rows are ordered as in
+    getDetectorNameTable(camera), so a detector index selects the same
+    row of every column and queries over many detectors are array
+    operations rather than loops over afw detectors.
+    """
+
+    def __init__(self, camera):
+        """
+        @param [in] camera is an afwCameraGeom camera object or a CompiledCamera
+        """
+        # a CompiledCamera already holds these columns
+        if isinstance(camera, CompiledCamera):
+            self._fromCompiledCamera(camera)
+        else:
+            self._fromAfwCamera(camera)
+
+        for column in (self._ids, self._det_types, self._bbox, self._center_mm,
+                       self._center_pix, self._corners_mm, self._orientation,
+                       self._pixel_size):
+            column.setflags(write=False)
+
+    def _fromAfwCamera(self, camera):
+        # imported here so that a CompiledCamera can be used without afw
+        from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS
+
+        self._names = getDetectorNameTable(camera)
+        n_det = len(self._names)
+
+        self._ids = np.zeros(n_det, dtype=np.int64)
+        self._det_types = np.zeros(n_det, dtype=np.int32)
+        self._bbox = np.zeros((n_det, 4), dtype=np.int64)
+        self._center_mm = np.zeros((n_det, 2), dtype=float)
+        self._center_pix = np.zeros((n_det, 2), dtype=float)
+        self._corners_mm = np.zeros((n_det, 4, 2), dtype=float)
+        self._orientation = np.zeros((n_det, 3), dtype=float)
+        self._pixel_size = np.zeros((n_det, 2), dtype=float)
+
+        for i_det, name in enumerate(self._names):
+            det = camera[name]
+            self._ids[i_det] = det.getId()
+            self._det_types[i_det] = int(det.getType())
+
+            bbox = det.getBBox()
+            self._bbox[i_det] = (bbox.getMinX(), bbox.getMinY(), bbox.getMaxX(), bbox.getMaxY())
+
+            center = det.getCenter(FOCAL_PLANE)
+            center_pix = det.getTransform(FOCAL_PLANE, PIXELS).applyForward(center)
+            self._center_mm[i_det] = (center.getX(), center.getY())
+            self._center_pix[i_det] = (center_pix.getX(), center_pix.getY())
+
+            self._corners_mm[i_det] = [(cc.getX(), cc.getY())
+                                       for cc in det.getCorners(FOCAL_PLANE)]
+
+            orientation = det.getOrientation()
+            self._orientation[i_det] = (orientation.getYaw().asRadians(),
+                                        orientation.getPitch().asRadians(),
+                                        orientation.getRoll().asRadians())
+
+            self._pixel_size[i_det] = (det.getPixelSize().getX(), det.getPixelSize().getY())
+
+    def _fromCompiledCamera(self, camera):
+        self._names = camera._names
+        self._ids = camera._det_ids.astype(np.int64)
+        self._det_types = camera._det_types.astype(np.int32)
+        self._bbox = camera._bbox.astype(np.int64)
+        self._center_mm = camera._center_mm.copy()
+        self._center_pix = camera._center_pix.copy()
+        self._corners_mm = camera._corners.astype(float)
+        self._orientation = camera._orientation.astype(float)
+        self._pixel_size = camera._pixel_size.astype(float)
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def names(self):
+        """
+        The detector names corresponding to the rows of the table
+        """
+        return self._names
+
+    @property
+    def ids(self):
+        """
+        A read-only int64 numpy array of the detectors' afw IDs
+        """
+        return self._ids
+
+    @property
+    def det_types(self):
+        """
+        A read-only int32 numpy array of the detectors' types, as the
+        integer values of lsst.afw.cameraGeom.DetectorType
+        """
+        return self._det_types
+
+    @property
+    def bbox(self):
+        """
+        A read-only (n_detectors, 4) int64 numpy array of the (xmin, ymin,
+        xmax, ymax) bounds of the detectors in pixels (inclusive, as in
+        afw's Box2I)
+        """
+        return self._bbox
+
+    @property
+    def center_mm(self):
+        """
+        A read-only (n_detectors, 2) numpy array of the FOCAL_PLANE (x, y)
+        of the detectors' centers in mm
+        """
+        return self._center_mm
+
+    @property
+    def center_pix(self):
+        """
+        A read-only (n_detectors, 2) numpy array of the PIXELS (x, y)
+        of the detectors' centers
+        """
+        return self._center_pix
+
+    @property
+    def corners_mm(self):
+        """
+        A read-only (n_detectors, 4, 2) numpy array of the FOCAL_PLANE (x, y)
+        of the detectors' corners in mm, in the order returned by afw
+        """
+        return self._corners_mm
+
+    @property
+    def orientation(self):
+        """
+        A read-only (n_detectors, 3) numpy array of the yaw, pitch and roll
+        of the detectors in radians
+        """
+        return self._orientation
+
+    @property
+    def pixel_size(self):
+        """
+        A read-only (n_detectors, 2) numpy array of the (x, y) size of
+        the detectors' pixels in mm
+        """
+        return self._pixel_size
+
+
+def getCameraGeometryTable(camera):
+    """
+    Return the CameraGeometryTable for a camera, building it on first use.
+    Tables are cached in the CameraTransformCache.
+
+    @param [in] camera is an afwCameraGeom camera object
+    """
+    def factory():
+        return CameraGeometryTable(camera)
+
+    return getCameraTransformCache().get(camera, 'camera_geometry_table', factory)
@@ -0,0 +1,298 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+__all__ = ["CameraTransformCache", "getCameraTransformCache"]
+
+
+# the names (as returned by getSysName()) of the afw camera coordinate
+# systems used by lsst.sims.coordUtils.  Transforms can be requested with
+# either these names or the afw objects; the methods in lsst.sims.coordUtils
+# use the names, so that they do not import afw unless the camera is an
+# afw camera (a CompiledCamera takes the names directly).
+_field_angle_sys = 'FieldAngle'
+_focal_plane_sys = 'FocalPlane'
+_pixels_sys = 'Pixels'
+_tan_pixels_sys = 'TanPixels'
+
+
+def _sysName(cameraSys):
+    """
+    Return the name of a camera system, so that names, afw CameraSys and
+    CameraSysPrefix (e.g. PIXELS and a detector's own PIXELS) all compare equal
+    """
+    if isinstance(cameraSys, str):
+        return cameraSys
+    return cameraSys.getSysName()
+
+
+def _afwCameraSys(cameraSys):
+    """
+    Return the afw camera system (or system prefix) named by cameraSys;
+    afw objects are passed through
+    """
+    if not isinstance(cameraSys, str):
+        return cameraSys
+    import lsst.afw.cameraGeom as cameraGeom
+    afw_sys = {_field_angle_sys: cameraGeom.FIELD_ANGLE,
+               _focal_plane_sys: cameraGeom.FOCAL_PLANE,
+               _pixels_sys: cameraGeom.PIXELS,
+               _tan_pixels_sys: cameraGeom.TAN_PIXELS}
+    if cameraSys not in afw_sys:
+        raise RuntimeError("Unknown camera system %s" % cameraSys)
+    return afw_sys[cameraSys]
+
+
+class _CameraEntries(object):
+    """
+    The cached values of one camera, in least recently used order, along
+    with a reference to that camera (a weakref where the camera supports one).
+
+    When the camera is garbage collected, the weakref callback only marks
+    the entries as dead; the cache drops them the next time it holds its
+    lock, so that the callback (which can run in any thread, at any point
+    where a reference is released) never has to take the lock.
+    """
+
+    def __init__(self, camera):
+        self.dead = False
+
+        def on_collect(ref, entries=self):
+            entries.dead = True
+
+        try:
+            self.ref = weakref.ref(camera, on_collect)
+        except TypeError:
+            self.ref = lambda: camera
+        self.values = OrderedDict()
+
+
+class CameraTransformCache(object):
+    """
+    A thread-safe cache of the afw Transforms (and other quantities derived
+    from a camera) used by the methods in CameraUtils.
+
+    Entries are keyed on the camera instance and an arbitrary hashable key
+    (for transforms: the detector name and the pair of coordinate systems).
+    Every camera gets its own dict of entries.  The cache is bounded
+    twice: when it holds more than maxcameras cameras, every entry of the
+    least recently used camera is evicted, and when one camera has more
+    than maxentries entries, its least recently used entry is evicted.
+    The default maxentries comfortably holds every detector transform
+    and derived table of the LSST camera.
+
+    Cameras are held through weak references, so a camera that is no
+    longer used elsewhere is garbage collected and its entries dropped
+    (at the next use of the cache), rather than when it is evicted.
+    """
+
+    def __init__(self, maxcameras=4, maxentries=4096):
+        """
+        @param [in] maxcameras is the maximum number of cameras whose
+        entries the cache will hold before evicting the least recently
+        used camera
+
+        @param [in] maxentries is the maximum number of entries held for
+        any one camera before evicting its least recently used entry
+        """
+        self._checkSize(maxcameras, maxentries)
+        self._maxcameras = maxcameras
+        self._maxentries = maxentries
+        self._lock = threading.RLock()
+        self._cameras = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._entry_evictions = 0
+
+    @staticmethod
+    def _checkSize(maxcameras, maxentries):
+        if maxcameras < 1:
+            raise RuntimeError("CameraTransformCache needs maxcameras >= 1; "
+                               "you gave %d" % maxcameras)
+        if maxentries < 1:
+            raise RuntimeError("CameraTransformCache needs maxentries >= 1; "
+                               "you gave %d" % maxentries)
+
+    @property
+    def maxcameras(self):
+        return self._maxcameras
+
+    @property
+    def maxentries(self):
+        return self._maxentries
+
+    def resize(self, maxcameras, maxentries=None):
+        """
+        Change the maximum number of cameras held by the cache (and,
+        if maxentries is not None, the maximum number of entries held
+        for each camera), evicting least recently used cameras and
+        entries if necessary.
+        """
+        if maxentries is None:
+            maxentries = self._maxentries
+        self._checkSize(maxcameras, maxentries)
+        with self._lock:
+            self._maxcameras = maxcameras
+            self._maxentries = maxentries
+            self._evict()
+            for entries in self._cameras.values():
+                self._evictEntries(entries)
+
+    def _evict(self):
+        while len(self._cameras) > self._maxcameras:
+            self._cameras.popitem(last=False)
+            self._evictions += 1
+
+    def _evictEntries(self, entries):
+        while len(entries.values) > self._maxentries:
+            entries.values.popitem(last=False)
+            self._entry_evictions += 1
+
+    def _prune(self):
+        """
+        Drop the entries of garbage collected cameras.  Must be called
+        while holding the lock.
+        """
+        dead = [cam_id for cam_id, entries in self._cameras.items() if entries.dead]
+        for cam_id in dead:
+            del self._cameras[cam_id]
+
+    def _entries(self, camera):
+        """
+        Return the _CameraEntries of camera, creating them if necessary,
+        and mark the camera as the most recently used.  Must be called
+        while holding the lock.
+        """
+        self._prune()
+        cam_id = id(camera)
+        entries = self._cameras.get(cam_id, None)
+        if entries is not None and entries.ref() is not camera:
+            # a collected camera whose id() has been re-used
+            entries = None
+        if entries is None:
+            entries = _CameraEntries(camera)
+            self._cameras[cam_id] = entries
+        self._cameras.move_to_end(cam_id)
+        return entries
+
+    def get(self, camera, key, factory):
+        """
+        Return the value cached for (camera, key), calling factory()
+        to build (and cache) it if it is not present.
+
+        factory is called without holding the cache's lock, so
+        that slow builds in one thread do not block lookups in
+        other threads.  If two threads miss on the same key at
+        the same time, both will build the value and the last
+        one to finish will be cached.
+        """
+        with self._lock:
+            values = self._entries(camera).values
+            if key in values:
+                self._hits += 1
+                values.move_to_end(key)
+                return values[key]
+            self._misses += 1
+
+        value = factory()
+
+        with self._lock:
+            entries = self._entries(camera)
+            entries.values[key] = value
+            entries.values.move_to_end(key)
+            self._evictEntries(entries)
+            self._evict()
+        return value
+
+    def getTransform(self, camera, fromSys, toSys, detectorName=None):
+        """
+        Return the afw Transform between two coordinate systems
+
+        @param [in] camera is an afwCameraGeom camera object
+
+        @param [in] fromSys is the coordinate system (or system prefix)
+        being transformed from, or its name
+
+        @param [in] toSys is the coordinate system (or system prefix)
+        being transformed to, or its name
+
+        @param [in] detectorName is the name of the detector whose
+        transform is wanted.  If None (default), the transform is taken
+        from the camera's TransformMap.
+
+        @param [out] a TransformPoint2ToPoint2
+        """
+        key = ('transform', detectorName, _sysName(fromSys), _sysName(toSys))
+
+        def factory():
+            from lsst.sims.coordUtils.CompiledCameraUtils import CompiledCamera
+            if isinstance(camera, CompiledCamera):
+                from_sys, to_sys = fromSys, toSys
+            else:
+                from_sys, to_sys = _afwCameraSys(fromSys), _afwCameraSys(toSys)
+            if detectorName is None:
+                return camera.getTransformMap().getTransform(from_sys, to_sys)
+            return camera[detectorName].getTransform(from_sys, to_sys)
+
+        return self.get(camera, key, factory)
+
+    def invalidate(self, camera=None):
+        """
+        Drop cached entries.
+
+        @param [in] camera is the camera whose entries should be
+        dropped.  If None (default), every entry is dropped.
+        """
+        with self._lock:
+            if camera is None:
+                self._cameras.clear()
+                return
+            entries = self._cameras.get(id(camera), None)
+            if entries is not None and entries.ref() is camera:
+                del self._cameras[id(camera)]
+
+    def stats(self):
+        """
+        Return a dict containing the number of hits, misses, camera
+        evictions and entry evictions since the statistics were last reset,
+        as well as the current number of entries and cameras and the
+        maximum numbers of cameras and of entries per camera held by the
+        cache.
+        """
+        with self._lock:
+            self._prune()
+            return {'hits': self._hits,
+                    'misses': self._misses,
+                    'evictions': self._evictions,
+                    'entry_evictions': self._entry_evictions,
+                    'size': len(self),
+                    'cameras': len(self._cameras),
+                    'maxcameras': self._maxcameras,
+                    'maxentries': self._maxentries}
+
+    def resetStats(self):
+        """
+        Set the hit, miss and eviction counters back to zero
+        """
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._entry_evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            self._prune()
+            return sum(len(entries.values) for entries in self._cameras.values())
+
+
+_camera_transform_cache = CameraTransformCache()
+
+
+def getCameraTransformCache():
+    """
+    Return the process-wide CameraTransformCache shared by the methods
+    in lsst.sims.coordUtils
+    """
+    return _camera_transform_cache
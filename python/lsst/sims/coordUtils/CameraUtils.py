@@ -1,27 +1,195 @@
 from builtins import zip
+import numbers
 import numpy as np
 import warnings
-import lsst.geom as geom
-from lsst.afw.cameraGeom import FIELD_ANGLE, PIXELS, TAN_PIXELS, FOCAL_PLANE
-from lsst.sims.utils.CodeUtilities import _validate_inputs
-from lsst.sims.utils import _pupilCoordsFromRaDec, _raDecFromPupilCoords
-from lsst.sims.utils import radiansFromArcsec
+from lsst.sims.coordUtils.CameraTransformCacheUtils import getCameraTransformCache, _sysName
+
+# the camera systems are referred to by name, so that these methods only
+# import afw when they are given an afw camera (see CameraTransformCache);
+# a CompiledCamera is used without afw
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _field_angle_sys as FIELD_ANGLE
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _focal_plane_sys as FOCAL_PLANE
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _pixels_sys as PIXELS
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _tan_pixels_sys as TAN_PIXELS
 
 __all__ = ["MultipleChipWarning", "getCornerPixels", "_getCornerRaDec", "getCornerRaDec",
            "chipNameFromPupilCoords", "chipNameFromRaDec", "_chipNameFromRaDec",
+           "detectorIndicesFromPupilCoords", "detectorIndicesFromRaDec", "_detectorIndicesFromRaDec",
            "pixelCoordsFromPupilCoords", "pixelCoordsFromRaDec", "_pixelCoordsFromRaDec",
            "focalPlaneCoordsFromPupilCoords", "focalPlaneCoordsFromRaDec", "_focalPlaneCoordsFromRaDec",
            "pupilCoordsFromPixelCoords", "pupilCoordsFromFocalPlaneCoords",
            "raDecFromPixelCoords", "_raDecFromPixelCoords",
-           "_validate_inputs_and_chipname"]
+           "projectFromRaDec", "_projectFromRaDec", "projectFromPupilCoords",
+           "_validate_inputs_and_chipname", "getDetectorNameTable"]
+
+
+# lsst.sims.utils is slow to import, so it is only imported when one of
+# these functions is first called; _simsUtils() then keeps the module in
+# _sims_utils so later calls do not go through the import machinery
+_sims_utils = None
+
+
+def _simsUtils():
+    global _sims_utils
+    if _sims_utils is None:
+        import lsst.sims.utils.CodeUtilities
+        _sims_utils = lsst.sims.utils
+    return _sims_utils
+
+
+def _validate_inputs(input_list, input_names, method_name):
+    return _simsUtils().CodeUtilities._validate_inputs(input_list, input_names, method_name)
+
+
+def _pupilCoordsFromRaDec(*args, **kwargs):
+    return _simsUtils()._pupilCoordsFromRaDec(*args, **kwargs)
+
+
+def _raDecFromPupilCoords(*args, **kwargs):
+    return _simsUtils()._raDecFromPupilCoords(*args, **kwargs)
+
+
+def radiansFromArcsec(value):
+    return _simsUtils().radiansFromArcsec(value)
+
+
+def _observationMetaDataClass():
+    return _simsUtils().ObservationMetaData
 
 
 class MultipleChipWarning(Warning):
     """
     A sub-class of Warning emitted when we try to detect the chip that an object falls on and
     multiple chips are returned.
+
+    One warning is emitted per call; its indices attribute is a numpy array of
+    the indices of all of the offending objects.
+    """
+
+    def __init__(self, message, indices=None, point_label=None):
+        super(MultipleChipWarning, self).__init__(message)
+        self.indices = indices
+        self.point_label = point_label
+
+    @classmethod
+    def fromIndices(cls, indices, point_label):
+        """
+        Build the warning reporting the objects at indices
+
+        @param [in] indices is a numpy array of the indices of the objects
+        that landed on more than one chip
+
+        @param [in] point_label names the coordinates in which the objects
+        were given (e.g. 'pupil coordinate')
+        """
+        index_str = str(indices[:20].tolist())
+        if len(indices) > 20:
+            index_str += ' ...'
+        message = ("%d objects have landed on multiple chips.  " % len(indices) +
+                   "You asked for this not to happen.\n" +
+                   "We will return only the first chip name for each.  If you want all " +
+                   "of them, try re-running with the kwarg allow_multiple_chips=True, " +
+                   "or use detectorIndicesFromPupilCoords.\n" +
+                   "Offending %s points were %s\n" % (point_label, index_str))
+        return cls(message, indices=indices, point_label=point_label)
+
+
+def getDetectorNameTable(camera):
+    """
+    Return the table that maps integer detector indices onto detector names.
+
+    Methods called with as_detector_index=True (e.g. chipNameFromPupilCoords)
+    return indices into this table (-1 meaning that the point did not land
+    on a detector).  The table is built once per camera and is read-only.
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [out] a numpy array of detector names ordered as the detectors
+    are iterated over in camera
+    """
+    def factory():
+        names = np.array([det.getName() for det in camera])
+        names.setflags(write=False)
+        return names
+
+    return getCameraTransformCache().get(camera, 'detector_name_table', factory)
+
+
+def _sortedDetectorNameTable(camera):
+    """
+    Return the detector name table sorted alphabetically, along with the
+    detector indices corresponding to each sorted name
+    """
+    def factory():
+        names = getDetectorNameTable(camera)
+        sorted_dex = np.argsort(names)
+        return names[sorted_dex], sorted_dex.astype(np.int16)
+
+    return getCameraTransformCache().get(camera, 'sorted_detector_name_table', factory)
+
+
+def _isDetectorIndex(chip_name):
+    """
+    Return True if chip_name is an integer detector index (or a numpy array
+    of them) rather than a detector name
+    """
+    if isinstance(chip_name, np.ndarray):
+        return np.issubdtype(chip_name.dtype, np.integer)
+    return isinstance(chip_name, numbers.Integral) and not isinstance(chip_name, bool)
+
+
+def _detectorIndexFromChipName(chip_name, camera):
     """
-    pass
+    Convert chip names into indices in getDetectorNameTable(camera)
+
+    @param [in] chip_name is a numpy array or list of chip names (None
+    or 'None' meaning no chip) or a numpy array of detector indices
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [out] an int16 numpy array of detector indices; -1 denotes no chip
+    """
+    if _isDetectorIndex(chip_name):
+        n_det = len(getDetectorNameTable(camera))
+        codes = np.asarray(chip_name).astype(np.int16, copy=False)
+        if len(codes) > 0 and (codes.min() < -1 or codes.max() >= n_det):
+            raise RuntimeError("Detector indices must be between -1 and %d" % (n_det-1))
+        return codes
+
+    names = np.asarray(chip_name).astype(str)
+    if len(names) == 0:
+        return np.zeros(0, dtype=np.int16)
+
+    sorted_names, sorted_codes = _sortedDetectorNameTable(camera)
+    pos = np.searchsorted(sorted_names, names)
+    pos[pos >= len(sorted_names)] = len(sorted_names)-1
+    found = (sorted_names[pos] == names)
+    unknown = np.logical_and(np.logical_not(found), names != 'None')
+    if unknown.any():
+        raise RuntimeError("Unknown chip names: %s" % str(np.unique(names[unknown])))
+
+    return np.where(found, sorted_codes[pos], -1).astype(np.int16)
+
+
+def _chipNameFromDetectorIndex(codes, camera):
+    """
+    Convert detector indices into chip names
+
+    @param [in] codes is a numpy array of indices into
+    getDetectorNameTable(camera); -1 denotes no chip
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [out] a numpy array of chip names (None where codes is -1)
+    """
+    name_table = getDetectorNameTable(camera)
+    codes = np.asarray(codes)
+    on_chip = codes >= 0
+    if on_chip.all():
+        return name_table[codes]
+    names = np.empty(len(codes), dtype=object)
+    names[on_chip] = name_table[codes[on_chip]]
+    return names
 
 
 def _validate_inputs_and_chipname(input_list, input_names, method_name,
@@ -54,6 +222,11 @@ def _validate_inputs_and_chipname(input_list, input_names, method_name,
     is a numpy array and a re-casting of chip_name as a list
     of length equal to input_list[0] (unless chip_name is None;
     then it will leave chip_name untouched)
+
+    If chip_name is an integer detector index (see getDetectorNameTable)
+    or a numpy array of them, it is returned as an int16 numpy array of
+    length equal to input_list[0]; a single index is broadcast without
+    being copied.
     """
 
     are_arrays = _validate_inputs(input_list, input_names, method_name)
@@ -66,6 +239,15 @@ def _validate_inputs_and_chipname(input_list, input_names, method_name,
     else:
         n_pts = 1
 
+    if _isDetectorIndex(chip_name):
+        codes = np.atleast_1d(chip_name).astype(np.int16, copy=False)
+        if len(codes) > 1 and len(codes) != n_pts:
+            raise RuntimeError("You passed %d chipNames to %s.\n" % (len(codes), method_name) +
+                               "You passed %d %s values." % (n_pts, input_names[0]))
+        if len(codes) == 1 and n_pts != 1:
+            codes = np.broadcast_to(codes, (n_pts,))
+        return are_arrays, codes
+
     if isinstance(chip_name, list) or isinstance(chip_name, np.ndarray):
         if len(chip_name) > 1 and len(chip_name) != n_pts:
             raise RuntimeError("You passed %d chipNames to %s.\n" % (len(chip_name), method_name) +
@@ -84,11 +266,171 @@ def _validate_inputs_and_chipname(input_list, input_names, method_name,
         return are_arrays, [chip_name]*n_pts
 
 
+def _unmaskArrays(input_list):
+    """
+    Replace numpy masked arrays by float arrays holding NaN in place of
+    their masked elements, so that masked rows are treated as invalid.
+    Other inputs are returned untouched.
+    """
+    return [np.ma.filled(np.ma.asarray(arr, dtype=float), np.NaN)
+            if np.ma.isMaskedArray(arr) else arr
+            for arr in input_list]
+
+
+def _validRowMask(input_list):
+    """
+    Return a boolean numpy array that is True for the rows in which
+    every array in input_list is finite
+    """
+    valid = np.ones(len(input_list[0]), dtype=bool)
+    for arr in input_list:
+        valid &= np.isfinite(arr)
+    return valid
+
+
+def _validRaDecRows(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None):
+    """
+    Find the rows of a catalog that can be projected: those in which RA, Dec
+    and any of pm_ra, pm_dec, parallax and v_rad given as arrays are finite
+    and not masked.
+
+    @param [out] a numpy array of the indices of the valid rows, or None if
+    every row is valid
+
+    @param [out] a list of ra, dec, pm_ra, pm_dec, parallax, v_rad restricted
+    to the valid rows (masked arrays are converted to plain arrays; scalars
+    and Nones are untouched)
+    """
+    inputs = _unmaskArrays([ra, dec, pm_ra, pm_dec, parallax, v_rad])
+    is_array = [isinstance(arr, np.ndarray) and arr.ndim > 0 for arr in inputs]
+    valid = _validRowMask([arr for arr, flag in zip(inputs, is_array) if flag])
+    if valid.all():
+        return None, inputs
+
+    rows = np.where(valid)[0]
+    return rows, [arr[rows] if flag else arr for arr, flag in zip(inputs, is_array)]
+
+
+def _pupilCoordsFromValidRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                               obs_metadata=None, epoch=2000.0):
+    """
+    Call _pupilCoordsFromRaDec on only the valid rows of a catalog (see
+    _validRaDecRows); the pupil coordinates of the other rows are NaN.
+    Scalar inputs are passed straight through.
+    """
+    if not isinstance(ra, np.ndarray):
+        return _pupilCoordsFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                     parallax=parallax, v_rad=v_rad,
+                                     obs_metadata=obs_metadata, epoch=epoch)
+
+    rows, valid_inputs = _validRaDecRows(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                         parallax=parallax, v_rad=v_rad)
+    if rows is None:
+        return _pupilCoordsFromRaDec(*valid_inputs[:2], pm_ra=valid_inputs[2],
+                                     pm_dec=valid_inputs[3], parallax=valid_inputs[4],
+                                     v_rad=valid_inputs[5],
+                                     obs_metadata=obs_metadata, epoch=epoch)
+
+    pupil = np.full((2, len(ra)), np.NaN, dtype=float)
+    if len(rows) > 0:
+        valid_pupil = _pupilCoordsFromRaDec(*valid_inputs[:2], pm_ra=valid_inputs[2],
+                                            pm_dec=valid_inputs[3], parallax=valid_inputs[4],
+                                            v_rad=valid_inputs[5],
+                                            obs_metadata=obs_metadata, epoch=epoch)
+        pupil[:, rows] = valid_pupil
+    return pupil
+
+
+def _transformArrays(transform, xIn, yIn):
+    """
+    Apply an afw Transform to arrays of coordinates without boxing each
+    point into a geom.Point2D.  Only finite points are sent through the
+    transform; the outputs of the others are NaN.
+
+    @param [in] transform is an afw TransformPoint2ToPoint2
+
+    @param [in] xIn is a numpy array of input x coordinates
+
+    @param [in] yIn is a numpy array of input y coordinates
+
+    @param [out] a 2-D numpy array in which the first row is the output
+    x coordinate and the second row is the output y coordinate
+    """
+    n_pts = len(xIn)
+    if n_pts == 0:
+        return np.zeros((2, 0), dtype=float)
+
+    valid = _validRowMask([xIn, yIn])
+    if not valid.all():
+        rows = np.where(valid)[0]
+        output = np.full((2, n_pts), np.NaN, dtype=float)
+        if len(rows) > 0:
+            output[:, rows] = _transformArrays(transform, xIn[rows], yIn[rows])
+        return output
+
+    # the AST mapping underlying the Transform accepts a contiguous
+    # (nAxes, nPoints) buffer of doubles directly
+    xy_in = np.empty((2, n_pts), dtype=float)
+    xy_in[0] = xIn
+    xy_in[1] = yIn
+    return transform.getMapping().applyForward(xy_in)
+
+
+def _surrogateTransformArrays(camera, fromSys, toSys, xIn, yIn, tolerance_pixels):
+    """
+    Transform arrays of coordinates between FIELD_ANGLE and FOCAL_PLANE
+    using the camera's ChebyshevTransformSurrogate (fit on first use and
+    cached).  Points outside of the region over which the surrogate was
+    fit, or all points if the surrogate could not meet tolerance_pixels,
+    are transformed with the exact afw transform.
+
+    @param [out] a 2-D numpy array in which the first row is the output
+    x coordinate and the second row is the output y coordinate
+    """
+    from lsst.sims.coordUtils.DistortionSurrogateUtils import getDistortionSurrogate
+    surrogate = getDistortionSurrogate(camera, fromSys, toSys,
+                                       tolerance_pixels=tolerance_pixels)
+    exact = getCameraTransformCache().getTransform(camera, fromSys, toSys)
+
+    if not surrogate.converged:
+        return _transformArrays(exact, xIn, yIn)
+
+    output = surrogate.apply(xIn, yIn)
+    outside = np.where(np.logical_and(np.logical_not(surrogate.inDomain(xIn, yIn)),
+                                      np.logical_and(np.isfinite(xIn), np.isfinite(yIn))))[0]
+    if len(outside) > 0:
+        output_exact = _transformArrays(exact, xIn[outside], yIn[outside])
+        output[0][outside] = output_exact[0]
+        output[1][outside] = output_exact[1]
+    return output
+
+
+def _groupIndicesByCode(codes, n_codes):
+    """
+    Group the elements of an array of non-negative integer codes.
+
+    @param [in] codes is a numpy array of integers in the range [0, n_codes)
+
+    @param [in] n_codes is the number of possible codes
+
+    @param [out] a list of n_codes numpy arrays; the ith array contains
+    the indices of the elements of codes that are equal to i
+    """
+    # a stable sort of small integers is a radix sort in numpy,
+    # so this scales linearly with len(codes)
+    if n_codes <= np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16, copy=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes, minlength=n_codes))
+    return np.split(order, bounds[:-1])
+
+
 def getCornerPixels(detector_name, camera):
     """
     Return the pixel coordinates of the corners of a detector.
 
     @param [in] detector_name is the name of the detector in question
+    (or its index in getDetectorNameTable(camera))
 
     @param [in] camera is the afwCameraGeom camera object containing
     that detector
@@ -99,12 +441,13 @@ def getCornerPixels(detector_name, camera):
     [(xmin, ymin), (xmin, ymax), (xmax, ymin), (xmax, ymax)]
     """
 
-    det = camera[detector_name]
-    bbox = det.getBBox()
-    xmin = bbox.getMinX()
-    xmax = bbox.getMaxX()
-    ymin = bbox.getMinY()
-    ymax = bbox.getMaxY()
+    from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+
+    i_det = _detectorIndexFromChipName(np.array([detector_name]), camera)[0]
+    if i_det < 0:
+        raise RuntimeError("getCornerPixels needs a detector; got %s" % str(detector_name))
+
+    xmin, ymin, xmax, ymax = (int(bb) for bb in getCameraGeometryTable(camera).bbox[i_det])
     return [(xmin, ymin), (xmin, ymax), (xmax, ymin), (xmax, ymax)]
 
 
@@ -115,6 +458,7 @@ def getCornerRaDec(detector_name, camera, obs_metadata, epoch=2000.0,
     detector in degrees.
 
     @param [in] detector_name is the name of the detector in question
+    (or its index in getDetectorNameTable(camera))
 
     @param [in] camera is the afwCameraGeom camera object containing
     that detector
@@ -154,6 +498,7 @@ def _getCornerRaDec(detector_name, camera, obs_metadata,
     detector in radians.
 
     @param [in] detector_name is the name of the detector in question
+    (or its index in getDetectorNameTable(camera))
 
     @param [in] camera is the afwCameraGeom camera object containing
     that detector
@@ -181,6 +526,9 @@ def _getCornerRaDec(detector_name, camera, obs_metadata,
     of the ambiguity imposed by the rotator angle.
     """
 
+    if _isDetectorIndex(detector_name):
+        detector_name = getDetectorNameTable(camera)[detector_name]
+
     cc_pix = getCornerPixels(detector_name, camera)
 
     ra, dec = _raDecFromPixelCoords(np.array([cc[0] for cc in cc_pix]),
@@ -195,7 +543,9 @@ def _getCornerRaDec(detector_name, camera, obs_metadata,
 
 def chipNameFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
                       obs_metadata=None, camera=None,
-                      epoch=2000.0, allow_multiple_chips=False):
+                      epoch=2000.0, allow_multiple_chips=False,
+                      as_detector_index=False, use_lookup_grid=False,
+                      lookup_grid_cells=1024):
     """
     Return the names of detectors that see the object specified by
     (RA, Dec) in degrees.
@@ -231,6 +581,19 @@ def chipNameFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=Non
     and an object falls on more than one chip, it will still only return the first chip in the
     list of chips returned. THIS BEHAVIOR SHOULD BE FIXED IN A FUTURE TICKET.
 
+    @param [in] as_detector_index is a boolean (default False).  If True, this method
+    returns an int16 numpy array of indices into getDetectorNameTable(camera) (-1 for
+    objects that do not land on a detector) rather than an array of chip names.
+
+    @param [in] use_lookup_grid is a boolean (default False).  If True, chips are
+    looked up in a ChipLookupGrid rasterizing the camera's FIELD_ANGLE footprint
+    (built on first use and cached), and only points near detector edges are
+    tested exactly.  The results are identical to the default exact test.
+
+    @param [in] lookup_grid_cells is the number of cells along each side of the
+    lookup grid (default 1024).  Finer grids use more memory but send fewer
+    points to the exact test.
+
     @param [out] a numpy array of chip names
     """
     if pm_ra is not None:
@@ -252,12 +615,17 @@ def chipNameFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=Non
                               pm_ra=pm_ra_out, pm_dec=pm_dec_out,
                               parallax=parallax_out, v_rad=v_rad,
                               obs_metadata=obs_metadata, epoch=epoch,
-                              camera=camera, allow_multiple_chips=allow_multiple_chips)
+                              camera=camera, allow_multiple_chips=allow_multiple_chips,
+                              as_detector_index=as_detector_index,
+                              use_lookup_grid=use_lookup_grid,
+                              lookup_grid_cells=lookup_grid_cells)
 
 
 def _chipNameFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
                        obs_metadata=None, camera=None,
-                       epoch=2000.0, allow_multiple_chips=False):
+                       epoch=2000.0, allow_multiple_chips=False,
+                       as_detector_index=False, use_lookup_grid=False,
+                       lookup_grid_cells=1024):
     """
     Return the names of detectors that see the object specified by
     (RA, Dec)  in radians.
@@ -294,6 +662,19 @@ def _chipNameFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=No
     and an object falls on more than one chip, it will still only return the first chip in the
     list of chips returned. THIS BEHAVIOR SHOULD BE FIXED IN A FUTURE TICKET.
 
+    @param [in] as_detector_index is a boolean (default False).  If True, this method
+    returns an int16 numpy array of indices into getDetectorNameTable(camera) (-1 for
+    objects that do not land on a detector) rather than an array of chip names.
+
+    @param [in] use_lookup_grid is a boolean (default False).  If True, chips are
+    looked up in a ChipLookupGrid rasterizing the camera's FIELD_ANGLE footprint
+    (built on first use and cached), and only points near detector edges are
+    tested exactly.  The results are identical to the default exact test.
+
+    @param [in] lookup_grid_cells is the number of cells along each side of the
+    lookup grid (default 1024).  Finer grids use more memory but send fewer
+    points to the exact test.
+
     @param [out] the name(s) of the chips on which ra, dec fall (will be a numpy
     array if more than one)
     """
@@ -312,15 +693,237 @@ def _chipNameFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=No
     if obs_metadata.rotSkyPos is None:
         raise RuntimeError("You need to pass an ObservationMetaData with a rotSkyPos into chipName")
 
-    xp, yp = _pupilCoordsFromRaDec(ra, dec,
-                                   pm_ra=pm_ra, pm_dec=pm_dec, parallax=parallax, v_rad=v_rad,
-                                   obs_metadata=obs_metadata, epoch=epoch)
+    xp, yp = _pupilCoordsFromValidRaDec(ra, dec,
+                                        pm_ra=pm_ra, pm_dec=pm_dec, parallax=parallax, v_rad=v_rad,
+                                        obs_metadata=obs_metadata, epoch=epoch)
 
-    ans = chipNameFromPupilCoords(xp, yp, camera=camera, allow_multiple_chips=allow_multiple_chips)
+    ans = chipNameFromPupilCoords(xp, yp, camera=camera, allow_multiple_chips=allow_multiple_chips,
+                                  as_detector_index=as_detector_index,
+                                  use_lookup_grid=use_lookup_grid,
+                                  lookup_grid_cells=lookup_grid_cells)
 
     return ans
 
-def chipNameFromPupilCoords(xPupil, yPupil, camera=None, allow_multiple_chips=False):
+
+def _cameraBoundingRadius(camera, cameraSys):
+    """
+    Return the radius of a circle centered on the origin of cameraSys
+    (FIELD_ANGLE or FOCAL_PLANE) that contains every detector in the camera.
+
+    The radius is found from points sampled along the edges of every
+    detector, so it does not rely on the FIELD_ANGLE to FOCAL_PLANE
+    distortion being purely radial.  It is padded by a small fraction
+    so that points on the outermost detector edges are never rejected.
+    """
+    def factory():
+        from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+
+        n_per_side = 16
+        frac = np.linspace(0.0, 1.0, n_per_side, endpoint=False)[:, np.newaxis]
+        corners = getCameraGeometryTable(camera).corners_mm
+        next_corners = np.roll(corners, -1, axis=1)
+        # (n_detectors, n_corners, n_per_side, 2) points along every edge
+        edges = (corners[:, :, np.newaxis, :] +
+                 frac*(next_corners - corners)[:, :, np.newaxis, :])
+        x_edge = edges[..., 0].ravel()
+        y_edge = edges[..., 1].ravel()
+
+        if _sysName(cameraSys) != FOCAL_PLANE:
+            focal_to_sys = getCameraTransformCache().getTransform(camera, FOCAL_PLANE, cameraSys)
+            x_edge, y_edge = _transformArrays(focal_to_sys, x_edge, y_edge)
+
+        return 1.001*np.sqrt(np.nanmax(x_edge**2 + y_edge**2))
+
+    return getCameraTransformCache().get(camera, ('bounding_radius', _sysName(cameraSys)), factory)
+
+
+def _detectorFocalBounds(camera):
+    """
+    Return a read-only (n_detectors, 4) numpy array of the
+    (xmin, ymin, xmax, ymax) FOCAL_PLANE bounds of every detector
+    in getDetectorNameTable(camera), padded by 1 mm.  Used to
+    preselect the points that might land on each detector.
+    """
+    def factory():
+        from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+
+        corners = getCameraGeometryTable(camera).corners_mm
+        bounds = np.concatenate([corners.min(axis=1)-1.0, corners.max(axis=1)+1.0], axis=1)
+        bounds.setflags(write=False)
+        return bounds
+
+    return getCameraTransformCache().get(camera, 'detector_focal_bounds', factory)
+
+
+def _detectorHitsFromCameraCoords(xCoord, yCoord, cameraSys, camera, lookup_grid=None):
+    """
+    Find every detector that sees points specified in either FIELD_ANGLE
+    or FOCAL_PLANE coordinates.
+
+    Without a lookup_grid, this is the same membership test as
+    afw's Camera.findDetectorsList: a point lands on a detector if the
+    detector's own FOCAL_PLANE to PIXELS transform puts it within the
+    detector's bounding box, treated as a half-open Box2D.  Points are
+    converted to FOCAL_PLANE once; each detector then applies its exact
+    transform to the points within its (padded) FOCAL_PLANE bounds, so
+    only the bookkeeping of the hits, not the test, is vectorized.
+
+    @param [in] xCoord is a numpy array of x coordinates
+
+    @param [in] yCoord is a numpy array of y coordinates
+
+    @param [in] cameraSys is the coordinate system (FIELD_ANGLE or FOCAL_PLANE)
+    in which xCoord and yCoord are defined
+
+    @param [in] camera is an afwCameraGeom object
+
+    @param [in] lookup_grid is an optional ChipLookupGrid defined in cameraSys.
+    If provided, only points in its ambiguous cells are tested exactly.
+
+    @param [out] offsets, indices -- a ragged array in compressed sparse row
+    form: the detectors seen by point i are indices[offsets[i]:offsets[i+1]],
+    an int16 numpy array of indices into getDetectorNameTable(camera) in
+    camera order.  offsets is an int64 numpy array of length len(xCoord)+1.
+    """
+    from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+
+    n_pts = len(xCoord)
+    point_list = []
+    det_list = []
+
+    if lookup_grid is not None:
+        # points in unambiguous grid cells get their chip straight from the
+        # grid; the rest go on to the exact test below
+        grid_codes = lookup_grid.lookup(xCoord, yCoord)
+        on_grid = np.where(grid_codes >= 0)[0]
+        point_list.append(on_grid)
+        det_list.append(grid_codes[on_grid])
+        candidates = (grid_codes == lookup_grid.AMBIGUOUS)
+    else:
+        candidates = np.ones(n_pts, dtype=bool)
+
+    # only pass points that could possibly land on a detector on to the
+    # exact test; NaNs fail this test and are rejected along with
+    # everything else outside of the field of view
+    radius_bound = _cameraBoundingRadius(camera, cameraSys)
+    with np.errstate(invalid='ignore'):
+        in_field = np.where(np.logical_and(candidates,
+                                           xCoord*xCoord + yCoord*yCoord <= radius_bound*radius_bound))[0]
+
+    if len(in_field) > 0:
+        if _sysName(cameraSys) == FOCAL_PLANE:
+            xFocal = xCoord[in_field]
+            yFocal = yCoord[in_field]
+        else:
+            to_focal = getCameraTransformCache().getTransform(camera, cameraSys, FOCAL_PLANE)
+            xFocal, yFocal = _transformArrays(to_focal, xCoord[in_field], yCoord[in_field])
+
+        transform_cache = getCameraTransformCache()
+        focal_bounds = _detectorFocalBounds(camera)
+        name_table = getDetectorNameTable(camera)
+        bbox_table = getCameraGeometryTable(camera).bbox
+
+        # sort the points on x so that each detector only examines the
+        # points within its x range
+        order = np.argsort(xFocal)
+        x_sorted = xFocal[order]
+        for i_det in range(len(name_table)):
+            i_lo = np.searchsorted(x_sorted, focal_bounds[i_det][0], side='left')
+            i_hi = np.searchsorted(x_sorted, focal_bounds[i_det][2], side='right')
+            if i_hi <= i_lo:
+                continue
+            local = order[i_lo:i_hi]
+            y_local = yFocal[local]
+            local = local[np.logical_and(y_local >= focal_bounds[i_det][1],
+                                         y_local <= focal_bounds[i_det][3])]
+            if len(local) == 0:
+                continue
+
+            focal_to_pixels = transform_cache.getTransform(camera, FOCAL_PLANE, PIXELS,
+                                                           detectorName=name_table[i_det])
+            pix = _transformArrays(focal_to_pixels, xFocal[local], yFocal[local])
+
+            xmin, ymin, xmax, ymax = bbox_table[i_det]
+            inside = ((pix[0] >= xmin-0.5) & (pix[0] < xmax+0.5) &
+                      (pix[1] >= ymin-0.5) & (pix[1] < ymax+0.5))
+            hits = in_field[local[inside]]
+            point_list.append(hits)
+            det_list.append(np.full(len(hits), i_det, dtype=np.int16))
+
+    if len(point_list) > 0:
+        points = np.concatenate(point_list)
+        dets = np.concatenate(det_list).astype(np.int16)
+    else:
+        points = np.zeros(0, dtype=np.int64)
+        dets = np.zeros(0, dtype=np.int16)
+
+    order = np.lexsort((dets, points))
+    offsets = np.zeros(n_pts+1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(points, minlength=n_pts))
+    return offsets, dets[order]
+
+
+def _chipNameFromCameraCoords(xCoord, yCoord, cameraSys, camera, allow_multiple_chips=False,
+                              lookup_grid=None, as_detector_index=False):
+    """
+    Find the detectors that see points specified in either FIELD_ANGLE
+    or FOCAL_PLANE coordinates.
+
+    @param [in] xCoord is a numpy array of x coordinates
+
+    @param [in] yCoord is a numpy array of y coordinates
+
+    @param [in] cameraSys is the coordinate system (FIELD_ANGLE or FOCAL_PLANE)
+    in which xCoord and yCoord are defined
+
+    @param [in] camera is an afwCameraGeom object
+
+    @param [in] allow_multiple_chips has the same meaning as in
+    chipNameFromPupilCoords
+
+    @param [in] lookup_grid is an optional ChipLookupGrid defined in cameraSys.
+    If provided, only points in its ambiguous cells are tested exactly.
+
+    @param [in] as_detector_index is a boolean (default False).  If True, return
+    the int16 index into getDetectorNameTable(camera) of the first detector seeing
+    each point (-1 for none) without building any chip names.  Cannot be combined
+    with allow_multiple_chips=True.
+
+    @param [out] a list of chip names (None for points that do not land on a chip)
+    or, if as_detector_index is True, an int16 numpy array of detector indices
+    """
+    offsets, indices = _detectorHitsFromCameraCoords(xCoord, yCoord, cameraSys, camera,
+                                                     lookup_grid=lookup_grid)
+
+    n_hits = np.diff(offsets)
+    first = np.full(len(xCoord), -1, dtype=np.int16)
+    on_chip = np.where(n_hits > 0)
+    first[on_chip] = indices[offsets[:-1][on_chip]]
+
+    multiple = np.where(n_hits > 1)[0]
+    if len(multiple) > 0 and not allow_multiple_chips:
+        if _sysName(cameraSys) == FIELD_ANGLE:
+            point_label = 'pupil coordinate'
+        else:
+            point_label = 'focal plane'
+        warnings.warn(MultipleChipWarning.fromIndices(multiple, point_label))
+
+    if as_detector_index:
+        return first
+
+    chipNames = _chipNameFromDetectorIndex(first, camera).tolist()
+    if allow_multiple_chips:
+        name_table = getDetectorNameTable(camera)
+        for i_pt in multiple:
+            chipNames[i_pt] = str([str(nn) for nn in
+                                   name_table[indices[offsets[i_pt]:offsets[i_pt+1]]]])
+
+    return chipNames
+
+
+def chipNameFromPupilCoords(xPupil, yPupil, camera=None, allow_multiple_chips=False,
+                            as_detector_index=False, use_lookup_grid=False,
+                            lookup_grid_cells=1024):
     """
     Return the names of detectors that see the object specified by
     (xPupil, yPupil).
@@ -334,10 +937,29 @@ def chipNameFromPupilCoords(xPupil, yPupil, camera=None, allow_multiple_chips=Fa
     @param [in] allow_multiple_chips is a boolean (default False) indicating whether or not
     this method will allow objects to be visible on more than one chip.  If it is 'False'
     and an object appears on more than one chip, only the first chip will appear in the list of
-    chipNames and warning will be emitted.  If it is 'True' and an object falls on more than one
-    chip, the resulting chip name will be the string representation of the list of valid chip names.
+    chipNames and one MultipleChipWarning will be emitted, listing all of the offending objects.
+    If it is 'True' and an object falls on more than one chip, the resulting chip name will be the
+    string representation of the list of valid chip names.  detectorIndicesFromPupilCoords returns
+    every chip seen by each object without building strings.
 
     @param [in] camera is an afwCameraGeom object that specifies the attributes of the camera.
+    Points outside of a circle bounding every detector in the camera are rejected
+    with a cheap radius test before the exact per-detector test is done.
+
+    @param [in] as_detector_index is a boolean (default False).  If True, this method
+    returns an int16 numpy array of indices into getDetectorNameTable(camera) (-1 for
+    objects that do not land on a detector) rather than an array of chip names.
+    Objects that land on more than one chip are assigned the first of them, so this
+    cannot be combined with allow_multiple_chips=True.
+
+    @param [in] use_lookup_grid is a boolean (default False).  If True, chips are
+    looked up in a ChipLookupGrid rasterizing the camera's FIELD_ANGLE footprint
+    (built on first use and cached), and only points near detector edges are
+    tested exactly.  The results are identical to the default exact test.
+
+    @param [in] lookup_grid_cells is the number of cells along each side of the
+    lookup grid (default 1024).  Finer grids use more memory but send fewer
+    points to the exact test.
 
     @param [out] a numpy array of chip names
 
@@ -348,39 +970,34 @@ def chipNameFromPupilCoords(xPupil, yPupil, camera=None, allow_multiple_chips=Fa
     if camera is None:
         raise RuntimeError("No camera defined.  Cannot run chipName.")
 
-    chipNames = []
+    if as_detector_index and allow_multiple_chips:
+        raise RuntimeError("chipNameFromPupilCoords cannot return detector indices "
+                           "with allow_multiple_chips=True")
 
-    if are_arrays:
-        pupilPointList = [geom.Point2D(x, y) for x, y in zip(xPupil, yPupil)]
+    if use_lookup_grid:
+        from lsst.sims.coordUtils.ChipLookupGridUtils import getChipLookupGrid
+        lookup_grid = getChipLookupGrid(camera, cameraSys=FIELD_ANGLE,
+                                        n_cells=lookup_grid_cells)
     else:
-        pupilPointList = [geom.Point2D(xPupil, yPupil)]
+        lookup_grid = None
 
-    detList = camera.findDetectorsList(pupilPointList, FIELD_ANGLE)
+    if are_arrays:
+        xPupil, yPupil = _unmaskArrays([xPupil, yPupil])
+        chipNames = _chipNameFromCameraCoords(xPupil, yPupil, FIELD_ANGLE, camera,
+                                              allow_multiple_chips=allow_multiple_chips,
+                                              lookup_grid=lookup_grid,
+                                              as_detector_index=as_detector_index)
+    else:
+        chipNames = _chipNameFromCameraCoords(np.array([xPupil]), np.array([yPupil]),
+                                              FIELD_ANGLE, camera,
+                                              allow_multiple_chips=allow_multiple_chips,
+                                              lookup_grid=lookup_grid,
+                                              as_detector_index=as_detector_index)
 
-    for pt, det in zip(pupilPointList, detList):
-        if len(det) == 0 or np.isnan(pt.getX()) or np.isnan(pt.getY()):
-            chipNames.append(None)
-        else:
-            name_list = [dd.getName() for dd in det]
-            if len(name_list) > 1:
-                if allow_multiple_chips:
-                    chipNames.append(str(name_list))
-                else:
-                    warnings.warn("An object has landed on multiple chips.  " +
-                                  "You asked for this not to happen.\n" +
-                                  "We will return only one of the chip names.  If you want both, " +
-                                  "try re-running with " +
-                                  "the kwarg allow_multiple_chips=True.\n" +
-                                  "Offending chip names were %s\n" % str(name_list) +
-                                  "Offending pupil coordinate point was %.12f %.12f\n" % (pt[0], pt[1]),
-                                  category=MultipleChipWarning)
-
-                    chipNames.append(name_list[0])
-
-            elif len(name_list) == 0:
-                chipNames.append(None)
-            else:
-                chipNames.append(name_list[0])
+    if as_detector_index:
+        if not are_arrays:
+            return int(chipNames[0])
+        return chipNames
 
     if not are_arrays:
         return chipNames[0]
@@ -388,10 +1005,186 @@ def chipNameFromPupilCoords(xPupil, yPupil, camera=None, allow_multiple_chips=Fa
     return np.array(chipNames)
 
 
+def detectorIndicesFromPupilCoords(xPupil, yPupil, camera=None, use_lookup_grid=False,
+                                   lookup_grid_cells=1024):
+    """
+    Return every detector that sees the objects specified by
+    (xPupil, yPupil), as a ragged array.
+
+    @param [in] xPupil is a numpy array of x pupil coordinates in radians
+
+    @param [in] yPupil is a numpy array of y pupil coordinates in radians
+
+    @param [in] camera is an afwCameraGeom object that specifies the attributes of the camera.
+
+    @param [in] use_lookup_grid is a boolean (default False); see chipNameFromPupilCoords
+
+    @param [in] lookup_grid_cells is the number of cells along each side of the
+    lookup grid (default 1024)
+
+    @param [out] offsets, indices -- a ragged array in compressed sparse row form.
+    The detectors that see object i are indices[offsets[i]:offsets[i+1]], an int16
+    numpy array of indices into getDetectorNameTable(camera) in camera order;
+    objects that do not land on a detector have none.  offsets is an int64 numpy
+    array of length len(xPupil)+1, so np.diff(offsets) is the number of detectors
+    seeing each object.
+    """
+    are_arrays = _validate_inputs([xPupil, yPupil], ['xPupil', 'yPupil'],
+                                  "detectorIndicesFromPupilCoords")
+
+    if not are_arrays:
+        raise RuntimeError("detectorIndicesFromPupilCoords needs numpy arrays of "
+                           "xPupil and yPupil")
+
+    if camera is None:
+        raise RuntimeError("No camera defined.  Cannot run detectorIndicesFromPupilCoords.")
+
+    if use_lookup_grid:
+        from lsst.sims.coordUtils.ChipLookupGridUtils import getChipLookupGrid
+        lookup_grid = getChipLookupGrid(camera, cameraSys=FIELD_ANGLE,
+                                        n_cells=lookup_grid_cells)
+    else:
+        lookup_grid = None
+
+    xPupil, yPupil = _unmaskArrays([xPupil, yPupil])
+    return _detectorHitsFromCameraCoords(xPupil, yPupil, FIELD_ANGLE, camera,
+                                         lookup_grid=lookup_grid)
+
+
+def detectorIndicesFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                             obs_metadata=None, camera=None, epoch=2000.0,
+                             use_lookup_grid=False, lookup_grid_cells=1024):
+    """
+    Return every detector that sees the objects specified by
+    (RA, Dec) in degrees, as a ragged array.
+
+    @param [in] ra is a numpy array of RA in degrees
+    (International Celestial Reference System)
+
+    @param [in] dec is a numpy array of Dec in degrees
+    (International Celestial Reference System)
+
+    @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (arcsec/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] pm_dec is proper motion in dec (arcsec/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] parallax is parallax in arcsec
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] v_rad is radial velocity (km/s)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] obs_metadata is an ObservationMetaData characterizing the telescope pointing
+
+    @param [in] camera is an afw.cameraGeom camera instance characterizing the camera
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which RA and Dec are
+    measured.  Default is 2000.
+
+    @param [in] use_lookup_grid is a boolean (default False); see chipNameFromPupilCoords
+
+    @param [in] lookup_grid_cells is the number of cells along each side of the
+    lookup grid (default 1024)
+
+    @param [out] offsets, indices -- a ragged array in compressed sparse row form;
+    see detectorIndicesFromPupilCoords
+    """
+    if pm_ra is not None:
+        pm_ra_out = radiansFromArcsec(pm_ra)
+    else:
+        pm_ra_out = None
+
+    if pm_dec is not None:
+        pm_dec_out = radiansFromArcsec(pm_dec)
+    else:
+        pm_dec_out = None
+
+    if parallax is not None:
+        parallax_out = radiansFromArcsec(parallax)
+    else:
+        parallax_out = None
+
+    return _detectorIndicesFromRaDec(np.radians(ra), np.radians(dec),
+                                     pm_ra=pm_ra_out, pm_dec=pm_dec_out,
+                                     parallax=parallax_out, v_rad=v_rad,
+                                     obs_metadata=obs_metadata, camera=camera, epoch=epoch,
+                                     use_lookup_grid=use_lookup_grid,
+                                     lookup_grid_cells=lookup_grid_cells)
+
+
+def _detectorIndicesFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                              obs_metadata=None, camera=None, epoch=2000.0,
+                              use_lookup_grid=False, lookup_grid_cells=1024):
+    """
+    Return every detector that sees the objects specified by
+    (RA, Dec) in radians, as a ragged array.
+
+    @param [in] ra is a numpy array of RA in radians
+    (International Celestial Reference System)
+
+    @param [in] dec is a numpy array of Dec in radians
+    (International Celestial Reference System)
+
+    @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (radians/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] pm_dec is proper motion in dec (radians/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] parallax is parallax in radians
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] v_rad is radial velocity (km/s)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] obs_metadata is an ObservationMetaData characterizing the telescope pointing
+
+    @param [in] camera is an afw.cameraGeom camera instance characterizing the camera
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which RA and Dec are
+    measured.  Default is 2000.
+
+    @param [in] use_lookup_grid is a boolean (default False); see chipNameFromPupilCoords
+
+    @param [in] lookup_grid_cells is the number of cells along each side of the
+    lookup grid (default 1024)
+
+    @param [out] offsets, indices -- a ragged array in compressed sparse row form;
+    see detectorIndicesFromPupilCoords
+    """
+    are_arrays = _validate_inputs([ra, dec], ['ra', 'dec'], "detectorIndicesFromRaDec")
+
+    if not are_arrays:
+        raise RuntimeError("detectorIndicesFromRaDec needs numpy arrays of RA and Dec")
+
+    if epoch is None:
+        raise RuntimeError("You need to pass an epoch into detectorIndicesFromRaDec")
+
+    if obs_metadata is None:
+        raise RuntimeError("You need to pass an ObservationMetaData into detectorIndicesFromRaDec")
+
+    if obs_metadata.mjd is None:
+        raise RuntimeError("You need to pass an ObservationMetaData with an mjd into "
+                           "detectorIndicesFromRaDec")
+
+    if obs_metadata.rotSkyPos is None:
+        raise RuntimeError("You need to pass an ObservationMetaData with a rotSkyPos into "
+                           "detectorIndicesFromRaDec")
+
+    xp, yp = _pupilCoordsFromValidRaDec(ra, dec,
+                                        pm_ra=pm_ra, pm_dec=pm_dec, parallax=parallax, v_rad=v_rad,
+                                        obs_metadata=obs_metadata, epoch=epoch)
+
+    return detectorIndicesFromPupilCoords(xp, yp, camera=camera, use_lookup_grid=use_lookup_grid,
+                                          lookup_grid_cells=lookup_grid_cells)
+
+
 def pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
                          obs_metadata=None,
                          chipName=None, camera=None,
-                         epoch=2000.0, includeDistortion=True):
+                         epoch=2000.0, includeDistortion=True, pixelConvention='DM'):
     """
     Get the pixel positions (or nan if not on a chip) for objects based
     on their RA, and Dec (in degrees)
@@ -427,7 +1220,8 @@ def pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=
     If a single value, all of the pixel coordinates will be reckoned on the same
     chip.  If None, this method will calculate which chip each(RA, Dec) pair actually
     falls on, and return pixel coordinates for each (RA, Dec) pair on the appropriate
-    chip.  Default is None.
+    chip.  Default is None.  Chips can also be specified by their integer indices in
+    getDetectorNameTable(camera) (-1 meaning no chip).
 
     @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
     This is an optional argument to be passed to chipName.
@@ -438,6 +1232,11 @@ def pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=
     estimated optical distortion removed.  See the documentation in afw.cameraGeom for more
     details.
 
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'.  If 'camera',
+    pixel coordinates are returned in the Camera team's convention (Camera +y = DM +x,
+    Camera +x = DM -y, flipped about the detector's central pixel; see
+    DMtoCameraPixelTransformer) rather than the DM convention.
+
     @param [out] a 2-D numpy array in which the first row is the x pixel coordinate
     and the second row is the y pixel coordinate
     """
@@ -462,13 +1261,14 @@ def pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=
                                  parallax=parallax_out, v_rad=v_rad,
                                  chipName=chipName, camera=camera,
                                  includeDistortion=includeDistortion,
+                                 pixelConvention=pixelConvention,
                                  obs_metadata=obs_metadata, epoch=epoch)
 
 
 def _pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
                           obs_metadata=None,
                           chipName=None, camera=None,
-                          epoch=2000.0, includeDistortion=True):
+                          epoch=2000.0, includeDistortion=True, pixelConvention='DM'):
     """
     Get the pixel positions (or nan if not on a chip) for objects based
     on their RA, and Dec (in radians)
@@ -503,7 +1303,8 @@ def _pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad
     If a single value, all of the pixel coordinates will be reckoned on the same
     chip.  If None, this method will calculate which chip each(RA, Dec) pair actually
     falls on, and return pixel coordinates for each (RA, Dec) pair on the appropriate
-    chip.  Default is None.
+    chip.  Default is None.  Chips can also be specified by their integer indices in
+    getDetectorNameTable(camera) (-1 meaning no chip).
 
     @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
     This is an optional argument to be passed to chipName.
@@ -514,6 +1315,11 @@ def _pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad
     estimated optical distortion removed.  See the documentation in afw.cameraGeom for more
     details.
 
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'.  If 'camera',
+    pixel coordinates are returned in the Camera team's convention (Camera +y = DM +x,
+    Camera +x = DM -y, flipped about the detector's central pixel; see
+    DMtoCameraPixelTransformer) rather than the DM convention.
+
     @param [out] a 2-D numpy array in which the first row is the x pixel coordinate
     and the second row is the y pixel coordinate
     """
@@ -522,6 +1328,7 @@ def _pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad
     chipNameList = _validate_inputs_and_chipname([ra, dec], ['ra', 'dec'],
                                                  'pixelCoordsFromRaDec',
                                                  chipName)
+    _validatePixelConvention(pixelConvention, 'pixelCoordsFromRaDec')
 
     if epoch is None:
         raise RuntimeError("You need to pass an epoch into pixelCoordsFromRaDec")
@@ -537,17 +1344,186 @@ def _pixelCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad
         raise RuntimeError("You need to pass an ObservationMetaData with a rotSkyPos into "
                            "pixelCoordsFromRaDec")
 
-    xPupil, yPupil = _pupilCoordsFromRaDec(ra, dec,
-                                           pm_ra=pm_ra, pm_dec=pm_dec,
-                                           parallax=parallax, v_rad=v_rad,
-                                           obs_metadata=obs_metadata, epoch=epoch)
+    xPupil, yPupil = _pupilCoordsFromValidRaDec(ra, dec,
+                                                pm_ra=pm_ra, pm_dec=pm_dec,
+                                                parallax=parallax, v_rad=v_rad,
+                                                obs_metadata=obs_metadata, epoch=epoch)
 
     return pixelCoordsFromPupilCoords(xPupil, yPupil, chipName=chipNameList, camera=camera,
-                                      includeDistortion=includeDistortion)
+                                      includeDistortion=includeDistortion,
+                                      pixelConvention=pixelConvention)
+
+
+_pixel_conventions = ('DM', 'camera')
+
+
+def _validatePixelConvention(pixelConvention, method_name):
+    if pixelConvention not in _pixel_conventions:
+        raise RuntimeError("%s does not know the pixel convention %s; "
+                           "allowed conventions are %s"
+                           % (method_name, str(pixelConvention), str(_pixel_conventions)))
+
+
+def _cameraPixFromDMPix(xPix, yPix, det_codes, camera):
+    """
+    Convert DM pixel coordinates into the Camera team's convention
+    (Camera +y = DM +x, Camera +x = DM -y, flipped about the central pixel
+    of each detector).  Used for points that are not transformed with the
+    DetectorAffineTable, whose matrices already include this swap.
+
+    @param [in] det_codes is a numpy array of indices into getDetectorNameTable(camera)
+    (all >= 0)
+    """
+    from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+    two_yc = 2.0*getCameraGeometryTable(camera).center_pix[det_codes, 1]
+    return np.array([two_yc - yPix, xPix])
+
+
+def _dmPixFromCameraPix(xPix, yPix, det_codes, camera):
+    """
+    The inverse of _cameraPixFromDMPix
+    """
+    from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+    two_yc = 2.0*getCameraGeometryTable(camera).center_pix[det_codes, 1]
+    return np.array([yPix, two_yc - xPix])
+
+
+def _pixelCoordsFromFocalPlaneCoords(xFocal, yFocal, det_codes, camera, pixelType,
+                                     pixelConvention='DM'):
+    """
+    Convert focal plane coordinates into pixel coordinates
+
+    @param [in] xFocal is a numpy array of x focal plane coordinates in mm
+
+    @param [in] yFocal is a numpy array of y focal plane coordinates in mm
+
+    @param [in] det_codes is a numpy array of indices into getDetectorNameTable(camera)
+    denoting the chip on which each point's pixel coordinates are reckoned
+    (-1 meaning no chip)
+
+    @param [in] camera is an afwCameraGeom object
+
+    @param [in] pixelType is either PIXELS or TAN_PIXELS
+
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'
+
+    @param [out] a 2-D numpy array in which the first row is the x pixel coordinate
+    and the second row is the y pixel coordinate (NaN where det_codes is -1)
+    """
+    from lsst.sims.coordUtils.DetectorAffineTableUtils import getDetectorAffineTable
+    transform_cache = getCameraTransformCache()
+
+    xPix = np.nan*np.ones(len(det_codes), dtype=float)
+    yPix = np.nan*np.ones(len(det_codes), dtype=float)
+
+    # points on detectors whose transforms are affine are converted
+    # all at once with the matrices in the DetectorAffineTable
+    affine_table = getDetectorAffineTable(camera, pixelType=pixelType)
+    on_affine = np.logical_and(det_codes >= 0,
+                               affine_table.is_affine[np.maximum(det_codes, 0)])
+    affine_points = np.where(on_affine)[0]
+    if len(affine_points) > 0:
+        local_pix = affine_table.focalToPixels(xFocal[affine_points], yFocal[affine_points],
+                                               det_codes[affine_points],
+                                               pixelConvention=pixelConvention)
+        xPix[affine_points] = local_pix[0]
+        yPix[affine_points] = local_pix[1]
+
+    if len(affine_points) == len(det_codes):
+        return np.array([xPix, yPix])
+
+    # group the remaining points by detector index so that each chip's points
+    # can be gathered without scanning the whole array once per chip
+    name_table = getDetectorNameTable(camera)
+    afw_codes = np.where(on_affine, -1, det_codes)
+    index_groups = _groupIndicesByCode(afw_codes+1, len(name_table)+1)
+
+    for name, valid_points in zip(name_table, index_groups[1:]):
+        if len(valid_points) == 0:
+            continue
+
+        focalToPixels = transform_cache.getTransform(camera, FOCAL_PLANE, pixelType,
+                                                     detectorName=name)
+        local_pix = _transformArrays(focalToPixels,
+                                     xFocal[valid_points],
+                                     yFocal[valid_points])
+        if pixelConvention == 'camera':
+            local_pix = _cameraPixFromDMPix(local_pix[0], local_pix[1],
+                                            det_codes[valid_points], camera)
+
+        xPix[valid_points] = local_pix[0]
+        yPix[valid_points] = local_pix[1]
+
+    return np.array([xPix, yPix])
+
+
+def _focalPlaneCoordsFromPixelCoords(xPix, yPix, det_codes, camera, pixelType,
+                                     pixelConvention='DM'):
+    """
+    Convert pixel coordinates into focal plane coordinates
+
+    @param [in] xPix is a numpy array of x pixel coordinates
+
+    @param [in] yPix is a numpy array of y pixel coordinates
+
+    @param [in] det_codes is a numpy array of indices into getDetectorNameTable(camera)
+    denoting the chip on which each point's pixel coordinates are reckoned
+    (-1 meaning no chip)
+
+    @param [in] camera is an afwCameraGeom object
+
+    @param [in] pixelType is either PIXELS or TAN_PIXELS
+
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'
+
+    @param [out] a 2-D numpy array in which the first row is the x focal plane
+    coordinate and the second row is the y focal plane coordinate in mm
+    (NaN where det_codes is -1)
+    """
+    from lsst.sims.coordUtils.DetectorAffineTableUtils import getDetectorAffineTable
+    transform_cache = getCameraTransformCache()
+
+    xFocal = np.nan*np.ones(len(det_codes), dtype=float)
+    yFocal = np.nan*np.ones(len(det_codes), dtype=float)
+
+    affine_table = getDetectorAffineTable(camera, pixelType=pixelType)
+    on_affine = np.logical_and(det_codes >= 0,
+                               affine_table.is_affine[np.maximum(det_codes, 0)])
+    affine_points = np.where(on_affine)[0]
+    if len(affine_points) > 0:
+        local_focal = affine_table.pixelsToFocal(xPix[affine_points], yPix[affine_points],
+                                                 det_codes[affine_points],
+                                                 pixelConvention=pixelConvention)
+        xFocal[affine_points] = local_focal[0]
+        yFocal[affine_points] = local_focal[1]
+
+    if len(affine_points) == len(det_codes):
+        return np.array([xFocal, yFocal])
+
+    name_table = getDetectorNameTable(camera)
+    afw_codes = np.where(on_affine, -1, det_codes)
+    index_groups = _groupIndicesByCode(afw_codes+1, len(name_table)+1)
+
+    for name, valid_points in zip(name_table, index_groups[1:]):
+        if len(valid_points) == 0:
+            continue
+
+        pixelsToFocal = transform_cache.getTransform(camera, pixelType, FOCAL_PLANE,
+                                                     detectorName=name)
+        xLocal = xPix[valid_points]
+        yLocal = yPix[valid_points]
+        if pixelConvention == 'camera':
+            xLocal, yLocal = _dmPixFromCameraPix(xLocal, yLocal, det_codes[valid_points], camera)
+        local_focal = _transformArrays(pixelsToFocal, xLocal, yLocal)
+
+        xFocal[valid_points] = local_focal[0]
+        yFocal[valid_points] = local_focal[1]
+
+    return np.array([xFocal, yFocal])
 
 
 def pixelCoordsFromPupilCoords(xPupil, yPupil, chipName=None,
-                               camera=None, includeDistortion=True):
+                               camera=None, includeDistortion=True, pixelConvention='DM'):
     """
     Get the pixel positions (or nan if not on a chip) for objects based
     on their pupil coordinates.
@@ -564,7 +1540,8 @@ def pixelCoordsFromPupilCoords(xPupil, yPupil, chipName=None,
     If a single value, all of the pixel coordinates will be reckoned on the same
     chip.  If None, this method will calculate which chip each(RA, Dec) pair actually
     falls on, and return pixel coordinates for each (RA, Dec) pair on the appropriate
-    chip.  Default is None.
+    chip.  Default is None.  Chips can also be specified by their integer indices in
+    getDetectorNameTable(camera) (-1 meaning no chip).
 
     @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
     This is an optional argument to be passed to chipName.
@@ -575,6 +1552,11 @@ def pixelCoordsFromPupilCoords(xPupil, yPupil, chipName=None,
     estimated optical distortion removed.  See the documentation in afw.cameraGeom for more
     details.
 
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'.  If 'camera',
+    pixel coordinates are returned in the Camera team's convention (Camera +y = DM +x,
+    Camera +x = DM -y, flipped about the detector's central pixel; see
+    DMtoCameraPixelTransformer) rather than the DM convention.
+
     @param [out] a 2-D numpy array in which the first row is the x pixel coordinate
     and the second row is the y pixel coordinate
     """
@@ -583,6 +1565,8 @@ def pixelCoordsFromPupilCoords(xPupil, yPupil, chipName=None,
     chipNameList = _validate_inputs_and_chipname([xPupil, yPupil], ["xPupil", "yPupil"],
                                                  "pixelCoordsFromPupilCoords",
                                                  chipName)
+    _validatePixelConvention(pixelConvention, "pixelCoordsFromPupilCoords")
+
     if includeDistortion:
         pixelType = PIXELS
     else:
@@ -591,59 +1575,49 @@ def pixelCoordsFromPupilCoords(xPupil, yPupil, chipName=None,
     if not camera:
         raise RuntimeError("Camera not specified.  Cannot calculate pixel coordinates.")
 
-    if chipNameList is None:
-        chipNameList = chipNameFromPupilCoords(xPupil, yPupil, camera=camera)
-        if not isinstance(chipNameList, list) and not isinstance(chipNameList, np.ndarray):
-            chipNameList = [chipNameList]
-
-    fieldToFocal = camera.getTransformMap().getTransform(FIELD_ANGLE, FOCAL_PLANE)
+    transform_cache = getCameraTransformCache()
+    fieldToFocal = transform_cache.getTransform(camera, FIELD_ANGLE, FOCAL_PLANE)
 
     if are_arrays:
         if len(xPupil) == 0:
-            return np.array([[],[]])
-        field_point_list = list([geom.Point2D(x,y) for x,y in zip(xPupil, yPupil)])
-        focal_point_list = fieldToFocal.applyForward(field_point_list)
-
-        transform_dict = {}
-        xPix = np.nan*np.ones(len(chipNameList), dtype=float)
-        yPix = np.nan*np.ones(len(chipNameList), dtype=float)
-
-        if not isinstance(chipNameList, np.ndarray):
-            chipNameList = np.array(chipNameList)
-        chipNameList = chipNameList.astype(str)
-
-        for name in np.unique(chipNameList):
-            if name == 'None':
-                continue
-
-            valid_points = np.where(np.char.find(chipNameList, name)==0)
-            local_focal_point_list = list([focal_point_list[dex] for dex in valid_points[0]])
-
-            if name not in transform_dict:
-                transform_dict[name] = camera[name].getTransform(FOCAL_PLANE, pixelType)
+            return np.array([[], []])
+        xPupil, yPupil = _unmaskArrays([xPupil, yPupil])
+        xFocal, yFocal = _transformArrays(fieldToFocal, xPupil, yPupil)
+
+        # find the chips exactly as chipNameFromPupilCoords does
+        if chipNameList is None:
+            det_codes = _chipNameFromCameraCoords(xPupil, yPupil, FIELD_ANGLE, camera,
+                                                  as_detector_index=True)
+        else:
+            det_codes = _detectorIndexFromChipName(chipNameList, camera)
 
-            focalToPixels = transform_dict[name]
-            pixPoint_list = focalToPixels.applyForward(local_focal_point_list)
+        # invalid points are kept off of every chip so that they skip
+        # the per-detector transforms and come out as NaN
+        det_codes = np.where(_validRowMask([xFocal, yFocal]), det_codes, -1).astype(np.int16)
+        return _pixelCoordsFromFocalPlaneCoords(xFocal, yFocal, det_codes, camera, pixelType,
+                                                pixelConvention=pixelConvention)
+    else:
+        if chipNameList is None:
+            chipNameList = [chipNameFromPupilCoords(xPupil, yPupil, camera=camera)]
 
-            for i_fp, v_dex in enumerate(valid_points[0]):
-                pixPoint= pixPoint_list[i_fp]
-                xPix[v_dex] = pixPoint.getX()
-                yPix[v_dex] = pixPoint.getY()
+        if _isDetectorIndex(chipNameList):
+            chipNameList = _chipNameFromDetectorIndex(chipNameList, camera)
 
-        return np.array([xPix, yPix])
-    else:
         if chipNameList[0] is None:
             return np.array([np.NaN, np.NaN])
 
-        det = camera[chipNameList[0]]
-        focalToPixels = det.getTransform(FOCAL_PLANE, pixelType)
-        focalPoint = fieldToFocal.applyForward(geom.Point2D(xPupil, yPupil))
-        pixPoint = focalToPixels.applyForward(focalPoint)
-        return np.array([pixPoint.getX(), pixPoint.getY()])
+        focalToPixels = transform_cache.getTransform(camera, FOCAL_PLANE, pixelType,
+                                                     detectorName=chipNameList[0])
+        focalPoint = _transformArrays(fieldToFocal, np.array([xPupil]), np.array([yPupil]))
+        pixPoint = _transformArrays(focalToPixels, focalPoint[0], focalPoint[1])
+        if pixelConvention == 'camera':
+            det_code = _detectorIndexFromChipName(chipNameList[:1], camera)
+            return _cameraPixFromDMPix(pixPoint[0][0], pixPoint[1][0], det_code[0], camera)
+        return np.array([pixPoint[0][0], pixPoint[1][0]])
 
 
 def pupilCoordsFromPixelCoords(xPix, yPix, chipName, camera=None,
-                               includeDistortion=True):
+                               includeDistortion=True, pixelConvention='DM'):
 
     """
     Convert pixel coordinates into pupil coordinates
@@ -657,7 +1631,8 @@ def pupilCoordsFromPixelCoords(xPix, yPix, chipName, camera=None,
     @param [in] chipName is the name of the chip(s) on which the pixel coordinates
     are defined.  This can be a list (in which case there should be one chip name
     for each (xPix, yPix) coordinate pair), or a single value (in which case, all
-    of the (xPix, yPix) points will be reckoned on that chip).
+    of the (xPix, yPix) points will be reckoned on that chip).  Chips can also be
+    specified by their integer indices in getDetectorNameTable(camera).
 
     @param [in] camera is an afw.CameraGeom.camera object defining the camera
 
@@ -667,6 +1642,10 @@ def pupilCoordsFromPixelCoords(xPix, yPix, chipName, camera=None,
     estimated optical distortion removed.  See the documentation in afw.cameraGeom for more
     details.
 
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'.  If 'camera',
+    xPix and yPix are expected in the Camera team's convention (see
+    pixelCoordsFromPupilCoords) rather than the DM convention.
+
     @param [out] a 2-D numpy array in which the first row is the x pupil coordinate
     and the second row is the y pupil coordinate (both in radians)
     """
@@ -679,48 +1658,54 @@ def pupilCoordsFromPixelCoords(xPix, yPix, chipName, camera=None,
                                                  "pupilCoordsFromPixelCoords",
                                                  chipName,
                                                  chipname_can_be_none=False)
+    _validatePixelConvention(pixelConvention, "pupilCoordsFromPixelCoords")
 
     if includeDistortion:
         pixelType = PIXELS
     else:
         pixelType = TAN_PIXELS
 
-    pixel_to_focal_dict = {}
-    focal_to_field = camera.getTransformMap().getTransform(FOCAL_PLANE, FIELD_ANGLE)
-    for name in chipNameList:
-        if name not in pixel_to_focal_dict and name is not None and name != 'None':
-            pixel_to_focal_dict[name] = camera[name].getTransform(pixelType, FOCAL_PLANE)
+    transform_cache = getCameraTransformCache()
+    focal_to_field = transform_cache.getTransform(camera, FOCAL_PLANE, FIELD_ANGLE)
 
     if are_arrays:
-        xPupilList = []
-        yPupilList = []
-
-        for xx, yy, name in zip(xPix, yPix, chipNameList):
-            if name is None or name == 'None':
-                xPupilList.append(np.NaN)
-                yPupilList.append(np.NaN)
-            else:
-                focalPoint = pixel_to_focal_dict[name].applyForward(geom.Point2D(xx, yy))
-                pupilPoint = focal_to_field.applyForward(focalPoint)
-                xPupilList.append(pupilPoint.getX())
-                yPupilList.append(pupilPoint.getY())
-
-        xPupilList = np.array(xPupilList)
-        yPupilList = np.array(yPupilList)
-
-        return np.array([xPupilList, yPupilList])
+        xPix, yPix = _unmaskArrays([xPix, yPix])
+        det_codes = _detectorIndexFromChipName(chipNameList, camera)
+        pupil = np.full((2, len(det_codes)), np.NaN, dtype=float)
+
+        on_chip = np.where(np.logical_and(det_codes >= 0, _validRowMask([xPix, yPix])))[0]
+        if len(on_chip) == 0:
+            return pupil
+
+        focal = _focalPlaneCoordsFromPixelCoords(xPix[on_chip], yPix[on_chip],
+                                                 det_codes[on_chip], camera, pixelType,
+                                                 pixelConvention=pixelConvention)
+        on_chip_pupil = _transformArrays(focal_to_field, focal[0], focal[1])
+        pupil[0][on_chip] = on_chip_pupil[0]
+        pupil[1][on_chip] = on_chip_pupil[1]
+        return pupil
 
     # if not are_arrays
+    if _isDetectorIndex(chipNameList):
+        chipNameList = _chipNameFromDetectorIndex(chipNameList, camera)
+
     if chipNameList[0] is None or chipNameList[0] == 'None':
         return np.array([np.NaN, np.NaN])
 
-    focalPoint = pixel_to_focal_dict[chipNameList[0]].applyForward(geom.Point2D(xPix, yPix))
-    pupilPoint = focal_to_field.applyForward(focalPoint)
-    return np.array([pupilPoint.getX(), pupilPoint.getY()])
+    if pixelConvention == 'camera':
+        det_code = _detectorIndexFromChipName(chipNameList[:1], camera)
+        xPix, yPix = _dmPixFromCameraPix(xPix, yPix, det_code[0], camera)
+
+    pixel_to_focal = transform_cache.getTransform(camera, pixelType, FOCAL_PLANE,
+                                                  detectorName=chipNameList[0])
+    focalPoint = _transformArrays(pixel_to_focal, np.array([xPix]), np.array([yPix]))
+    pupilPoint = _transformArrays(focal_to_field, focalPoint[0], focalPoint[1])
+    return np.array([pupilPoint[0][0], pupilPoint[1][0]])
 
 
 def raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
-                         obs_metadata=None, epoch=2000.0, includeDistortion=True):
+                         obs_metadata=None, epoch=2000.0, includeDistortion=True,
+                         pixelConvention='DM'):
     """
     Convert pixel coordinates into RA, Dec
 
@@ -733,7 +1718,8 @@ def raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
     @param [in] chipName is the name of the chip(s) on which the pixel coordinates
     are defined.  This can be a list (in which case there should be one chip name
     for each (xPix, yPix) coordinate pair), or a single value (in which case, all
-    of the (xPix, yPix) points will be reckoned on that chip).
+    of the (xPix, yPix) points will be reckoned on that chip).  Chips can also be
+    specified by their integer indices in getDetectorNameTable(camera).
 
     @param [in] camera is an afw.CameraGeom.camera object defining the camera
 
@@ -748,6 +1734,10 @@ def raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
     estimated optical distortion removed.  See the documentation in afw.cameraGeom for more
     details.
 
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'.  If 'camera',
+    xPix and yPix are expected in the Camera team's convention (see
+    pixelCoordsFromPupilCoords) rather than the DM convention.
+
     @param [out] a 2-D numpy array in which the first row is the RA coordinate
     and the second row is the Dec coordinate (both in degrees; in the
     International Celestial Reference System)
@@ -758,13 +1748,15 @@ def raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
     """
     output = _raDecFromPixelCoords(xPix, yPix, chipName,
                                    camera=camera, obs_metadata=obs_metadata,
-                                   epoch=epoch, includeDistortion=includeDistortion)
+                                   epoch=epoch, includeDistortion=includeDistortion,
+                                   pixelConvention=pixelConvention)
 
     return np.degrees(output)
 
 
 def _raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
-                          obs_metadata=None, epoch=2000.0, includeDistortion=True):
+                          obs_metadata=None, epoch=2000.0, includeDistortion=True,
+                          pixelConvention='DM'):
     """
     Convert pixel coordinates into RA, Dec
 
@@ -777,7 +1769,8 @@ def _raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
     @param [in] chipName is the name of the chip(s) on which the pixel coordinates
     are defined.  This can be a list (in which case there should be one chip name
     for each (xPix, yPix) coordinate pair), or a single value (in which case, all
-    of the (xPix, yPix) points will be reckoned on that chip).
+    of the (xPix, yPix) points will be reckoned on that chip).  Chips can also be
+    specified by their integer indices in getDetectorNameTable(camera).
 
     @param [in] camera is an afw.CameraGeom.camera object defining the camera
 
@@ -792,6 +1785,10 @@ def _raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
     estimated optical distortion removed.  See the documentation in afw.cameraGeom for more
     details.
 
+    @param [in] pixelConvention is either 'DM' (default) or 'camera'.  If 'camera',
+    xPix and yPix are expected in the Camera team's convention (see
+    pixelCoordsFromPupilCoords) rather than the DM convention.
+
     @param [out] a 2-D numpy array in which the first row is the RA coordinate
     and the second row is the Dec coordinate (both in radians; in the International
     Celestial Reference System)
@@ -824,7 +1821,9 @@ def _raDecFromPixelCoords(xPix, yPix, chipName, camera=None,
         raise RuntimeError("The ObservationMetaData in raDecFromPixelCoords must have a rotSkyPos")
 
     xPupilList, yPupilList = pupilCoordsFromPixelCoords(xPix, yPix, chipNameList,
-                                                        camera=camera, includeDistortion=includeDistortion)
+                                                        camera=camera,
+                                                        includeDistortion=includeDistortion,
+                                                        pixelConvention=pixelConvention)
 
     raOut, decOut = _raDecFromPupilCoords(xPupilList, yPupilList,
                                           obs_metadata=obs_metadata, epoch=epoch)
@@ -945,16 +1944,17 @@ def _focalPlaneCoordsFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None,
         raise RuntimeError("You need to pass an ObservationMetaData with a "
                            "rotSkyPos into focalPlaneCoordsFromRaDec")
 
-    xPupil, yPupil = _pupilCoordsFromRaDec(ra, dec,
-                                           pm_ra=pm_ra, pm_dec=pm_dec,
-                                           parallax=parallax, v_rad=v_rad,
-                                           obs_metadata=obs_metadata,
-                                           epoch=epoch)
+    xPupil, yPupil = _pupilCoordsFromValidRaDec(ra, dec,
+                                                pm_ra=pm_ra, pm_dec=pm_dec,
+                                                parallax=parallax, v_rad=v_rad,
+                                                obs_metadata=obs_metadata,
+                                                epoch=epoch)
 
     return focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=camera)
 
 
-def focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=None):
+def focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=None, use_surrogate=False,
+                                    surrogate_tolerance=1.0e-4):
     """
     Get the focal plane coordinates for all objects in the catalog.
 
@@ -966,6 +1966,16 @@ def focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=None):
 
     @param [in] camera is an afw.cameraGeom camera object
 
+    @param [in] use_surrogate is a boolean (default False).  If True and the inputs
+    are numpy arrays, the transformation is evaluated with a Chebyshev polynomial
+    fit to the camera's distortion (see ChebyshevTransformSurrogate) rather than
+    with afw.  If the fit cannot meet surrogate_tolerance, afw is used.
+
+    @param [in] surrogate_tolerance is the largest error, in pixels, allowed
+    for the polynomial fit at the points where it is checked (default 1.0e-4);
+    the bound is empirical (see ChebyshevTransformSurrogate).  Points outside
+    of the fitted circle are transformed with afw.
+
     @param [out] a 2-D numpy array in which the first row is the x
     focal plane coordinate and the second row is the y focal plane
     coordinate (both in millimeters)
@@ -977,22 +1987,22 @@ def focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=None):
     if camera is None:
         raise RuntimeError("You cannot calculate focal plane coordinates without specifying a camera")
 
-    field_to_focal = camera.getTransformMap().getTransform(FIELD_ANGLE, FOCAL_PLANE)
+    field_to_focal = getCameraTransformCache().getTransform(camera, FIELD_ANGLE, FOCAL_PLANE)
 
     if are_arrays:
-        pupil_point_list = [geom.Point2D(x,y) for x,y in zip(xPupil, yPupil)]
-        focal_point_list = field_to_focal.applyForward(pupil_point_list)
-        xFocal = np.array([pp.getX() for pp in focal_point_list])
-        yFocal = np.array([pp.getY() for pp in focal_point_list])
-
-        return np.array([xFocal, yFocal])
+        xPupil, yPupil = _unmaskArrays([xPupil, yPupil])
+        if use_surrogate:
+            return _surrogateTransformArrays(camera, FIELD_ANGLE, FOCAL_PLANE,
+                                             xPupil, yPupil, surrogate_tolerance)
+        return _transformArrays(field_to_focal, xPupil, yPupil)
 
     # if not are_arrays
-    fpPoint = field_to_focal.applyForward(geom.Point2D(xPupil, yPupil))
-    return np.array([fpPoint.getX(), fpPoint.getY()])
+    fpPoint = _transformArrays(field_to_focal, np.array([xPupil]), np.array([yPupil]))
+    return np.array([fpPoint[0][0], fpPoint[1][0]])
 
 
-def pupilCoordsFromFocalPlaneCoords(xFocal, yFocal, camera=None):
+def pupilCoordsFromFocalPlaneCoords(xFocal, yFocal, camera=None, use_surrogate=False,
+                                    surrogate_tolerance=1.0e-4):
     """
     Get the pupil coordinates in radians from the focal plane
     coordinates in millimeters
@@ -1005,6 +2015,16 @@ def pupilCoordsFromFocalPlaneCoords(xFocal, yFocal, camera=None):
 
     @param [in] camera is an afw.cameraGeom camera object
 
+    @param [in] use_surrogate is a boolean (default False).  If True and the inputs
+    are numpy arrays, the transformation is evaluated with a Chebyshev polynomial
+    fit to the inverse of the camera's distortion (see ChebyshevTransformSurrogate)
+    rather than with afw.  If the fit cannot meet surrogate_tolerance, afw is used.
+
+    @param [in] surrogate_tolerance is the largest error, in pixels on the focal
+    plane, allowed for the polynomial fit at the points where it is checked
+    (default 1.0e-4); the bound is empirical (see ChebyshevTransformSurrogate).
+    Points outside of the fitted circle are transformed with afw.
+
     @param [out] a 2-D numpy array in which the first row is the x
     pupil coordinate and the second row is the y pupil
     coordinate (both in radians)
@@ -1017,22 +2037,247 @@ def pupilCoordsFromFocalPlaneCoords(xFocal, yFocal, camera=None):
     if camera is None:
         raise RuntimeError("You cannot calculate pupil coordinates without specifying a camera")
 
-    focal_to_field = camera.getTransformMap().getTransform(FOCAL_PLANE, FIELD_ANGLE)
+    focal_to_field = getCameraTransformCache().getTransform(camera, FOCAL_PLANE, FIELD_ANGLE)
 
     if are_arrays:
-        focal_point_list = [geom.Point2D(x,y) for x,y in zip(xFocal, yFocal)]
-        pupil_point_list = focal_to_field.applyForward(focal_point_list)
-        pupil_arr = np.array([[pp.getX(), pp.getY()]
-                              for pp in pupil_point_list]).transpose()
-        is_nan = np.where(np.logical_or(np.isnan(xFocal), np.isnan(yFocal)))
-        pupil_arr[0][is_nan] = np.NaN
-        pupil_arr[1][is_nan] = np.NaN
-
-        return pupil_arr
+        xFocal, yFocal = _unmaskArrays([xFocal, yFocal])
+        if use_surrogate:
+            return _surrogateTransformArrays(camera, FOCAL_PLANE, FIELD_ANGLE,
+                                             xFocal, yFocal, surrogate_tolerance)
+        return _transformArrays(focal_to_field, xFocal, yFocal)
 
     # if not are_arrays
-    if np.isfinite(xFocal) and np.isfinite(yFocal):
-        pupPoint = focal_to_field.applyForward(geom.Point2D(xFocal, yFocal))
-        return np.array([pupPoint.getX(), pupPoint.getY()])
+    pupPoint = _transformArrays(focal_to_field, np.array([xFocal]), np.array([yFocal]))
+    return np.array([pupPoint[0][0], pupPoint[1][0]])
+
+
+_projection_columns = ('xPupil', 'yPupil', 'chipName', 'detectorIndex',
+                       'xFocal', 'yFocal', 'xPix', 'yPix')
+
+
+def projectFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                     obs_metadata=None, camera=None, epoch=2000.0,
+                     columns=('chipName', 'xPix', 'yPix'), includeDistortion=True):
+    """
+    Compute several focal plane quantities for objects based on their
+    RA and Dec (in degrees) in a single pass.
+
+    @param [in] ra is in degrees in the International Celestial Reference System.
+    Can be either a float or a numpy array.
+
+    @param [in] dec is in degrees in the International Celestial Reference System.
+    Can be either a float or a numpy array.
+
+    @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (arcsec/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] pm_dec is proper motion in dec (arcsec/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] parallax is parallax in arcsec
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] v_rad is radial velocity (km/s)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] obs_metadata is an ObservationMetaData characterizing the telescope
+    pointing.
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which
+    RA is measured.  Default is 2000.
+
+    @param [in] columns is a list of the quantities to compute; see
+    projectFromPupilCoords for the allowed values.
+
+    @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+    will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+    @param [out] a dict keyed on the entries in columns
+    """
+    if pm_ra is not None:
+        pm_ra_out = radiansFromArcsec(pm_ra)
+    else:
+        pm_ra_out = None
+
+    if pm_dec is not None:
+        pm_dec_out = radiansFromArcsec(pm_dec)
+    else:
+        pm_dec_out = None
+
+    if parallax is not None:
+        parallax_out = radiansFromArcsec(parallax)
+    else:
+        parallax_out = None
+
+    return _projectFromRaDec(np.radians(ra), np.radians(dec),
+                             pm_ra=pm_ra_out, pm_dec=pm_dec_out,
+                             parallax=parallax_out, v_rad=v_rad,
+                             obs_metadata=obs_metadata, camera=camera,
+                             epoch=epoch, columns=columns,
+                             includeDistortion=includeDistortion)
+
+
+def _projectFromRaDec(ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                      obs_metadata=None, camera=None, epoch=2000.0,
+                      columns=('chipName', 'xPix', 'yPix'), includeDistortion=True):
+    """
+    Compute several focal plane quantities for objects based on their
+    RA and Dec (in radians) in a single pass.
+
+    The pupil coordinates are computed once and the FIELD_ANGLE to
+    FOCAL_PLANE transformation is evaluated once; the chip each object
+    lands on is found from those focal plane coordinates.  Only the
+    intermediate quantities needed for the requested columns are computed.
+
+    @param [in] ra is in radians in the International Celestial Reference System.
+    Can be either a float or a numpy array.
+
+    @param [in] dec is in radians in the International Celestial Reference System.
+    Can be either a float or a numpy array.
+
+    @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (radians/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] pm_dec is proper motion in dec (radians/yr)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] parallax is parallax in radians
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] v_rad is radial velocity (km/s)
+    Can be a numpy array or a number or None (default=None).
+
+    @param [in] obs_metadata is an ObservationMetaData characterizing the telescope
+    pointing.
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which
+    RA is measured.  Default is 2000.
+
+    @param [in] columns is a list of the quantities to compute; see
+    projectFromPupilCoords for the allowed values.
+
+    @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+    will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+    @param [out] a dict keyed on the entries in columns
+    """
+
+    _validate_inputs([ra, dec], ['ra', 'dec'], 'projectFromRaDec')
+
+    if epoch is None:
+        raise RuntimeError("You need to pass an epoch into projectFromRaDec")
+
+    if obs_metadata is None:
+        raise RuntimeError("You need to pass an ObservationMetaData into projectFromRaDec")
+
+    if obs_metadata.mjd is None:
+        raise RuntimeError("You need to pass an ObservationMetaData with an mjd into "
+                           "projectFromRaDec")
+
+    if obs_metadata.rotSkyPos is None:
+        raise RuntimeError("You need to pass an ObservationMetaData with a rotSkyPos into "
+                           "projectFromRaDec")
+
+    xPupil, yPupil = _pupilCoordsFromValidRaDec(ra, dec,
+                                                pm_ra=pm_ra, pm_dec=pm_dec,
+                                                parallax=parallax, v_rad=v_rad,
+                                                obs_metadata=obs_metadata, epoch=epoch)
+
+    return projectFromPupilCoords(xPupil, yPupil, camera=camera, columns=columns,
+                                  includeDistortion=includeDistortion)
+
+
+def projectFromPupilCoords(xPupil, yPupil, camera=None, columns=('chipName', 'xPix', 'yPix'),
+                           includeDistortion=True):
+    """
+    Compute several focal plane quantities for objects based on their
+    pupil coordinates in a single pass.
+
+    @param [in] xPupil is the x pupil coordinate in radians.
+    Can be either a float or a numpy array.
+
+    @param [in] yPupil is the y pupil coordinate in radians.
+    Can be either a float or a numpy array.
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] columns is a list of the quantities to compute.  Allowed values are
+
+        'xPupil', 'yPupil' -- the pupil coordinates in radians
+        'chipName' -- the name of the chip each object lands on (None if none),
+                      as returned by chipNameFromPupilCoords
+        'detectorIndex' -- the index of that chip in getDetectorNameTable(camera)
+                           (-1 if none)
+        'xFocal', 'yFocal' -- the focal plane coordinates in mm
+        'xPix', 'yPix' -- the pixel coordinates on the chip each object
+                          lands on (NaN if none)
+
+    Objects that land on more than one chip are assigned to the first of
+    them (and a MultipleChipWarning is emitted).
+
+    @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+    will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+    @param [out] a dict keyed on the entries in columns.  Values will be
+    numpy arrays if xPupil and yPupil were numpy arrays.
+    """
+
+    are_arrays = _validate_inputs([xPupil, yPupil], ['xPupil', 'yPupil'],
+                                  'projectFromPupilCoords')
+
+    if camera is None:
+        raise RuntimeError("You cannot call projectFromPupilCoords without specifying a camera")
+
+    unknown_columns = [cc for cc in columns if cc not in _projection_columns]
+    if len(unknown_columns) > 0:
+        raise RuntimeError("projectFromPupilCoords does not know how to compute %s.\n"
+                           % str(unknown_columns) +
+                           "Allowed columns are %s" % str(_projection_columns))
+
+    if includeDistortion:
+        pixelType = PIXELS
+    else:
+        pixelType = TAN_PIXELS
+
+    if not are_arrays:
+        xPupil = np.array([xPupil])
+        yPupil = np.array([yPupil])
+    else:
+        xPupil, yPupil = _unmaskArrays([xPupil, yPupil])
+
+    need_pix = 'xPix' in columns or 'yPix' in columns
+    need_chips = need_pix or 'chipName' in columns or 'detectorIndex' in columns
+    need_focal = need_pix or 'xFocal' in columns or 'yFocal' in columns
+
+    output = {}
+    output['xPupil'] = xPupil
+    output['yPupil'] = yPupil
+
+    if need_focal:
+        field_to_focal = getCameraTransformCache().getTransform(camera, FIELD_ANGLE, FOCAL_PLANE)
+        xFocal, yFocal = _transformArrays(field_to_focal, xPupil, yPupil)
+        output['xFocal'] = xFocal
+        output['yFocal'] = yFocal
+
+    if need_chips:
+        det_codes = _chipNameFromCameraCoords(xPupil, yPupil, FIELD_ANGLE, camera,
+                                              as_detector_index=True)
+        output['detectorIndex'] = det_codes
+        if 'chipName' in columns:
+            output['chipName'] = _chipNameFromDetectorIndex(det_codes, camera)
+
+    if need_pix:
+        xPix, yPix = _pixelCoordsFromFocalPlaneCoords(xFocal, yFocal, det_codes,
+                                                      camera, pixelType)
+        output['xPix'] = xPix
+        output['yPix'] = yPix
+
+    if not are_arrays:
+        return dict((cc, output[cc][0] if cc != 'detectorIndex' else int(output[cc][0]))
+                    for cc in columns)
 
-    return np.array([np.NaN, np.NaN])
+    return dict((cc, output[cc]) for cc in columns)
@@ -0,0 +1,267 @@
+import numpy as np
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _field_angle_sys as FIELD_ANGLE
+from lsst.sims.coordUtils.CameraUtils import _cameraBoundingRadius
+from lsst.sims.coordUtils.CameraUtils import _chipNameFromRaDec, _projectFromRaDec
+from lsst.sims.coordUtils.CameraUtils import _validate_inputs, radiansFromArcsec
+
+__all__ = ["CatalogSpatialIndex"]
+
+
+class CatalogSpatialIndex(object):
+    """
+    A spatial index over a static catalog, so that the sources seen in a
+    visit can be projected onto the camera without touching the rest of
+    the catalog.
+
+    The sky is divided into bands of declination ('zones'); within each
+    zone the sources are sorted by RA.  A circle on the sky is queried by
+    binary searching the RA range it spans in each zone it overlaps, then
+    testing the angular separation of the few sources found.  The cost of
+    a query depends on the number of sources near the circle, not on the
+    size of the catalog.
+
+    Sources are indexed at their catalog positions.  The margin passed to
+    the per-visit methods must be large enough to cover any proper motion
+    between the catalog epoch and the visit.
+    """
+
+    def __init__(self, ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                 zone_height=0.25):
+        """
+        @param [in] ra is a numpy array of RA in degrees
+        (International Celestial Reference System)
+
+        @param [in] dec is a numpy array of Dec in degrees
+        (International Celestial Reference System)
+
+        @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (arcsec/yr)
+        Can be a numpy array, a number or None (default=None).
+
+        @param [in] pm_dec is proper motion in dec (arcsec/yr)
+        Can be a numpy array, a number or None (default=None).
+
+        @param [in] parallax is parallax in arcsec
+        Can be a numpy array, a number or None (default=None).
+
+        @param [in] v_rad is radial velocity (km/s)
+        Can be a numpy array, a number or None (default=None).
+
+        @param [in] zone_height is the height of the declination zones in degrees
+        (default 0.25)
+        """
+        are_arrays = _validate_inputs([ra, dec], ['ra', 'dec'], 'CatalogSpatialIndex')
+        if not are_arrays:
+            raise RuntimeError("CatalogSpatialIndex needs numpy arrays of RA and Dec")
+
+        if zone_height <= 0.0:
+            raise RuntimeError("zone_height must be positive")
+
+        self._ra = np.radians(ra) % (2.0*np.pi)
+        self._dec = np.radians(dec)
+        self._pm_ra = radiansFromArcsec(pm_ra) if pm_ra is not None else None
+        self._pm_dec = radiansFromArcsec(pm_dec) if pm_dec is not None else None
+        self._parallax = radiansFromArcsec(parallax) if parallax is not None else None
+        self._v_rad = v_rad
+
+        self._zone_height = np.radians(zone_height)
+        self._n_zones = int(np.ceil(np.pi/self._zone_height))
+        zone = self._zoneIndex(self._dec)
+
+        self._order = np.lexsort((self._ra, zone))
+        self._ra_sorted = self._ra[self._order]
+        self._dec_sorted = self._dec[self._order]
+        self._zone_start = np.searchsorted(zone[self._order], np.arange(self._n_zones+1))
+
+    def __len__(self):
+        return len(self._ra)
+
+    def _zoneIndex(self, dec):
+        zone = np.floor((np.asarray(dec) + 0.5*np.pi)/self._zone_height).astype(np.int64)
+        return np.clip(zone, 0, self._n_zones-1)
+
+    def query(self, ra, dec, radius):
+        """
+        Find the sources within a circle on the sky
+
+        @param [in] ra is the RA of the center of the circle in degrees
+
+        @param [in] dec is the Dec of the center of the circle in degrees
+
+        @param [in] radius is the radius of the circle in degrees
+
+        @param [out] a sorted numpy array of the indices of the sources
+        (in the input catalog) inside the circle
+        """
+        return self._query(np.radians(ra), np.radians(dec), np.radians(radius))
+
+    def _query(self, ra, dec, radius):
+        """
+        Find the sources within a circle on the sky
+
+        @param [in] ra is the RA of the center of the circle in radians
+
+        @param [in] dec is the Dec of the center of the circle in radians
+
+        @param [in] radius is the radius of the circle in radians
+
+        @param [out] a sorted numpy array of the indices of the sources
+        (in the input catalog) inside the circle
+        """
+        ra = ra % (2.0*np.pi)
+        if np.abs(dec) + radius >= 0.5*np.pi:
+            ra_ranges = [(0.0, 2.0*np.pi)]
+        else:
+            half_width = np.arcsin(min(1.0, np.sin(radius)/np.cos(dec)))
+            ra_min = ra - half_width
+            ra_max = ra + half_width
+            if ra_min < 0.0:
+                ra_ranges = [(ra_min + 2.0*np.pi, 2.0*np.pi), (0.0, ra_max)]
+            elif ra_max > 2.0*np.pi:
+                ra_ranges = [(ra_min, 2.0*np.pi), (0.0, ra_max - 2.0*np.pi)]
+            else:
+                ra_ranges = [(ra_min, ra_max)]
+
+        zone_min = self._zoneIndex(max(dec - radius, -0.5*np.pi))
+        zone_max = self._zoneIndex(min(dec + radius, 0.5*np.pi))
+
+        candidate_list = []
+        for zone in range(zone_min, zone_max+1):
+            start = self._zone_start[zone]
+            stop = self._zone_start[zone+1]
+            if start == stop:
+                continue
+            ra_zone = self._ra_sorted[start:stop]
+            for ra_lo, ra_hi in ra_ranges:
+                lo = np.searchsorted(ra_zone, ra_lo, side='left')
+                hi = np.searchsorted(ra_zone, ra_hi, side='right')
+                if hi > lo:
+                    candidate_list.append(np.arange(start+lo, start+hi))
+
+        if len(candidate_list) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        candidates = np.concatenate(candidate_list)
+        cos_dist = (np.sin(self._dec_sorted[candidates])*np.sin(dec) +
+                    np.cos(self._dec_sorted[candidates])*np.cos(dec) *
+                    np.cos(self._ra_sorted[candidates] - ra))
+        valid = np.where(cos_dist >= np.cos(radius))
+        return np.sort(self._order[candidates[valid]])
+
+    def fieldIndices(self, obs_metadata, camera, margin=0.1):
+        """
+        Find the sources within the field of view of a visit
+
+        @param [in] obs_metadata is an ObservationMetaData characterizing the telescope pointing
+
+        @param [in] camera is an afw.cameraGeom camera instance characterizing the camera
+
+        @param [in] margin is the distance in degrees beyond the edge of the camera within
+        which sources are returned (default 0.1)
+
+        @param [out] a sorted numpy array of the indices of the sources
+        (in the input catalog) within the field of view
+        """
+        if obs_metadata is None:
+            raise RuntimeError("You need to pass an ObservationMetaData into CatalogSpatialIndex")
+
+        if camera is None:
+            raise RuntimeError("You cannot query a CatalogSpatialIndex without specifying a camera")
+
+        radius = _cameraBoundingRadius(camera, FIELD_ANGLE) + np.radians(margin)
+        return self._query(obs_metadata._pointingRA, obs_metadata._pointingDec, radius)
+
+    def _subset(self, indices):
+        """
+        Return the RA, Dec, proper motion, parallax and radial velocity
+        of a subset of the sources
+        """
+        out = [self._ra[indices], self._dec[indices]]
+        for arr in (self._pm_ra, self._pm_dec, self._parallax, self._v_rad):
+            if arr is None:
+                out.append(None)
+            else:
+                # scalars apply to every source
+                out.append(np.broadcast_to(arr, self._ra.shape)[indices])
+        return out
+
+    def chipNameFromRaDec(self, obs_metadata, camera, epoch=2000.0,
+                          allow_multiple_chips=False, as_detector_index=False, margin=0.1):
+        """
+        Find the sources that land on a detector in a visit, and their detectors.
+        Only the sources within the visit's field of view are transformed.
+
+        @param [in] obs_metadata is an ObservationMetaData characterizing the telescope pointing
+
+        @param [in] camera is an afw.cameraGeom camera instance characterizing the camera
+
+        @param [in] epoch is the epoch in Julian years of the equinox against which RA and Dec are
+        measured.  Default is 2000.
+
+        @param [in] allow_multiple_chips is a boolean (default False); see chipNameFromRaDec
+
+        @param [in] as_detector_index is a boolean (default False).  If True, detectors are
+        returned as an int16 numpy array of indices into getDetectorNameTable(camera).
+
+        @param [in] margin is the distance in degrees beyond the edge of the camera within
+        which sources are projected (default 0.1)
+
+        @param [out] a numpy array of the indices of the sources (in the input catalog) that
+        land on a detector
+
+        @param [out] a numpy array of the names (or indices) of the detectors they land on
+        """
+        indices = self.fieldIndices(obs_metadata, camera, margin)
+        if len(indices) == 0:
+            return indices, np.zeros(0, dtype=np.int16 if as_detector_index else object)
+
+        ra, dec, pm_ra, pm_dec, parallax, v_rad = self._subset(indices)
+        chip_names = _chipNameFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                        parallax=parallax, v_rad=v_rad,
+                                        obs_metadata=obs_metadata, camera=camera, epoch=epoch,
+                                        allow_multiple_chips=allow_multiple_chips,
+                                        as_detector_index=as_detector_index)
+        if as_detector_index:
+            on_chip = np.where(chip_names >= 0)
+        else:
+            on_chip = np.where(np.not_equal(chip_names, None))
+        return indices[on_chip], chip_names[on_chip]
+
+    def pixelCoordsFromRaDec(self, obs_metadata, camera, epoch=2000.0,
+                             includeDistortion=True, margin=0.1):
+        """
+        Find the sources that land on a detector in a visit, and their pixel
+        coordinates on that detector.  Only the sources within the visit's field
+        of view are transformed.
+
+        @param [in] obs_metadata is an ObservationMetaData characterizing the telescope pointing
+
+        @param [in] camera is an afw.cameraGeom camera instance characterizing the camera
+
+        @param [in] epoch is the epoch in Julian years of the equinox against which RA and Dec are
+        measured.  Default is 2000.
+
+        @param [in] includeDistortion is a boolean.  If True (default), return true pixel
+        coordinates; if False, return TAN_PIXEL coordinates.
+
+        @param [in] margin is the distance in degrees beyond the edge of the camera within
+        which sources are projected (default 0.1)
+
+        @param [out] a numpy array of the indices of the sources (in the input catalog) that
+        land on a detector
+
+        @param [out] a 2-D numpy array in which the first row is the x pixel coordinate
+        and the second row is the y pixel coordinate of those sources
+        """
+        indices = self.fieldIndices(obs_metadata, camera, margin)
+        if len(indices) == 0:
+            return indices, np.zeros((2, 0), dtype=float)
+
+        ra, dec, pm_ra, pm_dec, parallax, v_rad = self._subset(indices)
+        projected = _projectFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                      parallax=parallax, v_rad=v_rad,
+                                      obs_metadata=obs_metadata, camera=camera, epoch=epoch,
+                                      columns=('detectorIndex', 'xPix', 'yPix'),
+                                      includeDistortion=includeDistortion)
+        on_chip = np.where(projected['detectorIndex'] >= 0)
+        return indices[on_chip], np.array([projected['xPix'][on_chip],
+                                           projected['yPix'][on_chip]])
@@ -0,0 +1,148 @@
+import numpy as np
+from lsst.sims.coordUtils.CameraTransformCacheUtils import getCameraTransformCache, _sysName
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _field_angle_sys as FIELD_ANGLE
+from lsst.sims.coordUtils.CameraUtils import _cameraBoundingRadius, _detectorHitsFromCameraCoords
+
+__all__ = ["ChipLookupGrid", "getChipLookupGrid"]
+
+
+class ChipLookupGrid(object):
+    """
+    A raster of detector indices (see getDetectorNameTable) covering
+    the footprint of a camera in one of its coordinate systems.
+
+    The grid is a square of n_cells x n_cells cells just containing the
+    circle that bounds every detector.  A cell is assigned a detector index
+    only if all four of its vertices land on that detector alone (or -1 if
+    all four land on no detector).  Cells whose vertices disagree -- i.e.
+    cells that straddle a detector edge or chip gap, or that contain points
+    falling on more than one detector -- are marked AMBIGUOUS, as is every
+    cell adjacent to one of them to allow for the curvature of detector
+    edges in distorted coordinate systems.  Points in AMBIGUOUS cells must
+    be tested against the detectors exactly.
+    """
+
+    AMBIGUOUS = -2
+
+    def __init__(self, camera, cameraSys=FIELD_ANGLE, n_cells=1024):
+        """
+        @param [in] camera is an afwCameraGeom camera object
+
+        @param [in] cameraSys is the coordinate system in which the grid is
+        defined (default FIELD_ANGLE, i.e. pupil coordinates)
+
+        @param [in] n_cells is the number of cells along each side of the grid.
+        Memory scales as n_cells**2; the fraction of points that need the exact
+        test scales as 1/n_cells.
+        """
+        if n_cells < 2:
+            raise RuntimeError("ChipLookupGrid needs n_cells >= 2; you gave %d" % n_cells)
+
+        self._cameraSys = cameraSys
+        self._n_cells = n_cells
+        radius = _cameraBoundingRadius(camera, cameraSys)
+        self._min = -radius
+        self._cell_size = 2.0*radius/n_cells
+
+        vertex_1d = self._min + self._cell_size*np.arange(n_cells+1)
+        x_vertex, y_vertex = np.meshgrid(vertex_1d, vertex_1d)
+        vertex_codes = self._findVertexCodes(camera, x_vertex.ravel(), y_vertex.ravel())
+        vertex_codes = vertex_codes.reshape(n_cells+1, n_cells+1)
+
+        # a cell is only unambiguous if all four of its vertices agree
+        grid = vertex_codes[:-1, :-1].copy()
+        ambiguous = (grid == self.AMBIGUOUS)
+        for corner in (vertex_codes[1:, :-1], vertex_codes[:-1, 1:], vertex_codes[1:, 1:]):
+            ambiguous |= (corner != grid)
+
+        # dilate the ambiguous region by one cell in every direction
+        dilated = ambiguous.copy()
+        dilated[1:, :] |= ambiguous[:-1, :]
+        dilated[:-1, :] |= ambiguous[1:, :]
+        ambiguous = dilated.copy()
+        dilated[:, 1:] |= ambiguous[:, :-1]
+        dilated[:, :-1] |= ambiguous[:, 1:]
+
+        grid[dilated] = self.AMBIGUOUS
+        grid.setflags(write=False)
+        self._grid = grid
+
+    def _findVertexCodes(self, camera, x_vertex, y_vertex):
+        """
+        Find the detector index of every grid vertex, using the same exact
+        test (_detectorHitsFromCameraCoords) that is applied to the points
+        in AMBIGUOUS cells.  Vertices landing on more than one detector are
+        assigned AMBIGUOUS.
+        """
+        offsets, indices = _detectorHitsFromCameraCoords(x_vertex, y_vertex,
+                                                         self._cameraSys, camera)
+        n_hits = np.diff(offsets)
+        codes = np.full(len(x_vertex), -1, dtype=np.int16)
+        one_hit = np.where(n_hits == 1)
+        codes[one_hit] = indices[offsets[:-1][one_hit]]
+        codes[np.where(n_hits > 1)] = self.AMBIGUOUS
+        return codes
+
+    @property
+    def cameraSys(self):
+        return self._cameraSys
+
+    @property
+    def n_cells(self):
+        return self._n_cells
+
+    @property
+    def grid(self):
+        """
+        The read-only (n_cells, n_cells) int16 array of detector indices;
+        the first index is y, the second is x
+        """
+        return self._grid
+
+    @property
+    def ambiguous_fraction(self):
+        """
+        The fraction of grid cells that require the exact detector test
+        """
+        return (self._grid == self.AMBIGUOUS).sum()/float(self._grid.size)
+
+    def lookup(self, xCoord, yCoord):
+        """
+        Look up the detectors on which points land.
+
+        @param [in] xCoord is a numpy array of x coordinates in self.cameraSys
+
+        @param [in] yCoord is a numpy array of y coordinates in self.cameraSys
+
+        @param [out] an int16 numpy array of detector indices (see
+        getDetectorNameTable); -1 for points on no detector (including NaNs)
+        and AMBIGUOUS for points that need to be tested exactly
+        """
+        codes = np.full(len(xCoord), -1, dtype=np.int16)
+        with np.errstate(invalid='ignore'):
+            ix = np.floor((np.asarray(xCoord) - self._min)/self._cell_size)
+            iy = np.floor((np.asarray(yCoord) - self._min)/self._cell_size)
+            on_grid = np.where((ix >= 0) & (ix < self._n_cells) &
+                               (iy >= 0) & (iy < self._n_cells))[0]
+        codes[on_grid] = self._grid[iy[on_grid].astype(int), ix[on_grid].astype(int)]
+        return codes
+
+
+def getChipLookupGrid(camera, cameraSys=FIELD_ANGLE, n_cells=1024):
+    """
+    Return the ChipLookupGrid for a camera, building it on first use.
+    Grids are cached in the CameraTransformCache.
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [in] cameraSys is the coordinate system in which the grid is
+    defined (default FIELD_ANGLE, i.e. pupil coordinates)
+
+    @param [in] n_cells is the number of cells along each side of the grid
+    (default 1024)
+    """
+    def factory():
+        return ChipLookupGrid(camera, cameraSys=cameraSys, n_cells=n_cells)
+
+    return getCameraTransformCache().get(camera, ('chip_lookup_grid', _sysName(cameraSys), n_cells),
+                                         factory)
@@ -0,0 +1,290 @@
+import numpy as np
+from numpy.polynomial import chebyshev
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _sysName
+from lsst.sims.coordUtils.CameraTransformCacheUtils import (_field_angle_sys, _focal_plane_sys,
+                                                            _pixels_sys)
+
+__all__ = ["CompiledCamera", "CompiledDetector"]
+
+
+# increment whenever the contents of the compiled camera file change
+_compiled_camera_version = 3
+
+
+class _CompiledPoint(object):
+    """
+    A 2-D point with the getX/getY accessors of a geom.Point2D
+    """
+
+    __slots__ = ('_x', '_y')
+
+    def __init__(self, x, y):
+        self._x = float(x)
+        self._y = float(y)
+
+    def getX(self):
+        return self._x
+
+    def getY(self):
+        return self._y
+
+
+class _CompiledMapping(object):
+    """
+    Stands in for the AST mapping underlying an afw Transform
+    """
+
+    def __init__(self, func):
+        self._func = func
+
+    def applyForward(self, xy):
+        xy = np.asarray(xy, dtype=float)
+        return self._func(xy[0], xy[1])
+
+
+class _CompiledTransform(object):
+    """
+    Stands in for an afw TransformPoint2ToPoint2 using NumPy functions
+    mapping (x, y) arrays onto (2, N) arrays.  Points (anything with getX
+    and getY) are transformed into _CompiledPoints.
+    """
+
+    def __init__(self, forward, inverse):
+        self._forward = forward
+        self._inverse = inverse
+
+    def getMapping(self):
+        return _CompiledMapping(self._forward)
+
+    def getInverse(self):
+        return _CompiledTransform(self._inverse, self._forward)
+
+    def _apply(self, func, point):
+        if isinstance(point, list):
+            if len(point) == 0:
+                return []
+            out = func(np.array([pp.getX() for pp in point]),
+                       np.array([pp.getY() for pp in point]))
+            return [_CompiledPoint(xx, yy) for xx, yy in zip(out[0], out[1])]
+        out = func(np.array([point.getX()]), np.array([point.getY()]))
+        return _CompiledPoint(out[0][0], out[1][0])
+
+    def applyForward(self, point):
+        return self._apply(self._forward, point)
+
+    def applyInverse(self, point):
+        return self._apply(self._inverse, point)
+
+
+def _chebyshevFunc(coeffs, radius):
+    """
+    Return a function evaluating a pair of 2-D Chebyshev series fit over
+    a circle of the given radius (NaN outside of the circle)
+    """
+    def func(xIn, yIn):
+        uu = np.asarray(xIn, dtype=float)/radius
+        vv = np.asarray(yIn, dtype=float)/radius
+        out = np.array([chebyshev.chebval2d(uu, vv, coeffs[0]),
+                        chebyshev.chebval2d(uu, vv, coeffs[1])])
+        with np.errstate(invalid='ignore'):
+            outside = np.where(uu*uu + vv*vv > 1.0)
+        out[0][outside] = np.NaN
+        out[1][outside] = np.NaN
+        return out
+    return func
+
+
+def _affineFunc(matrix):
+    def func(xIn, yIn):
+        xIn = np.asarray(xIn, dtype=float)
+        yIn = np.asarray(yIn, dtype=float)
+        return np.array([matrix[0, 0]*xIn + matrix[0, 1]*yIn + matrix[0, 2],
+                         matrix[1, 0]*xIn + matrix[1, 1]*yIn + matrix[1, 2]])
+    return func
+
+
+def _batchAffine(matrices, xIn, yIn):
+    """
+    Apply a different 2x3 affine matrix to every point
+    """
+    return np.array([matrices[:, 0, 0]*xIn + matrices[:, 0, 1]*yIn + matrices[:, 0, 2],
+                     matrices[:, 1, 0]*xIn + matrices[:, 1, 1]*yIn + matrices[:, 1, 2]])
+
+
+class CompiledDetector(object):
+    """
+    A lightweight detector read from a compiled camera file.  Its accessors
+    mirror those of an afwCameraGeom Detector, but return plain Python and
+    NumPy values rather than afw objects.
+    """
+
+    def __init__(self, compiled_camera, index):
+        self._camera = compiled_camera
+        self._index = index
+
+    def getName(self):
+        return str(self._camera._names[self._index])
+
+    def getId(self):
+        return int(self._camera._det_ids[self._index])
+
+    def getType(self):
+        """
+        The detector's type, as the integer value of lsst.afw.cameraGeom.DetectorType
+        """
+        return int(self._camera._det_types[self._index])
+
+    def getBBox(self):
+        """
+        The (xmin, ymin, xmax, ymax) bounds of the detector in pixels
+        (inclusive, as in afw's Box2I)
+        """
+        return tuple(int(vv) for vv in self._camera._bbox[self._index])
+
+    def getPixelSize(self):
+        """
+        The (x, y) size of the detector's pixels in mm
+        """
+        return tuple(float(vv) for vv in self._camera._pixel_size[self._index])
+
+    def getOrientation(self):
+        """
+        The (yaw, pitch, roll) of the detector in radians
+        """
+        return tuple(float(vv) for vv in self._camera._orientation[self._index])
+
+    def getCorners(self, cameraSys):
+        """
+        A (4, 2) numpy array of the (x, y) of the detector's corners in
+        cameraSys (FIELD_ANGLE or FOCAL_PLANE)
+        """
+        corners = self._camera._corners[self._index]
+        if _sysName(cameraSys) == _focal_plane_sys:
+            return corners.copy()
+        xy = self._camera.getTransform(_focal_plane_sys, cameraSys).getMapping().applyForward(
+            corners.transpose())
+        return xy.transpose()
+
+    def getCenter(self, cameraSys):
+        """
+        The (x, y) of the detector's center in cameraSys
+        (FIELD_ANGLE, FOCAL_PLANE or PIXELS)
+        """
+        center = self._camera._center_mm[self._index]
+        if _sysName(cameraSys) == _focal_plane_sys:
+            return (float(center[0]), float(center[1]))
+        if _sysName(cameraSys) == _pixels_sys:
+            center = self._camera._center_pix[self._index]
+            return (float(center[0]), float(center[1]))
+        xy = self._camera.getTransform(_focal_plane_sys, cameraSys).getMapping().applyForward(
+            center.reshape(2, 1))
+        return (float(xy[0][0]), float(xy[1][0]))
+
+    def getTransform(self, fromSys, toSys):
+        if _sysName(fromSys) == _pixels_sys and _sysName(toSys) == _focal_plane_sys:
+            return _CompiledTransform(_affineFunc(self._camera._affine_inverse[self._index]),
+                                      _affineFunc(self._camera._affine_forward[self._index]))
+        if _sysName(fromSys) == _focal_plane_sys and _sysName(toSys) == _pixels_sys:
+            return _CompiledTransform(_affineFunc(self._camera._affine_forward[self._index]),
+                                      _affineFunc(self._camera._affine_inverse[self._index]))
+        return self._camera.getTransform(fromSys, toSys)
+
+
+class CompiledCamera(object):
+    """
+    A lightweight camera read from a file written by compileCamera.
+
+    Loading it only needs NumPy: neither lsst.obs.lsst nor afw is imported
+    and no afw objects are built.  It provides the parts of the afwCameraGeom
+    Camera API used by lsst.sims.coordUtils (with camera systems compared by
+    name, and detectors looked up by name or by afw detector ID), so it can be
+    passed as the camera to the methods in CameraUtils (e.g. projectFromRaDec),
+    which then run without afw.
+
+    Transformations between FIELD_ANGLE and FOCAL_PLANE are evaluated with
+    the compiled Chebyshev fits; transformations between FOCAL_PLANE and PIXELS
+    are evaluated with the compiled affine matrices.  TAN_PIXELS are not supported.
+
+    The Chebyshev fits only cover the circle bounding the detectors, and there
+    is no afw to fall back on, so points outside of that circle come out as NaN
+    (in FOCAL_PLANE or FIELD_ANGLE, and therefore also in pixels).  They land
+    on no detector, so chip names and pixel coordinates are the same as with
+    afw, but focal plane and pupil coordinates of such points are not.
+    """
+
+    def __init__(self, file_name):
+        """
+        @param [in] file_name is the name of a .npz file written by compileCamera
+        """
+        with np.load(file_name, allow_pickle=False) as data:
+            version = int(data['version'])
+            if version != _compiled_camera_version:
+                raise RuntimeError("%s was written by version %d of compileCamera; "
+                                   "this is version %d.  Please re-compile the camera."
+                                   % (file_name, version, _compiled_camera_version))
+
+            self._name = str(data['camera_name'])
+            self._names = data['names']
+            self._det_ids = data['det_ids']
+            self._det_types = data['det_types']
+            self._bbox = data['bbox']
+            self._pixel_size = data['pixel_size']
+            self._corners = data['corners']
+            self._orientation = data['orientation']
+            self._center_mm = data['center_mm']
+            self._center_pix = data['center_pix']
+            self._affine_forward = data['affine_forward']
+            self._affine_inverse = data['affine_inverse']
+            self._tolerance_pixels = float(data['tolerance_pixels'])
+            field_to_focal = _chebyshevFunc(data['field_to_focal_coeffs'],
+                                            float(data['field_radius']))
+            focal_to_field = _chebyshevFunc(data['focal_to_field_coeffs'],
+                                            float(data['focal_radius']))
+
+        self._field_to_focal = _CompiledTransform(field_to_focal, focal_to_field)
+        self._name_to_index = dict((name, ii) for ii, name in enumerate(self._names))
+        self._id_to_index = dict((int(det_id), ii) for ii, det_id in enumerate(self._det_ids))
+        self._detectors = [CompiledDetector(self, ii) for ii in range(len(self._names))]
+
+        for column in (self._names, self._det_ids, self._det_types, self._bbox,
+                       self._pixel_size, self._corners, self._orientation,
+                       self._affine_forward, self._affine_inverse,
+                       self._center_mm, self._center_pix):
+            column.setflags(write=False)
+
+    @property
+    def tolerance_pixels(self):
+        """
+        The accuracy (in pixels) of the compiled distortion fits, as
+        measured at their check points when they were compiled
+        """
+        return self._tolerance_pixels
+
+    def getName(self):
+        return self._name
+
+    def __len__(self):
+        return len(self._detectors)
+
+    def __iter__(self):
+        return iter(self._detectors)
+
+    def __getitem__(self, key):
+        """
+        Return a CompiledDetector, looked up (as in afw) by its name or,
+        if key is an integer, by its detector ID
+        """
+        if isinstance(key, (int, np.integer)):
+            return self._detectors[self._id_to_index[int(key)]]
+        return self._detectors[self._name_to_index[key]]
+
+    def getTransformMap(self):
+        return self
+
+    def getTransform(self, fromSys, toSys):
+        if _sysName(fromSys) == _field_angle_sys and _sysName(toSys) == _focal_plane_sys:
+            return self._field_to_focal
+        if _sysName(fromSys) == _focal_plane_sys and _sysName(toSys) == _field_angle_sys:
+            return self._field_to_focal.getInverse()
+        raise RuntimeError("CompiledCamera cannot transform from %s to %s"
+                           % (str(fromSys), str(toSys)))
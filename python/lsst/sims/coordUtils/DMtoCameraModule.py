@@ -1,10 +1,8 @@
 import numpy as np
 import lsst.geom as geom
 
-import lsst.obs.lsst.phosim as obs_lsst_phosim
-
-from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS, TAN_PIXELS
-from lsst.afw.cameraGeom import FIELD_ANGLE
+from lsst.sims.coordUtils.CameraUtils import _detectorIndexFromChipName
+from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
 
 
 __all__ = ["DMtoCameraPixelTransformer"]
@@ -12,41 +10,61 @@ __all__ = ["DMtoCameraPixelTransformer"]
 
 class DMtoCameraPixelTransformer(object):
 
-    def __init__(self):
-        self._camera = obs_lsst_phosim.PhosimMapper().camera
+    def __init__(self, camera=None):
+        """
+        @param [in] camera is the afwCameraGeom camera whose detectors are
+        converted.  If None (default), the PhoSim LSST camera is built.
+        Pass the camera you already have to avoid building a second one.
+        """
+        if camera is None:
+            # obs_lsst is slow to import; only import it when it is needed
+            import lsst.obs.lsst.phosim as obs_lsst_phosim
+            camera = obs_lsst_phosim.PhosimMapper().camera
+        self._camera = camera
+
+    def _detectorIndex(self, detector_name):
+        """
+        Return the row of the camera's CameraGeometryTable holding a detector,
+        given its name or its index in getDetectorNameTable(camera)
+        """
+        i_det = int(_detectorIndexFromChipName(np.array([detector_name]), self._camera)[0])
+        if i_det < 0:
+            raise RuntimeError("DMtoCameraPixelTransformer needs a detector; got %s"
+                               % str(detector_name))
+        return i_det
 
     def getBBox(self, detector_name):
         """
         Return the bounding box for the detector named by detector_name
+        (or with that index in getDetectorNameTable(camera))
         """
-        if not hasattr(self, '_bbox_cache'):
-            self._bbox_cache = {}
-
-        if detector_name not in self._bbox_cache:
-            dm_bbox = self._camera[detector_name].getBBox()
-            dm_min = dm_bbox.getMin()
-            dm_max = dm_bbox.getMax()
-            cam_bbox = geom.Box2I(minimum=geom.Point2I(dm_min[1], dm_min[0]),
-                                  maximum=geom.Point2I(dm_max[1], dm_max[0]))
-
-            self._bbox_cache[detector_name] = cam_bbox
-
-        return self._bbox_cache[detector_name]
+        dm_bbox = getCameraGeometryTable(self._camera).bbox[self._detectorIndex(detector_name)]
+        return geom.Box2I(minimum=geom.Point2I(int(dm_bbox[1]), int(dm_bbox[0])),
+                          maximum=geom.Point2I(int(dm_bbox[3]), int(dm_bbox[2])))
 
     def getCenterPixel(self, detector_name):
-         """
-         Return the central pixel for the detector named by detector_name
-         """
-         if not hasattr(self, '_center_pixel_cache'):
-             self._center_pixel_cache = {}
+        """
+        Return the central pixel for the detector named by detector_name
+        (or with that index in getDetectorNameTable(camera))
+        """
+        center_dm = getCameraGeometryTable(self._camera).center_pix[self._detectorIndex(detector_name)]
+        return geom.Point2D(center_dm[1], center_dm[0])
 
-         if detector_name not in self._center_pixel_cache:
-             centerPoint = self._camera[detector_name].getCenter(FOCAL_PLANE)
-             centerPixel_dm = self._camera[detector_name].getTransform(FOCAL_PLANE, PIXELS).applyForward(centerPoint)
-             centerPixel_cam = geom.Point2D(centerPixel_dm.getY(), centerPixel_dm.getX())
-             self._center_pixel_cache[detector_name] = centerPixel_cam
+    def _centerPixelX(self, chipName):
+        """
+        Return the Camera team x coordinate of the central pixel of the
+        detectors in a list or array of chip names (or detector indices)
+        as a numpy array, gathered from the camera's CameraGeometryTable;
+        entries with no chip (None) are NaN.
+        """
+        if not hasattr(self, '_center_pixel_x'):
+            # the Camera team x axis is the DM y axis; index -1 (no chip)
+            # picks up the trailing NaN
+            center_dm = getCameraGeometryTable(self._camera).center_pix
+            self._center_pixel_x = np.append(center_dm[:, 1], np.NaN)
+            self._center_pixel_x.flags.writeable = False
 
-         return self._center_pixel_cache[detector_name]
+        return self._center_pixel_x[_detectorIndexFromChipName(chipName, self._camera)]
 
     def cameraPixFromDMPix(self, dm_xPix, dm_yPix, chipName):
         """
@@ -66,7 +84,8 @@ class DMtoCameraPixelTransformer(object):
         If a single value, all of the pixel coordinates will be reckoned on the same
         chip.  If None, this method will calculate which chip each(RA, Dec) pair actually
         falls on, and return pixel coordinates for each (RA, Dec) pair on the appropriate
-        chip.  Default is None.
+        chip.  Default is None.  Chips can also be specified by their integer indices in
+        lsst.sims.coordUtils.getDetectorNameTable(camera).
 
         Returns
         -------
@@ -77,10 +96,7 @@ class DMtoCameraPixelTransformer(object):
         cam_yPix = dm_xPix
 
         if isinstance(chipName, list) or isinstance(chipName, np.ndarray):
-            cam_xPix = np.zeros(len(dm_xPix))
-            for ix, (det_name, yy) in enumerate(zip(chipName, dm_yPix)):
-                cam_center_pix = self.getCenterPixel(det_name)
-                cam_xPix[ix] = 2.0*cam_center_pix.getX() - yy
+            cam_xPix = 2.0*self._centerPixelX(chipName) - dm_yPix
         else:
             cam_center_pix = self.getCenterPixel(chipName)
             cam_xPix = 2.0*cam_center_pix.getX() - dm_yPix
@@ -103,6 +119,8 @@ class DMtoCameraPixelTransformer(object):
         are defined.  This can be a list (in which case there should be one chip name
         for each (cam_xpix, cam_ypix) coordinate pair), or a single value (in which
         case, all of the (cam_xpix, cam_ypi) points will be reckoned on that chip).
+        Chips can also be specified by their integer indices in
+        lsst.sims.coordUtils.getDetectorNameTable(camera).
 
         Returns
         -------
@@ -115,15 +133,7 @@ class DMtoCameraPixelTransformer(object):
 
         dm_x_pix = cam_y_pix
         if isinstance(chipName, list) or isinstance(chipName, np.ndarray):
-            center_pix_dict = {}
-            dm_y_pix = np.zeros(len(cam_x_pix))
-            for ix, (det_name, xx) in enumerate(zip(chipName, cam_x_pix)):
-                if det_name not in center_pix_dict:
-                    center_pix = self.getCenterPixel(det_name)
-                    center_pix_dict[det_name] = center_pix
-                else:
-                    center_pix = center_pix_dict[det_name]
-                dm_y_pix[ix] = 2.0*center_pix[0]-xx
+            dm_y_pix = 2.0*self._centerPixelX(chipName) - cam_x_pix
         else:
             center_pix = self.getCenterPixel(chipName)
             dm_y_pix = 2.0*center_pix[0] - cam_x_pix
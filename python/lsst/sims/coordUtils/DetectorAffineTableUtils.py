@@ -0,0 +1,230 @@
+import numpy as np
+from lsst.sims.coordUtils.CameraTransformCacheUtils import getCameraTransformCache, _sysName
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _focal_plane_sys as FOCAL_PLANE
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _pixels_sys as PIXELS
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _tan_pixels_sys as TAN_PIXELS
+from lsst.sims.coordUtils.CameraUtils import getDetectorNameTable, _transformArrays
+from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+
+__all__ = ["DetectorAffineTable", "getDetectorAffineTable"]
+
+
+class DetectorAffineTable(object):
+    """
+    A table of the 2x3 affine matrices mapping FOCAL_PLANE coordinates
+    (in mm) to pixel coordinates on every detector in a camera, and of
+    their inverses.  Rows are ordered as in getDetectorNameTable(camera).
+
+    Each matrix is fit to the detector's afw transform at a 4x4 grid of
+    points spanning the detector, then checked against afw at a 9x9 grid
+    of different points in both directions.  Detectors whose transforms
+    do not agree with the affine matrix to within tolerance_pixels are
+    flagged in is_affine and must be transformed with afw.  TAN_PIXELS
+    include the inverse of the optical distortion, so no detector is
+    affine in them: their matrices are not fit (they are NaN) and every
+    detector is flagged.
+
+    The table also holds the matrices composed with the swap from DM pixels
+    to the Camera team's pixel convention (Camera +y = DM +x, Camera +x =
+    DM -y, flipped about the detector's central pixel), so that either
+    convention is produced by the same single affine step.
+    """
+
+    def __init__(self, camera, pixelType=PIXELS, tolerance_pixels=1.0e-6):
+        """
+        @param [in] camera is an afwCameraGeom camera object
+
+        @param [in] pixelType is either PIXELS (default) or TAN_PIXELS
+
+        @param [in] tolerance_pixels is the largest disagreement with afw
+        (in pixels) for which a detector's transform is considered affine
+        (default 1.0e-6)
+        """
+        self._pixelType = pixelType
+        self._names = getDetectorNameTable(camera)
+        n_det = len(self._names)
+
+        self._forward = np.full((n_det, 2, 3), np.nan, dtype=float)
+        self._inverse = np.full((n_det, 2, 3), np.nan, dtype=float)
+        self._is_affine = np.zeros(n_det, dtype=bool)
+
+        # TAN_PIXELS are never affine, so nothing is fit for them (compare
+        # by name, so that a detector's own TAN_PIXELS system also matches)
+        if _sysName(pixelType) == TAN_PIXELS:
+            fit_names = []
+        else:
+            fit_names = self._names
+
+        geometry = getCameraGeometryTable(camera)
+        transform_cache = getCameraTransformCache()
+        for i_det, name in enumerate(fit_names):
+            focal_to_pixels = transform_cache.getTransform(camera, FOCAL_PLANE, pixelType,
+                                                           detectorName=name)
+            pixels_to_focal = transform_cache.getTransform(camera, pixelType, FOCAL_PLANE,
+                                                           detectorName=name)
+
+            x_corner = geometry.corners_mm[i_det, :, 0]
+            y_corner = geometry.corners_mm[i_det, :, 1]
+
+            x_fit, y_fit = self._boxGrid(x_corner, y_corner, 4)
+            pix_fit = _transformArrays(focal_to_pixels, x_fit, y_fit)
+            design = np.array([x_fit, y_fit, np.ones(len(x_fit))]).transpose()
+            forward = np.linalg.lstsq(design, pix_fit.transpose(), rcond=None)[0].transpose()
+
+            linear_inv = np.linalg.inv(forward[:, :2])
+            inverse = np.empty((2, 3), dtype=float)
+            inverse[:, :2] = linear_inv
+            inverse[:, 2] = -np.dot(linear_inv, forward[:, 2])
+
+            x_check, y_check = self._boxGrid(x_corner, y_corner, 9)
+            pix_check = _transformArrays(focal_to_pixels, x_check, y_check)
+            pix_affine = self._apply(forward, x_check, y_check)
+            forward_err = np.max(np.abs(pix_affine - pix_check))
+
+            focal_check = _transformArrays(pixels_to_focal, pix_check[0], pix_check[1])
+            focal_affine = self._apply(inverse, pix_check[0], pix_check[1])
+            pixel_size = geometry.pixel_size[i_det].min()
+            inverse_err = np.max(np.abs(focal_affine - focal_check))/pixel_size
+
+            self._forward[i_det] = forward
+            self._inverse[i_det] = inverse
+            self._is_affine[i_det] = (forward_err <= tolerance_pixels and
+                                      inverse_err <= tolerance_pixels)
+
+        # the Camera team convention maps DM pixels (x, y) onto
+        # (2*yc - y, x), where yc is the DM y of the central pixel
+        two_yc = 2.0*geometry.center_pix[:, 1]
+        self._camera_forward = np.empty((n_det, 2, 3), dtype=float)
+        self._camera_forward[:, 0, :] = -self._forward[:, 1, :]
+        self._camera_forward[:, 0, 2] += two_yc
+        self._camera_forward[:, 1, :] = self._forward[:, 0, :]
+
+        self._camera_inverse = np.empty((n_det, 2, 3), dtype=float)
+        self._camera_inverse[:, :, 0] = -self._inverse[:, :, 1]
+        self._camera_inverse[:, :, 1] = self._inverse[:, :, 0]
+        self._camera_inverse[:, :, 2] = (self._inverse[:, :, 2] +
+                                         two_yc[:, np.newaxis]*self._inverse[:, :, 1])
+
+        self._forward.setflags(write=False)
+        self._inverse.setflags(write=False)
+        self._camera_forward.setflags(write=False)
+        self._camera_inverse.setflags(write=False)
+        self._is_affine.setflags(write=False)
+
+    def _boxGrid(self, x_corner, y_corner, n_side):
+        """
+        Return an n_side x n_side grid of points spanning the bounding box
+        of a detector's corners, padded by 5% on every side
+        """
+        x_pad = 0.05*(x_corner.max() - x_corner.min())
+        y_pad = 0.05*(y_corner.max() - y_corner.min())
+        xx, yy = np.meshgrid(np.linspace(x_corner.min()-x_pad, x_corner.max()+x_pad, n_side),
+                             np.linspace(y_corner.min()-y_pad, y_corner.max()+y_pad, n_side))
+        return xx.ravel(), yy.ravel()
+
+    @staticmethod
+    def _apply(matrix, xIn, yIn):
+        return np.array([matrix[0, 0]*xIn + matrix[0, 1]*yIn + matrix[0, 2],
+                         matrix[1, 0]*xIn + matrix[1, 1]*yIn + matrix[1, 2]])
+
+    @property
+    def pixelType(self):
+        return self._pixelType
+
+    @property
+    def names(self):
+        """
+        The detector names corresponding to the rows of the table
+        """
+        return self._names
+
+    @property
+    def forward(self):
+        """
+        A read-only (n_detectors, 2, 3) numpy array of matrices mapping
+        FOCAL_PLANE (x, y, 1) to pixel (x, y)
+        """
+        return self._forward
+
+    @property
+    def inverse(self):
+        """
+        A read-only (n_detectors, 2, 3) numpy array of matrices mapping
+        pixel (x, y, 1) to FOCAL_PLANE (x, y)
+        """
+        return self._inverse
+
+    @property
+    def is_affine(self):
+        """
+        A read-only boolean numpy array that is True for the detectors
+        whose transforms are reproduced by the affine matrices
+        """
+        return self._is_affine
+
+    def _batchApply(self, matrices, xIn, yIn, det_codes):
+        xy = np.empty((len(det_codes), 2), dtype=float)
+        xy[:, 0] = xIn
+        xy[:, 1] = yIn
+        mat = matrices[det_codes]
+        out = np.einsum('nij,nj->in', mat[:, :, :2], xy)
+        out += mat[:, :, 2].transpose()
+        return out
+
+    def focalToPixels(self, xFocal, yFocal, det_codes, pixelConvention='DM'):
+        """
+        Convert focal plane coordinates into pixel coordinates
+
+        @param [in] xFocal is a numpy array of x focal plane coordinates in mm
+
+        @param [in] yFocal is a numpy array of y focal plane coordinates in mm
+
+        @param [in] det_codes is a numpy array of indices into
+        getDetectorNameTable(camera) of detectors whose is_affine is True
+
+        @param [in] pixelConvention is either 'DM' (default) or 'camera'
+        (the Camera team's pixel convention)
+
+        @param [out] a 2-D numpy array in which the first row is the x pixel
+        coordinate and the second row is the y pixel coordinate
+        """
+        if pixelConvention == 'camera':
+            return self._batchApply(self._camera_forward, xFocal, yFocal, det_codes)
+        return self._batchApply(self._forward, xFocal, yFocal, det_codes)
+
+    def pixelsToFocal(self, xPix, yPix, det_codes, pixelConvention='DM'):
+        """
+        Convert pixel coordinates into focal plane coordinates
+
+        @param [in] xPix is a numpy array of x pixel coordinates
+
+        @param [in] yPix is a numpy array of y pixel coordinates
+
+        @param [in] det_codes is a numpy array of indices into
+        getDetectorNameTable(camera) of detectors whose is_affine is True
+
+        @param [in] pixelConvention is either 'DM' (default) or 'camera'
+        (the Camera team's pixel convention)
+
+        @param [out] a 2-D numpy array in which the first row is the x focal
+        plane coordinate and the second row is the y focal plane coordinate (mm)
+        """
+        if pixelConvention == 'camera':
+            return self._batchApply(self._camera_inverse, xPix, yPix, det_codes)
+        return self._batchApply(self._inverse, xPix, yPix, det_codes)
+
+
+def getDetectorAffineTable(camera, pixelType=PIXELS):
+    """
+    Return the DetectorAffineTable for a camera, building it on first use.
+    Tables are cached in the CameraTransformCache.
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [in] pixelType is either PIXELS (default) or TAN_PIXELS
+    """
+    def factory():
+        return DetectorAffineTable(camera, pixelType=pixelType)
+
+    return getCameraTransformCache().get(camera, ('detector_affine_table', _sysName(pixelType)),
+                                         factory)
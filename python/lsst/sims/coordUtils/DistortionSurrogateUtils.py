@@ -0,0 +1,244 @@
+import numpy as np
+from numpy.polynomial import chebyshev
+from lsst.sims.coordUtils.CameraTransformCacheUtils import getCameraTransformCache, _sysName
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _field_angle_sys as FIELD_ANGLE
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _focal_plane_sys as FOCAL_PLANE
+from lsst.sims.coordUtils.CameraUtils import _cameraBoundingRadius, _transformArrays
+from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+
+__all__ = ["ChebyshevTransformSurrogate", "getDistortionSurrogate"]
+
+
+class ChebyshevTransformSurrogate(object):
+    """
+    A pair of 2-D Chebyshev polynomials approximating the camera's
+    FIELD_ANGLE to FOCAL_PLANE transformation (or its inverse) over the
+    circle that bounds every detector.
+
+    The polynomials are fit by least squares to the exact afw transform
+    at a grid of points.  Their degree is increased until the maximum
+    error, measured in pixels on the focal plane at a separate, denser
+    grid of points and at rings of points out to (and on) the bounding
+    circle, is below tolerance_pixels.  If no degree up to
+    max_degree meets the tolerance, converged will be False and the
+    surrogate should not be used.
+
+    The error bound is therefore empirical: it holds at the sampled check
+    points, and between them only to the extent that neither the exact
+    transform nor the polynomials vary on scales finer than the check grid.
+    It is not a guaranteed bound over the whole circle.
+
+    Outside of the bounding circle the polynomials are not evaluated:
+    apply() returns NaN there.  focalPlaneCoordsFromPupilCoords and
+    pupilCoordsFromFocalPlaneCoords transform those points with afw instead.
+
+    For the FOCAL_PLANE to FIELD_ANGLE direction, the error is measured
+    by sending the surrogate's output back through the exact forward
+    transform and comparing with the input focal plane position.
+    """
+
+    def __init__(self, camera, fromSys, toSys, tolerance_pixels=1.0e-4, max_degree=15,
+                 n_fit=64, n_check=256):
+        """
+        @param [in] camera is an afwCameraGeom camera object
+
+        @param [in] fromSys is the coordinate system being transformed from
+        (FIELD_ANGLE or FOCAL_PLANE)
+
+        @param [in] toSys is the coordinate system being transformed to
+        (FOCAL_PLANE or FIELD_ANGLE)
+
+        @param [in] tolerance_pixels is the largest error (in pixels) the
+        surrogate may make at the check points (default 1.0e-4)
+
+        @param [in] max_degree is the highest polynomial degree tried (default 15)
+
+        @param [in] n_fit is the number of points along each side of the square
+        grid of points to which the polynomials are fit (default 64)
+
+        @param [in] n_check is the number of points along each side of the
+        square grid of points at which the error is measured (default 256).
+        The error is also measured at 4*n_check points on each of several
+        rings in the outermost cell of that grid, including on the
+        bounding circle itself.
+        """
+        if ((_sysName(fromSys), _sysName(toSys)) not in
+                ((FIELD_ANGLE, FOCAL_PLANE), (FOCAL_PLANE, FIELD_ANGLE))):
+            raise RuntimeError("ChebyshevTransformSurrogate can only approximate the "
+                               "transformation between FIELD_ANGLE and FOCAL_PLANE; "
+                               "you asked for %s to %s" % (_sysName(fromSys), _sysName(toSys)))
+
+        self._fromSys = fromSys
+        self._toSys = toSys
+        self._tolerance = tolerance_pixels
+        self._radius = _cameraBoundingRadius(camera, fromSys)
+
+        cache = getCameraTransformCache()
+        exact = cache.getTransform(camera, fromSys, toSys)
+        field_to_focal = cache.getTransform(camera, FIELD_ANGLE, FOCAL_PLANE)
+
+        # the size of a pixel in mm on the focal plane
+        pixel_size = getCameraGeometryTable(camera).pixel_size.min()
+
+        x_fit, y_fit = self._diskGrid(n_fit, 0.0)
+        x_rim, y_rim = self._rimRings(4*n_fit, 2.0*self._radius/(n_fit-1), 2)
+        x_fit = np.concatenate([x_fit, x_rim])
+        y_fit = np.concatenate([y_fit, y_rim])
+        xy_fit = _transformArrays(exact, x_fit, y_fit)
+
+        # offset the check grid by half a cell from the fitting grid; the
+        # grid only reaches to within a cell of the bounding circle, where
+        # the error of the polynomials is largest, so the outer annulus
+        # (and the circle itself) is sampled by extra rings of points
+        x_check, y_check = self._diskGrid(n_check, 0.5)
+        x_rim, y_rim = self._rimRings(4*n_check, 2.0*self._radius/(n_check-1), 4)
+        x_check = np.concatenate([x_check, x_rim])
+        y_check = np.concatenate([y_check, y_rim])
+        xy_check = _transformArrays(exact, x_check, y_check)
+
+        self._converged = False
+        self._degree = None
+        self._coeffs = None
+        self._max_residual = np.inf
+        for degree in range(1, max_degree+1):
+            vander = chebyshev.chebvander2d(x_fit/self._radius, y_fit/self._radius,
+                                            [degree, degree])
+            coeffs = np.linalg.lstsq(vander, xy_fit.transpose(), rcond=None)[0]
+            coeffs = [coeffs[:, 0].reshape(degree+1, degree+1),
+                      coeffs[:, 1].reshape(degree+1, degree+1)]
+
+            x_test = chebyshev.chebval2d(x_check/self._radius, y_check/self._radius, coeffs[0])
+            y_test = chebyshev.chebval2d(x_check/self._radius, y_check/self._radius, coeffs[1])
+            if _sysName(toSys) == FOCAL_PLANE:
+                dx = x_test - xy_check[0]
+                dy = y_test - xy_check[1]
+            else:
+                x_round, y_round = _transformArrays(field_to_focal, x_test, y_test)
+                dx = x_round - x_check
+                dy = y_round - y_check
+
+            residual = np.sqrt(np.max(dx*dx + dy*dy))/pixel_size
+            if residual < self._max_residual:
+                self._degree = degree
+                self._coeffs = coeffs
+                self._max_residual = residual
+            if residual <= tolerance_pixels:
+                self._converged = True
+                break
+
+    def _diskGrid(self, n_side, offset):
+        """
+        Return the points of an n_side x n_side square grid (shifted by offset
+        cells) that fall within the bounding circle of the detectors
+        """
+        step = 2.0*self._radius/(n_side-1)
+        vals = -self._radius + step*(np.arange(n_side) + offset)
+        xx, yy = np.meshgrid(vals, vals)
+        xx = xx.ravel()
+        yy = yy.ravel()
+        valid = np.where(xx*xx + yy*yy <= self._radius*self._radius)
+        return xx[valid], yy[valid]
+
+    def _rimRings(self, n_per_ring, depth, n_rings):
+        """
+        Return n_rings rings of n_per_ring points each, evenly spaced in radius
+        from the bounding circle of the detectors (the first ring) to depth
+        inside of it
+        """
+        theta = np.linspace(0.0, 2.0*np.pi, n_per_ring, endpoint=False)
+        ring_radius = self._radius - depth*np.arange(n_rings)/float(n_rings)
+        xx = np.outer(ring_radius, np.cos(theta)).ravel()
+        yy = np.outer(ring_radius, np.sin(theta)).ravel()
+        return xx, yy
+
+    @property
+    def fromSys(self):
+        return self._fromSys
+
+    @property
+    def toSys(self):
+        return self._toSys
+
+    @property
+    def radius(self):
+        """
+        The radius (in fromSys units) of the circle over which the surrogate is valid
+        """
+        return self._radius
+
+    @property
+    def degree(self):
+        return self._degree
+
+    @property
+    def converged(self):
+        """
+        True if the surrogate meets tolerance_pixels
+        """
+        return self._converged
+
+    @property
+    def max_residual_pixels(self):
+        """
+        The largest error (in pixels) found at the check points; an
+        empirical estimate of the surrogate's error, not a strict bound
+        """
+        return self._max_residual
+
+    def apply(self, xIn, yIn):
+        """
+        Evaluate the surrogate
+
+        @param [in] xIn is a numpy array of x coordinates in fromSys
+
+        @param [in] yIn is a numpy array of y coordinates in fromSys
+
+        @param [out] a 2-D numpy array in which the first row is the x
+        coordinate and the second row is the y coordinate in toSys.
+        Points outside of the circle over which the surrogate was fit
+        are set to NaN; see inDomain().
+        """
+        uu = np.asarray(xIn, dtype=float)/self._radius
+        vv = np.asarray(yIn, dtype=float)/self._radius
+        out = np.empty((2, len(uu)), dtype=float)
+        out[0] = chebyshev.chebval2d(uu, vv, self._coeffs[0])
+        out[1] = chebyshev.chebval2d(uu, vv, self._coeffs[1])
+        with np.errstate(invalid='ignore'):
+            outside = np.where(uu*uu + vv*vv > 1.0)
+        out[0][outside] = np.NaN
+        out[1][outside] = np.NaN
+        return out
+
+    def inDomain(self, xIn, yIn):
+        """
+        Return a boolean numpy array that is True for the points
+        that lie within the circle over which the surrogate was fit
+        """
+        with np.errstate(invalid='ignore'):
+            return (np.asarray(xIn)**2 + np.asarray(yIn)**2) <= self._radius*self._radius
+
+
+def getDistortionSurrogate(camera, fromSys, toSys, tolerance_pixels=1.0e-4):
+    """
+    Return the ChebyshevTransformSurrogate for a camera, fitting it on
+    first use.  Surrogates are cached in the CameraTransformCache.
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [in] fromSys is the coordinate system being transformed from
+    (FIELD_ANGLE or FOCAL_PLANE)
+
+    @param [in] toSys is the coordinate system being transformed to
+    (FOCAL_PLANE or FIELD_ANGLE)
+
+    @param [in] tolerance_pixels is the largest error (in pixels) the
+    surrogate may make at its check points (default 1.0e-4; see
+    ChebyshevTransformSurrogate)
+    """
+    def factory():
+        return ChebyshevTransformSurrogate(camera, fromSys, toSys,
+                                           tolerance_pixels=tolerance_pixels)
+
+    return getCameraTransformCache().get(camera, ('distortion_surrogate', _sysName(fromSys),
+                                                  _sysName(toSys), tolerance_pixels),
+                                         factory)
@@ -0,0 +1,192 @@
+import numpy as np
+from lsst.sims.coordUtils.CameraUtils import getDetectorNameTable, _detectorIndexFromChipName
+from lsst.sims.coordUtils.CameraUtils import _raDecFromPupilCoords, _observationMetaDataClass
+from lsst.sims.coordUtils.CameraUtils import pupilCoordsFromPixelCoords
+from lsst.sims.coordUtils.CameraGeometryTableUtils import getCameraGeometryTable
+from lsst.sims.coordUtils.MultiVisitUtils import _obsMetaDataFromVisits
+
+__all__ = ["getDetectorFootprints", "_getDetectorFootprints"]
+
+
+def _detectorPolygonPixels(camera, det_codes, n_per_edge):
+    """
+    Return the pixel coordinates of the vertices of the polygons
+    outlining a set of detectors.
+
+    Vertices run around the bounding box of each detector as
+    (xmin, ymin) -> (xmax, ymin) -> (xmax, ymax) -> (xmin, ymax), with
+    n_per_edge vertices along each edge (starting from its first corner).
+
+    @param [out] xPix, yPix -- numpy arrays of shape (len(det_codes), 4*n_per_edge)
+    """
+    bbox = getCameraGeometryTable(camera).bbox[det_codes].astype(float)
+    xmin, ymin, xmax, ymax = (bbox[:, ii:ii+1] for ii in range(4))
+    frac = np.arange(n_per_edge)/float(n_per_edge)
+    ones = np.ones(n_per_edge)
+    xPix = np.concatenate([xmin + frac*(xmax-xmin), xmax*ones,
+                           xmax - frac*(xmax-xmin), xmin*ones], axis=1)
+    yPix = np.concatenate([ymin*ones, ymin + frac*(ymax-ymin),
+                           ymax*ones, ymax - frac*(ymax-ymin)], axis=1)
+    return xPix, yPix
+
+
+def _boundingCaps(ra, dec):
+    """
+    Find the circles on the sky bounding sets of polygon vertices
+
+    @param [in] ra is a numpy array of RA in radians whose last axis
+    runs over the vertices of each polygon
+
+    @param [in] dec is a numpy array of Dec in radians with the same shape
+
+    @param [out] capRA, capDec, capRadius -- numpy arrays in radians with the
+    shape of ra without its last axis.  The center of each cap is the
+    normalized mean of the vertices' unit vectors; its radius is the largest
+    angular distance from the center to a vertex.
+    """
+    cos_dec = np.cos(dec)
+    xyz = np.array([cos_dec*np.cos(ra), cos_dec*np.sin(ra), np.sin(dec)])
+    center = xyz.sum(axis=-1)
+    center /= np.sqrt((center*center).sum(axis=0))
+
+    cos_dist = (xyz*center[..., np.newaxis]).sum(axis=0)
+    capRadius = np.arccos(np.clip(cos_dist.min(axis=-1), -1.0, 1.0))
+    capRA = np.arctan2(center[1], center[0]) % (2.0*np.pi)
+    capDec = np.arcsin(np.clip(center[2], -1.0, 1.0))
+    return capRA, capDec, capRadius
+
+
+def getDetectorFootprints(camera, obs_metadata, detector_names=None, n_per_edge=1,
+                          epoch=2000.0, includeDistortion=True):
+    """
+    Return the outlines on the sky of many detectors in one or many pointings,
+    in degrees.
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [in] obs_metadata is an ObservationMetaData, or many pointings given
+    either as a list of ObservationMetaData or a numpy structured array (or dict
+    of numpy arrays) with the columns 'pointingRA', 'pointingDec', 'rotSkyPos'
+    (all in degrees) and 'mjd' (TAI)
+
+    @param [in] detector_names is a list of the names (or indices in
+    getDetectorNameTable(camera)) of the detectors whose footprints are wanted.
+    If None (default), every detector in the camera.
+
+    @param [in] n_per_edge is the number of polygon vertices along each edge of
+    each detector (default 1, i.e. only the corners)
+
+    @param [in] epoch is the mean Julian epoch of the coordinate system
+    (default is 2000)
+
+    @param [in] includeDistortion is a boolean.  If True (default), detectors
+    are outlined in true pixel coordinates; if False, in TAN_PIXEL coordinates.
+
+    @param [out] a dict containing
+
+        'detectorName' -- the names of the detectors, shape (n_det,)
+        'ra', 'dec' -- the polygon vertices, shape (n_obs, n_det, 4*n_per_edge)
+        'capRA', 'capDec', 'capRadius' -- the circles bounding the polygon
+                                          vertices, shape (n_obs, n_det)
+
+    Polygon vertices run around each detector's pixel bounding box as
+    (xmin, ymin) -> (xmax, ymin) -> (xmax, ymax) -> (xmin, ymax).  If
+    obs_metadata is a single ObservationMetaData, the n_obs axis is dropped.
+    """
+    footprints = _getDetectorFootprints(camera, obs_metadata, detector_names=detector_names,
+                                        n_per_edge=n_per_edge, epoch=epoch,
+                                        includeDistortion=includeDistortion)
+    for col in ('ra', 'dec', 'capRA', 'capDec', 'capRadius'):
+        footprints[col] = np.degrees(footprints[col])
+    return footprints
+
+
+def _getDetectorFootprints(camera, obs_metadata, detector_names=None, n_per_edge=1,
+                           epoch=2000.0, includeDistortion=True):
+    """
+    Return the outlines on the sky of many detectors in one or many pointings,
+    in radians.
+
+    The pupil coordinates of the polygon vertices do not depend on the
+    pointing, so they are computed once, with every detector transformed
+    in a single batch; each pointing then needs one call to
+    _raDecFromPupilCoords for all of its vertices.
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [in] obs_metadata is an ObservationMetaData, or many pointings given
+    either as a list of ObservationMetaData or a numpy structured array (or dict
+    of numpy arrays) with the columns 'pointingRA', 'pointingDec', 'rotSkyPos'
+    (all in degrees) and 'mjd' (TAI)
+
+    @param [in] detector_names is a list of the names (or indices in
+    getDetectorNameTable(camera)) of the detectors whose footprints are wanted.
+    If None (default), every detector in the camera.
+
+    @param [in] n_per_edge is the number of polygon vertices along each edge of
+    each detector (default 1, i.e. only the corners)
+
+    @param [in] epoch is the mean Julian epoch of the coordinate system
+    (default is 2000)
+
+    @param [in] includeDistortion is a boolean.  If True (default), detectors
+    are outlined in true pixel coordinates; if False, in TAN_PIXEL coordinates.
+
+    @param [out] a dict containing
+
+        'detectorName' -- the names of the detectors, shape (n_det,)
+        'ra', 'dec' -- the polygon vertices, shape (n_obs, n_det, 4*n_per_edge)
+        'capRA', 'capDec', 'capRadius' -- the circles bounding the polygon
+                                          vertices, shape (n_obs, n_det)
+
+    Polygon vertices run around each detector's pixel bounding box as
+    (xmin, ymin) -> (xmax, ymin) -> (xmax, ymax) -> (xmin, ymax).  If
+    obs_metadata is a single ObservationMetaData, the n_obs axis is dropped.
+    """
+    if camera is None:
+        raise RuntimeError("You cannot call getDetectorFootprints without specifying a camera")
+
+    if epoch is None:
+        raise RuntimeError("You need to pass an epoch into getDetectorFootprints")
+
+    if n_per_edge < 1:
+        raise RuntimeError("n_per_edge must be at least 1")
+
+    single_obs = isinstance(obs_metadata, _observationMetaDataClass())
+    if single_obs:
+        obs_list = _obsMetaDataFromVisits([obs_metadata], method_name='getDetectorFootprints')
+    else:
+        obs_list = _obsMetaDataFromVisits(obs_metadata, method_name='getDetectorFootprints')
+
+    if detector_names is None:
+        det_codes = np.arange(len(getDetectorNameTable(camera)), dtype=np.int16)
+    else:
+        det_codes = _detectorIndexFromChipName(np.asarray(detector_names), camera)
+        if len(det_codes) > 0 and det_codes.min() < 0:
+            raise RuntimeError("getDetectorFootprints needs valid detector names")
+
+    xPix, yPix = _detectorPolygonPixels(camera, det_codes, n_per_edge)
+    vertex_shape = xPix.shape
+    xPupil, yPupil = pupilCoordsFromPixelCoords(xPix.ravel(), yPix.ravel(),
+                                                np.repeat(det_codes, vertex_shape[1]),
+                                                camera=camera,
+                                                includeDistortion=includeDistortion)
+
+    ra = np.empty((len(obs_list),) + vertex_shape, dtype=float)
+    dec = np.empty((len(obs_list),) + vertex_shape, dtype=float)
+    for i_obs, obs in enumerate(obs_list):
+        ra_obs, dec_obs = _raDecFromPupilCoords(xPupil, yPupil, obs_metadata=obs, epoch=epoch)
+        ra[i_obs] = ra_obs.reshape(vertex_shape)
+        dec[i_obs] = dec_obs.reshape(vertex_shape)
+
+    capRA, capDec, capRadius = _boundingCaps(ra, dec)
+
+    footprints = {'detectorName': getDetectorNameTable(camera)[det_codes],
+                  'ra': ra, 'dec': dec,
+                  'capRA': capRA, 'capDec': capDec, 'capRadius': capRadius}
+
+    if single_obs:
+        for col in ('ra', 'dec', 'capRA', 'capDec', 'capRadius'):
+            footprints[col] = footprints[col][0]
+
+    return footprints
@@ -0,0 +1,216 @@
+import numpy as np
+from lsst.sims.coordUtils.CameraTransformCacheUtils import getCameraTransformCache
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _field_angle_sys as FIELD_ANGLE
+from lsst.sims.coordUtils.CameraTransformCacheUtils import _focal_plane_sys as FOCAL_PLANE
+from lsst.sims.coordUtils.CameraUtils import getDetectorNameTable, _detectorIndexFromChipName
+from lsst.sims.coordUtils.CameraUtils import _transformArrays, _pupilCoordsFromRaDec
+from lsst.sims.coordUtils.CameraUtils import _observationMetaDataClass
+from lsst.sims.coordUtils.CameraUtils import _detectorHitsFromCameraCoords
+from lsst.sims.coordUtils.FootprintUtils import _getDetectorFootprints
+from lsst.sims.coordUtils.MultiVisitUtils import _obsMetaDataFromVisits
+
+__all__ = ["healpix_coverage_dtype", "getDetectorHealpixCoverage"]
+
+
+# the long-format table returned by getDetectorHealpixCoverage;
+# 'detector' is an index into getDetectorNameTable(camera)
+healpix_coverage_dtype = np.dtype([('visit', np.int32), ('detector', np.int16),
+                                   ('hpid', np.int64), ('fraction', float)])
+
+
+def _unitVectors(ra, dec):
+    """
+    Convert RA, Dec in radians into unit vectors along a new last axis
+    """
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec*np.cos(ra), cos_dec*np.sin(ra), np.sin(dec)], axis=-1)
+
+
+def _edgeSamples(vertices, spacing):
+    """
+    Return points along the edges of spherical polygons
+
+    @param [in] vertices is a numpy array of shape (n_polygon, n_vertex, 3)
+    of the unit vectors of the polygons' vertices, in order around each polygon
+
+    @param [in] spacing is the largest angular distance (in radians)
+    between consecutive points along an edge
+
+    @param [out] a numpy array of shape (n_polygon, n_point, 3) of unit vectors
+    """
+    next_vertices = np.roll(vertices, -1, axis=1)
+    cos_length = np.clip((vertices*next_vertices).sum(axis=-1), -1.0, 1.0)
+    n_step = max(1, int(np.ceil(np.arccos(cos_length).max()/spacing)))
+    tt = (np.arange(n_step)/float(n_step))[:, np.newaxis]
+    samples = (vertices[:, :, np.newaxis, :]*(1.0-tt) +
+               next_vertices[:, :, np.newaxis, :]*tt)
+    samples /= np.sqrt((samples*samples).sum(axis=-1))[..., np.newaxis]
+    return samples.reshape(vertices.shape[0], -1, 3)
+
+
+def _tanFocalPlaneCoords(camera, xPupil, yPupil):
+    """
+    Map pupil coordinates onto the focal plane with the FIELD_ANGLE to
+    FOCAL_PLANE transform linearized at the optical axis.  afw defines
+    TAN_PIXELS with this linearization, so the TAN_PIXELS position of a
+    point on a detector is the PIXELS position of the result.
+
+    @param [out] xFocal, yFocal -- numpy arrays of focal plane coordinates in mm
+    """
+    step = 1.0e-5
+    field_to_focal = getCameraTransformCache().getTransform(camera, FIELD_ANGLE, FOCAL_PLANE)
+    focal = _transformArrays(field_to_focal, np.array([0.0, step, -step, 0.0, 0.0]),
+                             np.array([0.0, 0.0, 0.0, step, -step]))
+    d_dx = (focal[:, 1] - focal[:, 2])/(2.0*step)
+    d_dy = (focal[:, 3] - focal[:, 4])/(2.0*step)
+    return (focal[0, 0] + d_dx[0]*xPupil + d_dy[0]*yPupil,
+            focal[1, 0] + d_dx[1]*xPupil + d_dy[1]*yPupil)
+
+
+def getDetectorHealpixCoverage(camera, obs_metadata, nside, nest=False,
+                               detector_names=None, n_per_edge=4, sub_level=3,
+                               epoch=2000.0, includeDistortion=True):
+    """
+    Find the HEALPix pixels covered by each detector in one or many visits.
+
+    The pixels that might overlap the detectors in a visit are found with a
+    single query for the cap bounding all of them.  Each candidate is divided
+    into 4**sub_level sub-pixels (its descendants at nside*2**sub_level), and
+    the centers of all of the sub-pixels in the visit are assigned to
+    detectors at once with the same exact test as chipNameFromPupilCoords
+    (applied to TAN_PIXELS if includeDistortion is False).  The covered
+    fraction of a pixel is the fraction of its sub-pixel centers on the
+    detector.  Pixels crossed by the edge of a detector, as outlined by the
+    polygons returned by getDetectorFootprints with n_per_edge vertices along
+    each edge, are always reported as covered; if none of their sub-pixel
+    centers are on the detector, their fraction is set to half a sub-pixel.
+
+    This method requires healpy.
+
+    @param [in] camera is an afwCameraGeom camera object
+
+    @param [in] obs_metadata is an ObservationMetaData, or many visits given
+    either as a list of ObservationMetaData or a numpy structured array (or dict
+    of numpy arrays) with the columns 'pointingRA', 'pointingDec', 'rotSkyPos'
+    (all in degrees) and 'mjd' (TAI)
+
+    @param [in] nside is the HEALPix resolution parameter
+
+    @param [in] nest is a boolean.  If True, pixel indices are in the NESTED
+    scheme; if False (default), in the RING scheme.
+
+    @param [in] detector_names is a list of the names (or indices in
+    getDetectorNameTable(camera)) of the detectors to consider.
+    If None (default), every detector in the camera.
+
+    @param [in] n_per_edge is the number of polygon vertices along each edge of
+    each detector (default 4)
+
+    @param [in] sub_level is the number of times each candidate pixel is
+    subdivided when estimating its covered fraction (default 3, i.e. 64
+    sub-pixels)
+
+    @param [in] epoch is the mean Julian epoch of the coordinate system
+    (default is 2000)
+
+    @param [in] includeDistortion is a boolean.  If True (default), detectors
+    are outlined in true pixel coordinates; if False, in TAN_PIXEL coordinates.
+
+    @param [out] a numpy array of dtype healpix_coverage_dtype with one row for
+    each (visit, detector, HEALPix pixel) triple in which the detector covers
+    part of the pixel.  'visit' indexes the input visits (0 if obs_metadata is
+    a single ObservationMetaData); 'detector' indexes getDetectorNameTable(camera);
+    'fraction' is the estimated fraction of the pixel's area on the detector.
+    """
+    import healpy
+
+    if sub_level < 0:
+        raise RuntimeError("sub_level cannot be negative")
+
+    footprints = _getDetectorFootprints(camera, obs_metadata, detector_names=detector_names,
+                                        n_per_edge=n_per_edge, epoch=epoch,
+                                        includeDistortion=includeDistortion)
+
+    if footprints['ra'].ndim == 2:
+        for col in ('ra', 'dec', 'capRA', 'capDec', 'capRadius'):
+            footprints[col] = footprints[col][np.newaxis]
+
+    if detector_names is None:
+        det_codes = np.arange(footprints['ra'].shape[1], dtype=np.int16)
+    else:
+        det_codes = _detectorIndexFromChipName(np.asarray(detector_names), camera)
+
+    n_sub = 4**sub_level
+    sub_offsets = np.arange(n_sub, dtype=np.int64)
+    n_pix = healpy.nside2npix(nside)
+    # inflate the visit's cap by the largest distance from a pixel center to its edge
+    margin = healpy.max_pixrad(nside)
+    edge_spacing = 0.25*healpy.nside2resol(nside*2**sub_level)
+
+    # the position of each camera detector in det_codes (-1 if not wanted)
+    det_position = np.full(len(getDetectorNameTable(camera)), -1, dtype=np.int64)
+    det_position[det_codes] = np.arange(len(det_codes))
+
+    if isinstance(obs_metadata, _observationMetaDataClass()):
+        obs_list = [obs_metadata]
+    else:
+        obs_list = _obsMetaDataFromVisits(obs_metadata, method_name='getDetectorHealpixCoverage')
+
+    chunk_list = []
+    for i_visit in range(footprints['ra'].shape[0]):
+        if len(det_codes) == 0:
+            continue
+
+        # one cap bounding the caps of all of the detectors
+        cap_vectors = _unitVectors(footprints['capRA'][i_visit], footprints['capDec'][i_visit])
+        center = cap_vectors.sum(axis=0)
+        center /= np.sqrt((center*center).sum())
+        radius = (np.arccos(np.clip(np.dot(cap_vectors, center), -1.0, 1.0)) +
+                  footprints['capRadius'][i_visit]).max()
+        candidates = healpy.query_disc(nside, center, radius + margin,
+                                       inclusive=True, nest=True).astype(np.int64)
+
+        sub_pix = (candidates[:, np.newaxis]*n_sub + sub_offsets).ravel()
+        sub_ra, sub_dec = healpy.pix2ang(nside*2**sub_level, sub_pix, nest=True, lonlat=True)
+        xPupil, yPupil = _pupilCoordsFromRaDec(np.radians(sub_ra), np.radians(sub_dec),
+                                               obs_metadata=obs_list[i_visit], epoch=epoch)
+        if includeDistortion:
+            offsets, hits = _detectorHitsFromCameraCoords(xPupil, yPupil, FIELD_ANGLE, camera)
+        else:
+            xFocal, yFocal = _tanFocalPlaneCoords(camera, xPupil, yPupil)
+            offsets, hits = _detectorHitsFromCameraCoords(xFocal, yFocal, FOCAL_PLANE, camera)
+
+        # (detector position, pixel) keys of every sub-pixel center on a wanted detector
+        hit_position = det_position[hits]
+        hit_pix = np.repeat(np.repeat(candidates, n_sub), np.diff(offsets))
+        wanted = hit_position >= 0
+        keys, counts = np.unique(hit_position[wanted]*n_pix + hit_pix[wanted], return_counts=True)
+        fraction = counts/float(n_sub)
+
+        # pixels crossed by an edge of a detector are covered, even if
+        # none of their sub-pixel centers are
+        vertices = _unitVectors(footprints['ra'][i_visit], footprints['dec'][i_visit])
+        edge_vectors = _edgeSamples(vertices, edge_spacing)
+        edge_pix = healpy.vec2pix(nside, edge_vectors[..., 0], edge_vectors[..., 1],
+                                  edge_vectors[..., 2], nest=True)
+        edge_keys = np.unique((np.arange(len(det_codes))[:, np.newaxis]*n_pix + edge_pix).ravel())
+        edge_only = edge_keys[np.logical_not(np.isin(edge_keys, keys))]
+        keys = np.concatenate([keys, edge_only])
+        fraction = np.concatenate([fraction, np.full(len(edge_only), 0.5/n_sub)])
+        order = np.argsort(keys)
+        keys = keys[order]
+        fraction = fraction[order]
+
+        chunk = np.zeros(len(keys), dtype=healpix_coverage_dtype)
+        chunk['visit'] = i_visit
+        chunk['detector'] = det_codes[keys//n_pix]
+        if nest:
+            chunk['hpid'] = keys % n_pix
+        else:
+            chunk['hpid'] = healpy.nest2ring(nside, keys % n_pix)
+        chunk['fraction'] = fraction
+        chunk_list.append(chunk)
+
+    if len(chunk_list) == 0:
+        return np.zeros(0, dtype=healpix_coverage_dtype)
+    return np.concatenate(chunk_list)
@@ -1,22 +1,4 @@
-from __future__ import division
-from builtins import zip
-from builtins import range
-import numpy as np
-import numbers
-import lsst.geom as geom
-from lsst.afw.cameraGeom import FIELD_ANGLE, FOCAL_PLANE, PIXELS
-from lsst.afw.cameraGeom import DetectorType
-from lsst.sims.coordUtils import lsst_camera
-from lsst.sims.coordUtils import focalPlaneCoordsFromPupilCoords
-from lsst.sims.coordUtils import LsstZernikeFitter
-from lsst.sims.coordUtils import pupilCoordsFromPixelCoords, pixelCoordsFromPupilCoords
-from lsst.sims.coordUtils import pupilCoordsFromFocalPlaneCoords
-from lsst.sims.coordUtils import pupilCoordsFromPixelCoords
-from lsst.sims.utils import _pupilCoordsFromRaDec
-from lsst.sims.utils import _raDecFromPupilCoords
-from lsst.sims.coordUtils import getCornerPixels, _validate_inputs_and_chipname
-from lsst.sims.utils.CodeUtilities import _validate_inputs
-from lsst.sims.utils import radiansFromArcsec
+from lsst.sims.coordUtils.CameraTransformCacheUtils import getCameraTransformCache
 
 __all__ = ["focalPlaneCoordsFromPupilCoordsLSST",
            "pupilCoordsFromFocalPlaneCoordsLSST",
@@ -48,16 +30,10 @@ def _lsstCoordUtilsError():
 
 def clean_up_lsst_camera():
     """
-    Delete member objects associated with the methods below
+    Release the camera transforms (and any other camera-derived
+    objects) held in the process-wide CameraTransformCache
     """
-    if hasattr(focalPlaneCoordsFromPupilCoordsLSST, '_z_fitter'):
-        del focalPlaneCoordsFromPupilCoordsLSST._z_fitter
-    if hasattr(pupilCoordsFromFocalPlaneCoordsLSST, '_z_fitter'):
-        del pupilCoordsFromFocalPlaneCoordsLSST._z_fitter
-    if hasattr(chipNameFromPupilCoordsLSST, '_detector_arr'):
-        del chipNameFromPupilCoordsLSST._detector_arr
-    if hasattr(lsst_camera, '_lsst_camera'):
-        del lsst_camera._lsst_camera
+    getCameraTransformCache().invalidate()
 
 def focalPlaneCoordsFromPupilCoordsLSST(xPupil, yPupil, band='r'):
     """
@@ -1,21 +1,119 @@
 import numpy as np
 import os
 import numbers
+import hashlib
+import tempfile
+import zipfile
 import palpy
 
 from lsst.utils import getPackageDir
 from lsst.sims.utils import ZernikePolynomialGenerator
-from lsst.sims.coordUtils import lsst_camera
 from lsst.sims.coordUtils import DMtoCameraPixelTransformer
+from lsst.sims.coordUtils import getCameraGeometryTable
+from lsst.sims.coordUtils import getCameraTransformCache
+from lsst.sims.coordUtils.CameraUtils import _transformArrays
 from lsst.afw.cameraGeom import PIXELS, FOCAL_PLANE, FIELD_ANGLE
 from lsst.afw.cameraGeom import DetectorType
-import lsst.geom as geom
 from lsst.sims.utils.CodeUtilities import _validate_inputs
 
 
 __all__ = ["LsstZernikeFitter"]
 
 
+# increment whenever the fit or the layout of the coefficient cache changes
+_zernike_cache_version = 1
+
+
+def _defaultZernikeCacheDir():
+    """
+    Return the directory in which LsstZernikeFitter caches its coefficients:
+    $SIMS_COORDUTILS_CACHE_DIR if it is set, ~/.cache/sims_coordUtils otherwise
+    """
+    cache_dir = os.environ.get('SIMS_COORDUTILS_CACHE_DIR', None)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'sims_coordUtils')
+    return cache_dir
+
+
+def _focalPlaneFiles(focal_plane_dir):
+    """
+    Return a sorted list of (path relative to focal_plane_dir, full path)
+    of every file in the FocalPlaneData directory
+    """
+    file_list = []
+    for root, dir_names, file_names in os.walk(focal_plane_dir):
+        for file_name in file_names:
+            full_name = os.path.join(root, file_name)
+            file_list.append((os.path.relpath(full_name, focal_plane_dir), full_name))
+    return sorted(file_list)
+
+
+def _readZernikeCache(file_name, key):
+    """
+    Read the coefficients written by _writeZernikeCache
+
+    Parameters
+    ----------
+    file_name is the name of the cache file
+
+    key is the checksum the coefficients must have been written with
+
+    Returns
+    -------
+    A dict keyed on 'pupil_to_focal' and 'focal_to_pupil' of numpy arrays
+    of shape (n_bands, 2, n_terms) (the second axis being x, y), and the
+    n and m grid of the Zernike polynomials, along with any other arrays
+    written with them; or None if the file does not exist, cannot be read
+    or was written with a different key.
+    """
+    if not os.path.exists(file_name):
+        return None
+    try:
+        with np.load(file_name, allow_pickle=False) as data:
+            if str(data['key']) != key:
+                return None
+            coeffs = dict((name, data[name]) for name in data.files if name != 'key')
+    except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+    for name in ('pupil_to_focal', 'focal_to_pupil', 'n_grid', 'm_grid'):
+        if name not in coeffs:
+            return None
+    return coeffs
+
+
+def _writeZernikeCache(file_name, key, coeffs):
+    """
+    Atomically write coefficients to a cache file, so that processes
+    sharing the file never see it partially written.  Failure to write
+    the cache (e.g. in a read-only directory) is not an error.
+
+    Parameters
+    ----------
+    file_name is the name of the cache file
+
+    key is the checksum identifying the inputs to the fit
+
+    coeffs is a dict in the format returned by _readZernikeCache
+    """
+    cache_dir = os.path.dirname(os.path.abspath(file_name))
+    tmp_name = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file in the same directory, then rename it
+        # over the cache file in one step
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.npz', delete=False) as tmp_file:
+            tmp_name = tmp_file.name
+            np.savez(tmp_file, key=np.array(key), **coeffs)
+        os.replace(tmp_name, file_name)
+        tmp_name = None
+    except OSError:
+        pass
+    finally:
+        # never leave the temporary file behind, whatever went wrong
+        if tmp_name is not None and os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+
 def _rawPupilCoordsFromObserved(ra_obs, dec_obs, ra0, dec0, rotSkyPos):
     """
     Convert Observed RA, Dec into pupil coordinates
@@ -56,23 +154,20 @@ def _rawPupilCoordsFromObserved(ra_obs, dec_obs, ra0, dec0, rotSkyPos):
             x = np.NaN
             y = np.NaN
     else:
-        try:
-            x, y = palpy.ds2tpVector(ra_obs, dec_obs, ra_pointing, dec_pointing)
-        except:
-            # apparently, one of your ra/dec values was improper; we will have to do this
-            # element-wise, putting NaN in the place of the bad values
-            x = []
-            y = []
-            for rr, dd in zip(ra_obs, dec_obs):
-                try:
-                    xx, yy = palpy.ds2tp(rr, dd, ra_pointing, dec_pointing)
-                except:
-                    xx = np.NaN
-                    yy = np.NaN
-                x.append(xx)
-                y.append(yy)
-            x = np.array(x)
-            y = np.array(y)
+        # palpy rejects points that are not finite or are 90 degrees or
+        # more from the tangent point; find them up front so that only the
+        # valid points are projected and the rest are left as NaN
+        ra_obs, dec_obs = np.ma.filled(ra_obs, np.NaN), np.ma.filled(dec_obs, np.NaN)
+        with np.errstate(invalid='ignore'):
+            denom = (np.sin(dec_obs)*np.sin(dec_pointing) +
+                     np.cos(dec_obs)*np.cos(dec_pointing)*np.cos(ra_obs-ra_pointing))
+            valid = np.where(np.logical_and(np.isfinite(denom), denom > 1.0e-6))[0]
+
+        x = np.full(len(ra_obs), np.NaN, dtype=float)
+        y = np.full(len(ra_obs), np.NaN, dtype=float)
+        if len(valid) > 0:
+            x[valid], y[valid] = palpy.ds2tpVector(ra_obs[valid], dec_obs[valid],
+                                                   ra_pointing, dec_pointing)
 
     # rotate the result by rotskypos (rotskypos being "the angle of the sky relative to
     # camera coordinates" according to phoSim documentation) to account for
@@ -91,9 +186,31 @@ class LsstZernikeFitter(object):
     filter-dependent part.
     """
 
-    def __init__(self):
-        self._camera = lsst_camera()
-        self._pixel_transformer = DMtoCameraPixelTransformer()
+    def __init__(self, cache_dir=None, force_refit=False, camera=None):
+        """
+        Parameters
+        ----------
+        cache_dir is the directory in which the fit coefficients are cached
+        (see _defaultZernikeCacheDir for the default).  The cache file is keyed
+        by the camera's geometry and the Zernike polynomials fit, and holds a
+        checksum of the contents of the FocalPlaneData in sims_data, so it is
+        safe to share between processes and across changes to any of them.
+        The FocalPlaneData are only read (to recompute the checksum) if the
+        names, sizes or modification or change times of their files differ
+        from those recorded in the cache.
+
+        force_refit is a boolean.  If True, the coefficients are fit from
+        the FocalPlaneData and the cache is overwritten (default False).
+
+        camera is the afwCameraGeom camera the FocalPlaneData were simulated
+        with.  If None (default), the PhoSim LSST camera is built.
+        """
+        if camera is None:
+            # obs_lsst is slow to import; only import it when it is needed
+            import lsst.obs.lsst.phosim as obs_lsst_phosim
+            camera = obs_lsst_phosim.PhosimMapper().camera
+        self._camera = camera
+        self._pixel_transformer = DMtoCameraPixelTransformer(camera=camera)
         self._z_gen = ZernikePolynomialGenerator()
 
         self._rr = 500.0  # radius in mm of circle containing LSST focal plane;
@@ -125,7 +242,115 @@ class LsstZernikeFitter(object):
                 self._n_grid.append(n)
                 self._m_grid.append(m)
 
-        self._build_transformations()
+        if cache_dir is None:
+            cache_dir = _defaultZernikeCacheDir()
+
+        focal_plane_dir = os.path.join(getPackageDir('sims_data'), 'FocalPlaneData')
+        key = self._cache_key()
+        cache_file = os.path.join(cache_dir, 'lsst_zernike_coeffs_%s.npz' % key[:16])
+        manifest = self._manifest(focal_plane_dir)
+
+        coeffs = None
+        if not force_refit:
+            coeffs = _readZernikeCache(cache_file, key)
+
+        if coeffs is not None and str(coeffs.get('manifest', '')) != manifest:
+            # the files have been touched; only their contents matter
+            checksum = self._content_checksum(focal_plane_dir)
+            if str(coeffs.get('checksum', '')) == checksum:
+                coeffs['manifest'] = np.array(manifest)
+                _writeZernikeCache(cache_file, key, coeffs)
+            else:
+                coeffs = None
+
+        if coeffs is None:
+            self._build_transformations()
+            coeffs = self._coeffs_to_arrays()
+            coeffs['manifest'] = np.array(manifest)
+            coeffs['checksum'] = np.array(self._content_checksum(focal_plane_dir))
+            _writeZernikeCache(cache_file, key, coeffs)
+        else:
+            self._coeffs_from_arrays(coeffs)
+
+    def _fit_parameters(self):
+        """
+        Return a string identifying the version of the cache and the (n, m)
+        grid and normalizing radius of the Zernike polynomials
+        """
+        return '%d %r %r %r' % (_zernike_cache_version, self._n_grid, self._m_grid, self._rr)
+
+    def _cache_key(self):
+        """
+        Return the hex checksum the cache file is keyed on: the fit parameters
+        and the camera's geometry.  The checksum of the geometry is kept in the
+        CameraTransformCache, so it is only computed once per camera.
+        """
+        def geometry_checksum():
+            geometry = getCameraGeometryTable(self._camera)
+            hasher = hashlib.sha256()
+            hasher.update(self._camera.getName().encode())
+            for column in (geometry.names.astype(str), geometry.det_types, geometry.bbox,
+                           geometry.corners_mm, geometry.orientation, geometry.pixel_size):
+                hasher.update(np.ascontiguousarray(column).tobytes())
+            return hasher.hexdigest()
+
+        hasher = hashlib.sha256()
+        hasher.update(self._fit_parameters().encode())
+        hasher.update(getCameraTransformCache().get(self._camera, 'geometry_checksum',
+                                                    geometry_checksum).encode())
+        return hasher.hexdigest()
+
+    def _manifest(self, focal_plane_dir):
+        """
+        Return a hex checksum of the path, size and modification and change
+        times of every file in the FocalPlaneData directory.  No file is read.
+        The change time is updated by every write, so a file rewritten with
+        the same size and modification time still changes the manifest.
+        """
+        hasher = hashlib.sha256()
+        for rel_name, full_name in _focalPlaneFiles(focal_plane_dir):
+            stat = os.stat(full_name)
+            hasher.update(('%s %d %d %d\n' % (rel_name, stat.st_size, stat.st_mtime_ns,
+                                              stat.st_ctime_ns)).encode())
+        return hasher.hexdigest()
+
+    def _content_checksum(self, focal_plane_dir):
+        """
+        Return a hex checksum of the contents of the FocalPlaneData directory
+        """
+        hasher = hashlib.sha256()
+        for rel_name, full_name in _focalPlaneFiles(focal_plane_dir):
+            hasher.update(rel_name.encode())
+            with open(full_name, 'rb') as input_file:
+                hasher.update(input_file.read())
+        return hasher.hexdigest()
+
+    def _coeffs_to_arrays(self):
+        """
+        Pack the fit coefficients into arrays in the format of _readZernikeCache
+        """
+        keys = list(zip(self._n_grid, self._m_grid))
+        coeffs = {'n_grid': np.array(self._n_grid), 'm_grid': np.array(self._m_grid)}
+        for name, transformation in (('pupil_to_focal', self._pupil_to_focal),
+                                     ('focal_to_pupil', self._focal_to_pupil)):
+            coeffs[name] = np.array([[[transformation[band][axis][kk] for kk in keys]
+                                      for axis in ('x', 'y')]
+                                     for band in self._int_to_band])
+        return coeffs
+
+    def _coeffs_from_arrays(self, coeffs):
+        """
+        Unpack coefficients read by _readZernikeCache
+        """
+        keys = list(zip(coeffs['n_grid'].tolist(), coeffs['m_grid'].tolist()))
+        self._pupil_to_focal = {}
+        self._focal_to_pupil = {}
+        for name, transformation in (('pupil_to_focal', self._pupil_to_focal),
+                                     ('focal_to_pupil', self._focal_to_pupil)):
+            for i_band, band in enumerate(self._int_to_band):
+                transformation[band] = {}
+                for i_axis, axis in enumerate(('x', 'y')):
+                    transformation[band][axis] = dict(zip(keys, coeffs[name][i_band, i_axis]))
 
     def _get_coeffs(self, x_in, y_in, x_out, y_out):
         """
@@ -211,13 +436,9 @@ class LsstZernikeFitter(object):
 
         # convert from FIELD_ANGLE to FOCAL_PLANE without attempting to model
         # the optical distortions in the telescope
-        field_to_focal = self._camera.getTransform(FIELD_ANGLE, FOCAL_PLANE)
-        catsim_xmm = np.zeros(len(x_field), dtype=float)
-        catsim_ymm = np.zeros(len(y_field), dtype=float)
-        for ii, (xx, yy) in enumerate(zip(x_field, y_field)):
-            focal_pt = field_to_focal.applyForward(geom.Point2D(xx, yy))
-            catsim_xmm[ii] = focal_pt.getX()
-            catsim_ymm[ii] = focal_pt.getY()
+        transform_cache = getCameraTransformCache()
+        field_to_focal = transform_cache.getTransform(self._camera, FIELD_ANGLE, FOCAL_PLANE)
+        catsim_xmm, catsim_ymm = _transformArrays(field_to_focal, x_field, y_field)
 
         phosim_dtype = np.dtype([('id', int), ('phot', float),
                                  ('xpix', float), ('ypix', float)])
@@ -225,18 +446,24 @@ class LsstZernikeFitter(object):
         self._pupil_to_focal = {}
         self._focal_to_pupil = {}
 
+        geometry = getCameraGeometryTable(self._camera)
+        science_rows = np.where(geometry.det_types == int(DetectorType.SCIENCE))[0]
+
+        # the detector transforms do not depend on the band; look them up once
+        pixels_to_focal = {}
+        for i_det in science_rows:
+            pixels_to_focal[i_det] = transform_cache.getTransform(self._camera, PIXELS, FOCAL_PLANE,
+                                                                  detectorName=geometry.names[i_det])
+
         for i_filter in range(6):
             self._pupil_to_focal[self._int_to_band[i_filter]] = {}
             self._focal_to_pupil[self._int_to_band[i_filter]] = {}
             phosim_xmm = np.zeros(len(catsim_data['ypup']), dtype=float)
             phosim_ymm = np.zeros(len(catsim_data['ypup']), dtype=float)
 
-            for det in self._camera:
-                if det.getType() != DetectorType.SCIENCE:
-                    continue
-                pixels_to_focal = det.getTransform(PIXELS, FOCAL_PLANE)
-                det_name = det.getName()
-                bbox = det.getBBox()
+            for i_det in science_rows:
+                det_name = geometry.names[i_det]
+                xmin, ymin, xmax, ymax = geometry.bbox[i_det]
                 det_name_m = det_name.replace(':','').replace(',','').replace(' ','_')
 
                 # read in the actual pixel positions of the sources as realized
@@ -247,20 +474,15 @@ class LsstZernikeFitter(object):
 
                 # make sure that the data we are fitting to is not too close
                 # to the edge of the detector
-                assert phosim_data['xpix'].min() > bbox.getMinY() + 50.0
-                assert phosim_data['xpix'].max() < bbox.getMaxY() - 50.0
-                assert phosim_data['ypix'].min() > bbox.getMinX() + 50.0
-                assert phosim_data['ypix'].max() < bbox.getMaxX() - 50.0
+                assert phosim_data['xpix'].min() > ymin + 50.0
+                assert phosim_data['xpix'].max() < ymax - 50.0
+                assert phosim_data['ypix'].min() > xmin + 50.0
+                assert phosim_data['ypix'].max() < xmax - 50.0
 
                 xpix, ypix = self._pixel_transformer.dmPixFromCameraPix(phosim_data['xpix'],
                                                                         phosim_data['ypix'],
                                                                         det_name)
-                xmm = np.zeros(len(xpix), dtype=float)
-                ymm = np.zeros(len(ypix), dtype=float)
-                for ii in range(len(xpix)):
-                    focal_pt = pixels_to_focal.applyForward(geom.Point2D(xpix[ii], ypix[ii]))
-                    xmm[ii] = focal_pt.getX()
-                    ymm[ii] = focal_pt.getY()
+                xmm, ymm = _transformArrays(pixels_to_focal[i_det], xpix, ypix)
                 phosim_xmm[phosim_data['id']-1] = xmm
                 phosim_ymm[phosim_data['id']-1] = ymm
 
@@ -328,10 +550,13 @@ class LsstZernikeFitter(object):
 
         The recipe to correctly use this method is
 
+        from lsst.obs.lsst.phosim import PhosimMapper
+        camera = PhosimMapper().camera
+
         xf0, yf0 = focalPlaneCoordsFromPupilCoords(xpupil, ypupil,
-                                                   camera=lsst_camera())
+                                                   camera=camera)
 
-        dx, dy = LsstZernikeFitter().dxdy(xf0, yf0, band=band)
+        dx, dy = LsstZernikeFitter(camera=camera).dxdy(xf0, yf0, band=band)
 
         xf = xf0 + dx
         yf = yf0 + dy
@@ -363,11 +588,14 @@ class LsstZernikeFitter(object):
 
         The recipe to correctly use this method is
 
-        dx, dy = LsstZernikeFitter().dxdy_inverse(xf, yf, band=band)
+        from lsst.obs.lsst.phosim import PhosimMapper
+        camera = PhosimMapper().camera
+
+        dx, dy = LsstZernikeFitter(camera=camera).dxdy_inverse(xf, yf, band=band)
 
         xp, yp = pupilCoordsFromFocalPlaneCoords(xf+dx,
                                                  yf+dy,
-                                                 camera=lsst_camera())
+                                                 camera=camera)
 
         xp and yp are now the actual position in radians on the pupil
         corresponding to the focal plane coordinates xf, yf
@@ -0,0 +1,361 @@
+import warnings
+import numpy as np
+from lsst.sims.coordUtils.CameraUtils import MultipleChipWarning
+from lsst.sims.coordUtils.CameraUtils import _validate_inputs, _pupilCoordsFromRaDec
+from lsst.sims.coordUtils.CameraUtils import radiansFromArcsec, _observationMetaDataClass
+from lsst.sims.coordUtils.CameraUtils import projectFromPupilCoords
+from lsst.sims.coordUtils.CameraUtils import _validRaDecRows
+from lsst.sims.coordUtils.CatalogSpatialIndexUtils import CatalogSpatialIndex
+
+__all__ = ["visit_projection_dtype",
+           "visitProjectionFromRaDec", "_visitProjectionFromRaDec",
+           "visitProjectionChunksFromRaDec", "_visitProjectionChunksFromRaDec"]
+
+
+# the long-format table returned by visitProjectionFromRaDec;
+# 'detector' is an index into getDetectorNameTable(camera)
+visit_projection_dtype = np.dtype([('visit', np.int32), ('source', np.int64),
+                                   ('detector', np.int16),
+                                   ('xPix', float), ('yPix', float)])
+
+
+def _obsMetaDataFromVisits(visits, method_name='visitProjectionFromRaDec'):
+    """
+    Convert a description of many visits into a list of ObservationMetaData
+
+    @param [in] visits is either a list of ObservationMetaData or a numpy
+    structured array (or dict of numpy arrays) with the columns 'pointingRA',
+    'pointingDec', 'rotSkyPos' (all in degrees) and 'mjd' (TAI)
+
+    @param [in] method_name is the name of the calling method, used in
+    error messages
+
+    @param [out] a list of ObservationMetaData
+    """
+    if isinstance(visits, dict) or isinstance(visits, np.ndarray):
+        for col in ('pointingRA', 'pointingDec', 'rotSkyPos', 'mjd'):
+            if isinstance(visits, dict):
+                has_col = col in visits
+            else:
+                has_col = visits.dtype.names is not None and col in visits.dtype.names
+            if not has_col:
+                raise RuntimeError("The table of visits passed to %s "
+                                   "must have a '%s' column" % (method_name, col))
+
+        ObservationMetaData = _observationMetaDataClass()
+        return [ObservationMetaData(pointingRA=float(ra), pointingDec=float(dec),
+                                    rotSkyPos=float(rot), mjd=float(mjd))
+                for ra, dec, rot, mjd in zip(visits['pointingRA'], visits['pointingDec'],
+                                             visits['rotSkyPos'], visits['mjd'])]
+
+    obs_list = list(visits)
+    for obs in obs_list:
+        if obs.mjd is None:
+            raise RuntimeError("You need to pass ObservationMetaData with mjds into "
+                               "%s" % method_name)
+        if obs.rotSkyPos is None:
+            raise RuntimeError("You need to pass ObservationMetaData with rotSkyPos into "
+                               "%s" % method_name)
+    return obs_list
+
+
+def _motionFromArcsec(pm_ra, pm_dec, parallax):
+    """
+    Convert proper motion and parallax from arcsec to radians,
+    passing None through
+    """
+    return [radiansFromArcsec(arr) if arr is not None else None
+            for arr in (pm_ra, pm_dec, parallax)]
+
+
+def _motionBound(pm_ra, pm_dec, parallax):
+    """
+    Bound how far the sources of a catalog can move on the sky
+
+    @param [in] pm_ra, pm_dec and parallax are the proper motion (radians/yr)
+    and parallax (radians) of the sources (arrays, scalars or None)
+
+    @param [out] the largest total proper motion in radians/yr
+
+    @param [out] the largest parallax in radians
+    """
+    def _largest(arr):
+        if arr is None or np.size(arr) == 0:
+            return 0.0
+        return float(np.max(np.abs(arr)))
+
+    return np.hypot(_largest(pm_ra), _largest(pm_dec)), _largest(parallax)
+
+
+def _julianYear(obs_metadata):
+    """
+    Return the date of a visit as a Julian year
+    """
+    return 2000.0 + (obs_metadata.mjd.TAI - 51544.5)/365.25
+
+
+def visitProjectionFromRaDec(ra, dec, visits, camera=None,
+                             pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                             epoch=2000.0, includeDistortion=True, visit_chunk_size=100,
+                             margin=0.1):
+    """
+    Find the chips and pixel coordinates of a catalog of objects, specified by
+    their RA and Dec in degrees, in each of many visits.
+
+    @param [in] ra is a numpy array of RA in degrees
+    (International Celestial Reference System)
+
+    @param [in] dec is a numpy array of Dec in degrees
+    (International Celestial Reference System)
+
+    @param [in] visits is either a list of ObservationMetaData or a numpy structured
+    array (or dict of numpy arrays) with the columns 'pointingRA', 'pointingDec',
+    'rotSkyPos' (all in degrees) and 'mjd' (TAI)
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (arcsec/yr)
+    Can be a numpy array or None (default=None).
+
+    @param [in] pm_dec is proper motion in dec (arcsec/yr)
+    Can be a numpy array or None (default=None).
+
+    @param [in] parallax is parallax in arcsec
+    Can be a numpy array or None (default=None).
+
+    @param [in] v_rad is radial velocity (km/s)
+    Can be a numpy array or None (default=None).
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which
+    RA is measured.  Default is 2000.
+
+    @param [in] includeDistortion is a boolean.  If True (default), return true pixel
+    coordinates; if False, return TAN_PIXEL coordinates.
+
+    @param [in] visit_chunk_size is the number of visits processed together
+    (default 100); see visitProjectionChunksFromRaDec
+
+    @param [in] margin is the distance in degrees beyond the edge of the camera within
+    which sources are projected in each visit (default 0.1).  It must cover
+    refraction and aberration; the largest distance any source can move through
+    proper motion between epoch and the visit, plus the largest parallax, is
+    added to it in each visit.
+
+    @param [out] a numpy array of dtype visit_projection_dtype with one row for
+    each (visit, object) pair in which the object lands on a chip.  'visit' and
+    'source' index visits and the input catalog; 'detector' indexes
+    getDetectorNameTable(camera).
+    """
+    pm_ra, pm_dec, parallax = _motionFromArcsec(pm_ra, pm_dec, parallax)
+    return _visitProjectionFromRaDec(np.radians(ra), np.radians(dec), visits, camera=camera,
+                                     pm_ra=pm_ra, pm_dec=pm_dec,
+                                     parallax=parallax, v_rad=v_rad,
+                                     epoch=epoch, includeDistortion=includeDistortion,
+                                     visit_chunk_size=visit_chunk_size, margin=margin)
+
+
+def _visitProjectionFromRaDec(ra, dec, visits, camera=None,
+                              pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                              epoch=2000.0, includeDistortion=True, visit_chunk_size=100,
+                              margin=0.1):
+    """
+    Find the chips and pixel coordinates of a catalog of objects, specified by
+    their RA and Dec in radians, in each of many visits.
+
+    This gathers the tables yielded by _visitProjectionChunksFromRaDec into
+    one table, so it holds the whole output (and, while the tables are joined,
+    a second copy of it).  Iterate over _visitProjectionChunksFromRaDec to
+    keep memory bounded by visit_chunk_size visits.
+
+    @param [in] ra is a numpy array of RA in radians
+    (International Celestial Reference System)
+
+    @param [in] dec is a numpy array of Dec in radians
+    (International Celestial Reference System)
+
+    @param [in] visits is either a list of ObservationMetaData or a numpy structured
+    array (or dict of numpy arrays) with the columns 'pointingRA', 'pointingDec',
+    'rotSkyPos' (all in degrees) and 'mjd' (TAI)
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (radians/yr)
+    Can be a numpy array or None (default=None).
+
+    @param [in] pm_dec is proper motion in dec (radians/yr)
+    Can be a numpy array or None (default=None).
+
+    @param [in] parallax is parallax in radians
+    Can be a numpy array or None (default=None).
+
+    @param [in] v_rad is radial velocity (km/s)
+    Can be a numpy array or None (default=None).
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which
+    RA is measured.  Default is 2000.
+
+    @param [in] includeDistortion is a boolean.  If True (default), return true pixel
+    coordinates; if False, return TAN_PIXEL coordinates.
+
+    @param [in] visit_chunk_size is the number of visits processed together
+    (default 100)
+
+    @param [in] margin is the distance in degrees beyond the edge of the camera within
+    which sources are projected in each visit (default 0.1), before the motion
+    of the sources is added to it (see visitProjectionFromRaDec)
+
+    @param [out] a numpy array of dtype visit_projection_dtype with one row for
+    each (visit, object) pair in which the object lands on a chip.  'visit' and
+    'source' index visits and the input catalog; 'detector' indexes
+    getDetectorNameTable(camera).
+    """
+    chunk_list = list(_visitProjectionChunksFromRaDec(ra, dec, visits, camera=camera,
+                                                      pm_ra=pm_ra, pm_dec=pm_dec,
+                                                      parallax=parallax, v_rad=v_rad,
+                                                      epoch=epoch,
+                                                      includeDistortion=includeDistortion,
+                                                      visit_chunk_size=visit_chunk_size,
+                                                      margin=margin))
+    if len(chunk_list) == 0:
+        return np.zeros(0, dtype=visit_projection_dtype)
+    if len(chunk_list) == 1:
+        return chunk_list[0]
+    return np.concatenate(chunk_list)
+
+
+def visitProjectionChunksFromRaDec(ra, dec, visits, camera=None,
+                                   pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                                   epoch=2000.0, includeDistortion=True, visit_chunk_size=100,
+                                   margin=0.1):
+    """
+    Find the chips and pixel coordinates of a catalog of objects, specified by
+    their RA and Dec in degrees, in each of many visits, visit_chunk_size
+    visits at a time.
+
+    The parameters are the same as those of visitProjectionFromRaDec.  Errors
+    in them are raised by this call, not when the generator is first advanced.
+
+    @param [out] a generator yielding, for every visit_chunk_size visits in order,
+    a numpy array of dtype visit_projection_dtype (see visitProjectionFromRaDec).
+    Only the visits of one chunk are held in memory at a time.
+    """
+    pm_ra, pm_dec, parallax = _motionFromArcsec(pm_ra, pm_dec, parallax)
+    return _visitProjectionChunksFromRaDec(np.radians(ra), np.radians(dec), visits,
+                                           camera=camera, pm_ra=pm_ra, pm_dec=pm_dec,
+                                           parallax=parallax, v_rad=v_rad, epoch=epoch,
+                                           includeDistortion=includeDistortion,
+                                           visit_chunk_size=visit_chunk_size, margin=margin)
+
+
+def _visitProjectionChunksFromRaDec(ra, dec, visits, camera=None,
+                                    pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                                    epoch=2000.0, includeDistortion=True, visit_chunk_size=100,
+                                    margin=0.1):
+    """
+    Find the chips and pixel coordinates of a catalog of objects, specified by
+    their RA and Dec in radians, in each of many visits, visit_chunk_size
+    visits at a time.
+
+    The parameters are the same as those of _visitProjectionFromRaDec.  Errors
+    in them are raised by this call, not when the generator is first advanced.
+
+    Work that does not depend on the visit is done once: objects with masked or
+    non-finite RA, Dec, proper motion, parallax or radial velocity are dropped
+    (they never appear in the output), and the remaining objects are put in a
+    CatalogSpatialIndex.  Each visit then only runs the astrometry and camera
+    transforms on the objects within margin of its field of view, the margin
+    being widened by how far the fastest object can move by the visit's date.
+
+    @param [out] a generator yielding, for every visit_chunk_size visits in order,
+    a numpy array of dtype visit_projection_dtype (see _visitProjectionFromRaDec).
+    Only the visits of one chunk are held in memory at a time.
+    """
+    are_arrays = _validate_inputs([ra, dec], ['ra', 'dec'], 'visitProjectionFromRaDec')
+
+    if not are_arrays:
+        raise RuntimeError("visitProjectionFromRaDec needs numpy arrays of RA and Dec")
+
+    if camera is None:
+        raise RuntimeError("You cannot call visitProjectionFromRaDec without specifying a camera")
+
+    if epoch is None:
+        raise RuntimeError("You need to pass an epoch into visitProjectionFromRaDec")
+
+    if visit_chunk_size < 1:
+        raise RuntimeError("visit_chunk_size must be at least 1")
+
+    if margin < 0.0:
+        raise RuntimeError("margin must not be negative")
+
+    obs_list = _obsMetaDataFromVisits(visits)
+
+    # 'source' is mapped back onto the input catalog through valid_rows
+    valid_rows, catalog = _validRaDecRows(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                          parallax=parallax, v_rad=v_rad)
+    if valid_rows is None:
+        valid_rows = np.arange(len(catalog[0]))
+
+    if len(valid_rows) > 0:
+        spatial_index = CatalogSpatialIndex(np.degrees(catalog[0]), np.degrees(catalog[1]))
+    else:
+        spatial_index = None
+
+    return _iterVisitProjection(catalog, valid_rows, spatial_index, obs_list, camera,
+                                epoch, includeDistortion, visit_chunk_size, margin)
+
+
+def _iterVisitProjection(catalog, valid_rows, spatial_index, obs_list, camera,
+                         epoch, includeDistortion, visit_chunk_size, margin):
+    """
+    The generator behind _visitProjectionChunksFromRaDec.  spatial_index
+    is None if no object is valid; every chunk is then empty.
+    """
+    columns = ('detectorIndex', 'xPix', 'yPix')
+    pending = []
+    max_pm, max_parallax = _motionBound(*catalog[2:5])
+
+    for i_visit, obs in enumerate(obs_list):
+        if spatial_index is not None:
+            motion = max_pm*np.abs(_julianYear(obs) - epoch) + max_parallax
+            in_field = spatial_index.fieldIndices(obs, camera,
+                                                  margin=margin + np.degrees(motion))
+        else:
+            in_field = np.zeros(0, dtype=np.int64)
+        if len(in_field) > 0:
+            ra, dec, pm_ra, pm_dec, parallax, v_rad = [arr[in_field]
+                                                       if isinstance(arr, np.ndarray) and arr.ndim > 0
+                                                       else arr for arr in catalog]
+            xPupil, yPupil = _pupilCoordsFromRaDec(ra, dec,
+                                                   pm_ra=pm_ra, pm_dec=pm_dec,
+                                                   parallax=parallax, v_rad=v_rad,
+                                                   obs_metadata=obs, epoch=epoch)
+
+            with warnings.catch_warnings(record=True) as warning_list:
+                warnings.simplefilter('always')
+                projection = projectFromPupilCoords(xPupil, yPupil, camera=camera,
+                                                    columns=columns,
+                                                    includeDistortion=includeDistortion)
+
+            # report the offending objects by their rows in the input catalog
+            for ww in warning_list:
+                message = ww.message
+                if isinstance(message, MultipleChipWarning) and message.indices is not None:
+                    message = MultipleChipWarning.fromIndices(valid_rows[in_field[message.indices]],
+                                                              message.point_label)
+                warnings.warn(message)
+
+            on_chip = np.where(projection['detectorIndex'] >= 0)[0]
+            visit_rows = np.empty(len(on_chip), dtype=visit_projection_dtype)
+            visit_rows['visit'] = i_visit
+            visit_rows['source'] = valid_rows[in_field[on_chip]]
+            visit_rows['detector'] = projection['detectorIndex'][on_chip]
+            visit_rows['xPix'] = projection['xPix'][on_chip]
+            visit_rows['yPix'] = projection['yPix'][on_chip]
+            pending.append(visit_rows)
+
+        if (i_visit+1) % visit_chunk_size == 0 or i_visit == len(obs_list)-1:
+            if len(pending) > 0:
+                yield np.concatenate(pending)
+            else:
+                yield np.zeros(0, dtype=visit_projection_dtype)
+            pending = []
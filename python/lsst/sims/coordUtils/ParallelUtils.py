@@ -0,0 +1,374 @@
+import os
+import warnings
+from collections import deque
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from lsst.sims.coordUtils.CameraUtils import _projectFromRaDec, projectFromPupilCoords
+from lsst.sims.coordUtils.CameraUtils import radiansFromArcsec
+from lsst.sims.coordUtils.CameraUtils import MultipleChipWarning
+
+__all__ = ["phosimCamera", "ProjectionExecutor"]
+
+
+def phosimCamera():
+    """
+    Return lsst.obs.lsst.phosim.PhosimMapper().camera.  This is the default
+    camera_factory for ProjectionExecutor.
+    """
+    from lsst.obs.lsst.phosim import PhosimMapper
+    return PhosimMapper().camera
+
+
+def _radiansOrNone(value):
+    """
+    Convert arcsec to radians, passing None through
+    """
+    return radiansFromArcsec(value) if value is not None else None
+
+
+# the camera built by each worker process's initializer
+_worker_camera = None
+
+
+def _initWorker(camera_factory):
+    global _worker_camera
+    _worker_camera = camera_factory()
+
+
+def _recordWarnings(func, *args, **kwargs):
+    """
+    Call func, returning its result along with a list of the Warnings
+    it emitted, so that they can be re-emitted in the parent process
+    """
+    with warnings.catch_warnings(record=True) as warning_list:
+        warnings.simplefilter('always')
+        result = func(*args, **kwargs)
+    return result, [ww.message for ww in warning_list]
+
+
+def _projectRaDecShard(args):
+    ra, dec, motion, kwargs = args
+    return _recordWarnings(_projectFromRaDec, ra, dec, camera=_worker_camera,
+                           **motion, **kwargs)
+
+
+def _projectPupilShard(args):
+    xPupil, yPupil, kwargs = args
+    return _recordWarnings(projectFromPupilCoords, xPupil, yPupil, camera=_worker_camera,
+                           **kwargs)
+
+
+class ProjectionExecutor(object):
+    """
+    Run the single-pass projections of CameraUtils (see projectFromRaDec and
+    projectFromPupilCoords) on a pool of worker processes.
+
+    Each worker builds its own camera exactly once, when it starts, by calling
+    camera_factory; the camera's transforms and lookup tables are then cached
+    in the worker for every shard it processes.  Inputs are split into shards
+    of shard_size objects, and the results are reassembled in input order, so
+    they are identical to those of the serial methods.  Warnings emitted in
+    the workers (e.g. MultipleChipWarning, with its indices counted from the
+    start of the whole input) are re-emitted in the calling process.
+
+    At most max_pending_shards shards are in flight at a time.  The
+    projectFromRaDecChunks and projectFromPupilCoordsChunks methods yield
+    the result of each shard as soon as it is ready, so that their memory
+    use does not grow with the size of the input.
+
+    Use as a context manager, or call close() when done, to shut down the pool:
+
+        with ProjectionExecutor(n_workers=64) as executor:
+            result = executor.projectFromRaDec(ra, dec, obs_metadata=obs)
+    """
+
+    def __init__(self, n_workers=None, camera_factory=phosimCamera, shard_size=100000,
+                 max_pending_shards=None):
+        """
+        @param [in] n_workers is the number of worker processes.  If None (default),
+        one per CPU.
+
+        @param [in] camera_factory is a picklable callable taking no arguments
+        and returning an afwCameraGeom camera object (default phosimCamera).
+        It is called once in each worker process.
+
+        @param [in] shard_size is the number of objects sent to a worker at a
+        time (default 10**5)
+
+        @param [in] max_pending_shards is the maximum number of shards submitted
+        to the workers but not yet handed back to the caller.  If None (default),
+        twice the number of workers.
+        """
+        if n_workers is not None and n_workers < 1:
+            raise RuntimeError("ProjectionExecutor needs n_workers >= 1; you gave %d" % n_workers)
+        if shard_size < 1:
+            raise RuntimeError("ProjectionExecutor needs shard_size >= 1; you gave %d" % shard_size)
+        if max_pending_shards is None:
+            max_pending_shards = 2*(n_workers if n_workers is not None else (os.cpu_count() or 1))
+        if max_pending_shards < 1:
+            raise RuntimeError("ProjectionExecutor needs max_pending_shards >= 1; "
+                               "you gave %d" % max_pending_shards)
+
+        self._shard_size = shard_size
+        self._max_pending_shards = max_pending_shards
+        self._pool = ProcessPoolExecutor(max_workers=n_workers,
+                                         initializer=_initWorker,
+                                         initargs=(camera_factory,))
+
+    @property
+    def shard_size(self):
+        return self._shard_size
+
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def max_pending_shards(self):
+        return self._max_pending_shards
+
+    def _shardSlices(self, n_obj):
+        return [slice(i_start, i_start+self._shard_size)
+                for i_start in range(0, n_obj, self._shard_size)]
+
+    def _iterShards(self, func, shards):
+        """
+        Submit shards to the workers, keeping at most max_pending_shards
+        of them in flight, and yield their results in input order.
+
+        @param [in] func is the worker function applied to each shard
+
+        @param [in] shards is an iterable of (start, shard) pairs, where
+        start is the index in the whole input of the first object in shard
+        """
+        pending = deque()
+        try:
+            for start, shard in shards:
+                pending.append((start, self._pool.submit(func, shard)))
+                if len(pending) >= self._max_pending_shards:
+                    yield self._shardResult(*pending.popleft())
+            while len(pending) > 0:
+                yield self._shardResult(*pending.popleft())
+        finally:
+            for start, future in pending:
+                future.cancel()
+
+    def _shardResult(self, start, future):
+        """
+        Wait for a shard, re-emit the warnings raised while processing it
+        and return its result
+        """
+        result, warning_list = future.result()
+        for message in warning_list:
+            if isinstance(message, MultipleChipWarning) and message.indices is not None:
+                message = MultipleChipWarning.fromIndices(message.indices + start,
+                                                          message.point_label)
+            warnings.warn(message)
+        return result
+
+    def _gather(self, results, columns):
+        if len(results) == 0:
+            empty_dtype = {'detectorIndex': np.int16, 'chipName': object}
+            return dict((cc, np.zeros(0, dtype=empty_dtype.get(cc, float))) for cc in columns)
+        return dict((cc, np.concatenate([rr[cc] for rr in results])) for cc in columns)
+
+    def projectFromRaDec(self, ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                         obs_metadata=None, epoch=2000.0,
+                         columns=('chipName', 'xPix', 'yPix'), includeDistortion=True):
+        """
+        Compute several focal plane quantities for objects based on their
+        RA and Dec (in degrees), in parallel.
+
+        @param [in] ra is a numpy array of RA in degrees
+        (International Celestial Reference System)
+
+        @param [in] dec is a numpy array of Dec in degrees
+        (International Celestial Reference System)
+
+        @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (arcsec/yr)
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] pm_dec is proper motion in dec (arcsec/yr)
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] parallax is parallax in arcsec
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] v_rad is radial velocity (km/s)
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] obs_metadata is an ObservationMetaData characterizing the telescope
+        pointing.
+
+        @param [in] epoch is the epoch in Julian years of the equinox against which
+        RA is measured.  Default is 2000.
+
+        @param [in] columns is a list of the quantities to compute; see
+        projectFromPupilCoords for the allowed values.
+
+        @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+        will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+        @param [out] a dict of numpy arrays keyed on the entries in columns
+        """
+        return self._projectFromRaDec(np.radians(ra), np.radians(dec),
+                                      pm_ra=_radiansOrNone(pm_ra), pm_dec=_radiansOrNone(pm_dec),
+                                      parallax=_radiansOrNone(parallax), v_rad=v_rad,
+                                      obs_metadata=obs_metadata, epoch=epoch,
+                                      columns=columns, includeDistortion=includeDistortion)
+
+    def _projectFromRaDec(self, ra, dec, pm_ra=None, pm_dec=None, parallax=None, v_rad=None,
+                          obs_metadata=None, epoch=2000.0,
+                          columns=('chipName', 'xPix', 'yPix'), includeDistortion=True):
+        """
+        Compute several focal plane quantities for objects based on their
+        RA and Dec (in radians), in parallel.
+
+        @param [in] ra is a numpy array of RA in radians
+        (International Celestial Reference System)
+
+        @param [in] dec is a numpy array of Dec in radians
+        (International Celestial Reference System)
+
+        @param [in] pm_ra is proper motion in RA multiplied by cos(Dec) (radians/yr)
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] pm_dec is proper motion in dec (radians/yr)
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] parallax is parallax in radians
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] v_rad is radial velocity (km/s)
+        Can be a numpy array or a number or None (default=None).
+
+        @param [in] obs_metadata is an ObservationMetaData characterizing the telescope
+        pointing.
+
+        @param [in] epoch is the epoch in Julian years of the equinox against which
+        RA is measured.  Default is 2000.
+
+        @param [in] columns is a list of the quantities to compute; see
+        projectFromPupilCoords for the allowed values.
+
+        @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+        will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+        @param [out] a dict of numpy arrays keyed on the entries in columns
+        """
+        return self._gather(list(self._projectFromRaDecChunks(ra, dec, pm_ra=pm_ra,
+                                                              pm_dec=pm_dec, parallax=parallax,
+                                                              v_rad=v_rad,
+                                                              obs_metadata=obs_metadata,
+                                                              epoch=epoch, columns=columns,
+                                                              includeDistortion=includeDistortion)),
+                            columns)
+
+    def projectFromRaDecChunks(self, ra, dec, pm_ra=None, pm_dec=None, parallax=None,
+                               v_rad=None, obs_metadata=None, epoch=2000.0,
+                               columns=('chipName', 'xPix', 'yPix'), includeDistortion=True):
+        """
+        Compute several focal plane quantities for objects based on their
+        RA and Dec (in degrees), in parallel, yielding the results one shard
+        at a time.
+
+        The parameters are the same as those of projectFromRaDec.  Errors in
+        them are raised by this call, not when the generator is first advanced.
+
+        @param [out] a generator yielding, for every shard_size objects in input
+        order, a dict of numpy arrays keyed on the entries in columns
+        """
+        return self._projectFromRaDecChunks(np.radians(ra), np.radians(dec),
+                                            pm_ra=_radiansOrNone(pm_ra),
+                                            pm_dec=_radiansOrNone(pm_dec),
+                                            parallax=_radiansOrNone(parallax), v_rad=v_rad,
+                                            obs_metadata=obs_metadata, epoch=epoch,
+                                            columns=columns, includeDistortion=includeDistortion)
+
+    def _projectFromRaDecChunks(self, ra, dec, pm_ra=None, pm_dec=None, parallax=None,
+                                v_rad=None, obs_metadata=None, epoch=2000.0,
+                                columns=('chipName', 'xPix', 'yPix'), includeDistortion=True):
+        """
+        Compute several focal plane quantities for objects based on their
+        RA and Dec (in radians), in parallel, yielding the results one shard
+        at a time.
+
+        The parameters are the same as those of _projectFromRaDec.  Errors in
+        them are raised by this call, not when the generator is first advanced.
+
+        @param [out] a generator yielding, for every shard_size objects in input
+        order, a dict of numpy arrays keyed on the entries in columns
+        """
+        if not isinstance(ra, np.ndarray) or not isinstance(dec, np.ndarray):
+            raise RuntimeError("ProjectionExecutor needs numpy arrays of RA and Dec")
+
+        if len(ra) != len(dec):
+            raise RuntimeError("The arrays input to ProjectionExecutor.projectFromRaDec "
+                               "all need to have the same length")
+
+        motion_in = {'pm_ra': pm_ra, 'pm_dec': pm_dec, 'parallax': parallax, 'v_rad': v_rad}
+        kwargs = {'obs_metadata': obs_metadata, 'epoch': epoch,
+                  'columns': columns, 'includeDistortion': includeDistortion}
+
+        def shards():
+            for ss in self._shardSlices(len(ra)):
+                motion = dict((kk, vv[ss] if isinstance(vv, np.ndarray) else vv)
+                              for kk, vv in motion_in.items())
+                yield ss.start, (ra[ss], dec[ss], motion, kwargs)
+
+        return self._iterShards(_projectRaDecShard, shards())
+
+    def projectFromPupilCoords(self, xPupil, yPupil, columns=('chipName', 'xPix', 'yPix'),
+                               includeDistortion=True):
+        """
+        Compute several focal plane quantities for objects based on their
+        pupil coordinates, in parallel.
+
+        @param [in] xPupil is a numpy array of x pupil coordinates in radians
+
+        @param [in] yPupil is a numpy array of y pupil coordinates in radians
+
+        @param [in] columns is a list of the quantities to compute; see
+        projectFromPupilCoords for the allowed values.
+
+        @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+        will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+        @param [out] a dict of numpy arrays keyed on the entries in columns
+        """
+        return self._gather(list(self.projectFromPupilCoordsChunks(xPupil, yPupil,
+                                                                   columns=columns,
+                                                                   includeDistortion=includeDistortion)),
+                            columns)
+
+    def projectFromPupilCoordsChunks(self, xPupil, yPupil, columns=('chipName', 'xPix', 'yPix'),
+                                     includeDistortion=True):
+        """
+        Compute several focal plane quantities for objects based on their
+        pupil coordinates, in parallel, yielding the results one shard at a time.
+
+        The parameters are the same as those of projectFromPupilCoords.  Errors in
+        them are raised by this call, not when the generator is first advanced.
+
+        @param [out] a generator yielding, for every shard_size objects in input
+        order, a dict of numpy arrays keyed on the entries in columns
+        """
+        if not isinstance(xPupil, np.ndarray) or not isinstance(yPupil, np.ndarray):
+            raise RuntimeError("ProjectionExecutor needs numpy arrays of pupil coordinates")
+
+        if len(xPupil) != len(yPupil):
+            raise RuntimeError("The arrays input to ProjectionExecutor.projectFromPupilCoords "
+                               "all need to have the same length")
+
+        kwargs = {'columns': columns, 'includeDistortion': includeDistortion}
+        shards = ((ss.start, (xPupil[ss], yPupil[ss], kwargs))
+                  for ss in self._shardSlices(len(xPupil)))
+        return self._iterShards(_projectPupilShard, shards)
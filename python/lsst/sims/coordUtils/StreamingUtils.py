@@ -0,0 +1,256 @@
+import numpy as np
+from lsst.sims.coordUtils.CameraUtils import _projectFromRaDec, _projection_columns
+from lsst.sims.coordUtils.CameraUtils import radiansFromArcsec
+
+__all__ = ["iterateCatalogChunks", "projectFromRaDecChunks",
+           "_projectFromRaDecChunks", "projectFromRaDecToNpy"]
+
+
+_motion_columns = ('pm_ra', 'pm_dec', 'parallax', 'v_rad')
+
+
+def _columnNames(chunk):
+    if isinstance(chunk, dict):
+        return chunk.keys()
+    if chunk.dtype.names is None:
+        raise RuntimeError("Catalog chunks must be dicts of numpy arrays or "
+                           "numpy structured arrays")
+    return chunk.dtype.names
+
+
+def iterateCatalogChunks(catalog, chunk_size=1000000):
+    """
+    Iterate over a catalog in chunks of rows.
+
+    @param [in] catalog is either the path to a .npy file containing a numpy
+    structured array (which will be memory-mapped rather than read), a numpy
+    structured array, or an iterable that already yields chunks (dicts of numpy
+    arrays or numpy structured arrays), which is returned unchanged.
+
+    @param [in] chunk_size is the number of rows in each chunk (default 10**6).
+    Ignored if catalog is already an iterable of chunks.
+
+    @param [out] an iterator over chunks.  Chunks taken from a .npy file are
+    read-only views of the memory map, so only the rows of the chunk being
+    processed need to be resident in memory.
+    """
+    if chunk_size < 1:
+        raise RuntimeError("chunk_size must be at least 1")
+
+    if isinstance(catalog, str):
+        catalog = np.load(catalog, mmap_mode='r')
+
+    if isinstance(catalog, np.ndarray):
+        if catalog.dtype.names is None:
+            raise RuntimeError("iterateCatalogChunks needs a numpy structured array; "
+                               "the array you passed has dtype %s" % str(catalog.dtype))
+        return (catalog[i_start:i_start+chunk_size]
+                for i_start in range(0, len(catalog), chunk_size))
+
+    return iter(catalog)
+
+
+def projectFromRaDecChunks(catalog, obs_metadata=None, camera=None, epoch=2000.0,
+                           columns=('detectorIndex', 'xPix', 'yPix'),
+                           includeDistortion=True, chunk_size=1000000):
+    """
+    Compute focal plane quantities for a catalog too large to hold in memory,
+    one chunk of rows at a time.
+
+    @param [in] catalog is the path to a .npy file containing a numpy structured
+    array, a numpy structured array, or an iterable of chunks (dicts of numpy arrays
+    or numpy structured arrays).  Each must provide the columns 'ra' and 'dec' in
+    degrees (International Celestial Reference System) and may provide 'pm_ra'
+    (proper motion in RA multiplied by cos(Dec); arcsec/yr), 'pm_dec' (arcsec/yr),
+    'parallax' (arcsec) and 'v_rad' (km/s).
+
+    @param [in] obs_metadata is an ObservationMetaData characterizing the telescope
+    pointing.
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which
+    RA is measured.  Default is 2000.
+
+    @param [in] columns is a list of the quantities to compute; see
+    projectFromPupilCoords for the allowed values.  The default returns
+    detector indices (see getDetectorNameTable) rather than chip names, which
+    are much more compact.
+
+    @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+    will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+    @param [in] chunk_size is the number of rows per chunk when catalog is a file
+    or an array (default 10**6)
+
+    @param [out] a generator yielding, for each chunk of the catalog in order,
+    a dict keyed on the entries in columns.  Errors in the arguments are raised
+    by this call, not when the generator is first advanced.
+    """
+    chunks = iterateCatalogChunks(catalog, chunk_size=chunk_size)
+    return _projectFromRaDecChunks((_chunkInRadians(chunk) for chunk in chunks),
+                                   obs_metadata=obs_metadata, camera=camera, epoch=epoch,
+                                   columns=columns, includeDistortion=includeDistortion)
+
+
+def _projectFromRaDecChunks(catalog, obs_metadata=None, camera=None, epoch=2000.0,
+                            columns=('detectorIndex', 'xPix', 'yPix'),
+                            includeDistortion=True, chunk_size=1000000):
+    """
+    Compute focal plane quantities for a catalog too large to hold in memory,
+    one chunk of rows at a time.
+
+    @param [in] catalog is the path to a .npy file containing a numpy structured
+    array, a numpy structured array, or an iterable of chunks (dicts of numpy arrays
+    or numpy structured arrays).  Each must provide the columns 'ra' and 'dec' in
+    radians (International Celestial Reference System) and may provide 'pm_ra'
+    (proper motion in RA multiplied by cos(Dec); radians/yr), 'pm_dec' (radians/yr),
+    'parallax' (radians) and 'v_rad' (km/s).
+
+    @param [in] obs_metadata is an ObservationMetaData characterizing the telescope
+    pointing.
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which
+    RA is measured.  Default is 2000.
+
+    @param [in] columns is a list of the quantities to compute; see
+    projectFromPupilCoords for the allowed values.
+
+    @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+    will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+    @param [in] chunk_size is the number of rows per chunk when catalog is a file
+    or an array (default 10**6)
+
+    @param [out] a generator yielding, for each chunk of the catalog in order,
+    a dict keyed on the entries in columns.  Errors in the arguments are raised
+    by this call, not when the generator is first advanced.
+    """
+    if epoch is None:
+        raise RuntimeError("You need to pass an epoch into projectFromRaDecChunks")
+
+    if obs_metadata is None:
+        raise RuntimeError("You need to pass an ObservationMetaData into projectFromRaDecChunks")
+
+    if obs_metadata.mjd is None:
+        raise RuntimeError("You need to pass an ObservationMetaData with an mjd into "
+                           "projectFromRaDecChunks")
+
+    if obs_metadata.rotSkyPos is None:
+        raise RuntimeError("You need to pass an ObservationMetaData with a rotSkyPos into "
+                           "projectFromRaDecChunks")
+
+    if camera is None:
+        raise RuntimeError("You cannot call projectFromRaDecChunks without specifying a camera")
+
+    unknown_columns = [cc for cc in columns if cc not in _projection_columns]
+    if len(unknown_columns) > 0:
+        raise RuntimeError("projectFromRaDecChunks does not know how to compute %s.\n"
+                           % str(unknown_columns) +
+                           "Allowed columns are %s" % str(_projection_columns))
+
+    chunks = iterateCatalogChunks(catalog, chunk_size=chunk_size)
+    return _iterProjectedChunks(chunks, obs_metadata, camera, epoch, columns, includeDistortion)
+
+
+def _chunkInRadians(chunk):
+    """
+    Convert a catalog chunk in degrees and arcsec (see projectFromRaDecChunks)
+    into a dict of numpy arrays in radians (see _projectFromRaDecChunks)
+    """
+    names = _columnNames(chunk)
+    out = {'ra': np.radians(np.asarray(chunk['ra'], dtype=float)),
+           'dec': np.radians(np.asarray(chunk['dec'], dtype=float))}
+    for col in ('pm_ra', 'pm_dec', 'parallax'):
+        if col in names:
+            out[col] = radiansFromArcsec(np.asarray(chunk[col], dtype=float))
+    if 'v_rad' in names:
+        out['v_rad'] = chunk['v_rad']
+    return out
+
+
+def _iterProjectedChunks(chunks, obs_metadata, camera, epoch, columns, includeDistortion):
+    """
+    The generator behind _projectFromRaDecChunks
+    """
+    for chunk in chunks:
+        names = _columnNames(chunk)
+        motion = {}
+        for col in _motion_columns:
+            if col in names:
+                motion[col] = np.asarray(chunk[col], dtype=float)
+            else:
+                motion[col] = None
+
+        yield _projectFromRaDec(np.asarray(chunk['ra'], dtype=float),
+                                np.asarray(chunk['dec'], dtype=float),
+                                obs_metadata=obs_metadata, camera=camera, epoch=epoch,
+                                columns=columns, includeDistortion=includeDistortion,
+                                **motion)
+
+
+def projectFromRaDecToNpy(in_path, out_path, obs_metadata=None, camera=None, epoch=2000.0,
+                          columns=('detectorIndex', 'xPix', 'yPix'),
+                          includeDistortion=True, chunk_size=1000000):
+    """
+    Project a catalog stored in a .npy file and write the results to another
+    .npy file, without ever holding either catalog in memory.
+
+    @param [in] in_path is the path to a .npy file containing a numpy structured
+    array with the columns described in projectFromRaDecChunks (in degrees)
+
+    @param [in] out_path is the path of the .npy file to write.  It will contain
+    a numpy structured array with one row per input row and one field per entry
+    in columns.
+
+    @param [in] obs_metadata is an ObservationMetaData characterizing the telescope
+    pointing.
+
+    @param [in] camera is an afwCameraGeom object specifying the attributes of the camera.
+
+    @param [in] epoch is the epoch in Julian years of the equinox against which
+    RA is measured.  Default is 2000.
+
+    @param [in] columns is a list of the quantities to compute; see
+    projectFromPupilCoords for the allowed values.  'chipName' is not allowed
+    (use 'detectorIndex' and getDetectorNameTable instead).
+
+    @param [in] includeDistortion is a boolean.  If True (default), xPix and yPix
+    will be true pixel coordinates; if False, they will be TAN_PIXEL coordinates.
+
+    @param [in] chunk_size is the number of rows projected at a time (default 10**6)
+
+    @param [out] the number of rows written
+    """
+    if len(columns) == 0:
+        raise RuntimeError("You must ask projectFromRaDecToNpy for at least one column")
+
+    if 'chipName' in columns:
+        raise RuntimeError("projectFromRaDecToNpy cannot write chip names; "
+                           "ask for 'detectorIndex' instead")
+
+    catalog = np.load(in_path, mmap_mode='r')
+    if catalog.dtype.names is None:
+        raise RuntimeError("projectFromRaDecToNpy needs a .npy file containing "
+                           "a numpy structured array")
+
+    out_dtype = np.dtype([(cc, np.int16 if cc == 'detectorIndex' else float)
+                          for cc in columns])
+    output = np.lib.format.open_memmap(out_path, mode='w+', dtype=out_dtype,
+                                       shape=(len(catalog),))
+
+    i_start = 0
+    for chunk_out in projectFromRaDecChunks(catalog, obs_metadata=obs_metadata,
+                                            camera=camera, epoch=epoch, columns=columns,
+                                            includeDistortion=includeDistortion,
+                                            chunk_size=chunk_size):
+        n_rows = len(chunk_out[columns[0]])
+        for cc in columns:
+            output[cc][i_start:i_start+n_rows] = chunk_out[cc]
+        i_start += n_rows
+
+    output.flush()
+    del output
+    return i_start
@@ -1,4 +1,78 @@
-from .LsstCameraMethod import *
-from .DMtoCameraModule import *
-from .CameraUtils import *
-from .LsstCameraUtils import *
+"""
+The public names of lsst.sims.coordUtils are loaded lazily: each submodule
+(and its dependencies, e.g. lsst.obs.lsst, palpy and lsst.sims.utils) is
+only imported when one of its names, or the submodule itself, is first
+accessed.
+
+When adding a submodule, add its __all__ to _submodule_names below
+(testImportTime checks the table against every submodule's __all__).
+"""
+import importlib
+
+_submodule_names = {
+    'CameraTransformCacheUtils': ['CameraTransformCache', 'getCameraTransformCache'],
+    'LsstCameraMethod': ['lsst_camera'],
+    'DMtoCameraModule': ['DMtoCameraPixelTransformer'],
+    'CameraUtils': ['MultipleChipWarning', 'getCornerPixels', '_getCornerRaDec',
+                    'getCornerRaDec', 'chipNameFromPupilCoords', 'chipNameFromRaDec',
+                    '_chipNameFromRaDec', 'detectorIndicesFromPupilCoords',
+                    'detectorIndicesFromRaDec', '_detectorIndicesFromRaDec',
+                    'pixelCoordsFromPupilCoords',
+                    'pixelCoordsFromRaDec', '_pixelCoordsFromRaDec',
+                    'focalPlaneCoordsFromPupilCoords', 'focalPlaneCoordsFromRaDec',
+                    '_focalPlaneCoordsFromRaDec', 'pupilCoordsFromPixelCoords',
+                    'pupilCoordsFromFocalPlaneCoords', 'raDecFromPixelCoords',
+                    '_raDecFromPixelCoords', 'projectFromRaDec', '_projectFromRaDec',
+                    'projectFromPupilCoords', '_validate_inputs_and_chipname',
+                    'getDetectorNameTable'],
+    'LsstCameraUtils': ['focalPlaneCoordsFromPupilCoordsLSST',
+                        'pupilCoordsFromFocalPlaneCoordsLSST',
+                        'chipNameFromPupilCoordsLSST', '_chipNameFromRaDecLSST',
+                        'chipNameFromRaDecLSST', 'pixelCoordsFromPupilCoordsLSST',
+                        'pupilCoordsFromPixelCoordsLSST', '_pixelCoordsFromRaDecLSST',
+                        'pixelCoordsFromRaDecLSST', '_raDecFromPixelCoordsLSST',
+                        'raDecFromPixelCoordsLSST', 'clean_up_lsst_camera'],
+    'MultiVisitUtils': ['visit_projection_dtype', 'visitProjectionFromRaDec',
+                        '_visitProjectionFromRaDec', 'visitProjectionChunksFromRaDec',
+                        '_visitProjectionChunksFromRaDec'],
+    'ChipLookupGridUtils': ['ChipLookupGrid', 'getChipLookupGrid'],
+    'StreamingUtils': ['iterateCatalogChunks', 'projectFromRaDecChunks',
+                       '_projectFromRaDecChunks', 'projectFromRaDecToNpy'],
+    'ParallelUtils': ['phosimCamera', 'ProjectionExecutor'],
+    'DistortionSurrogateUtils': ['ChebyshevTransformSurrogate', 'getDistortionSurrogate'],
+    'DetectorAffineTableUtils': ['DetectorAffineTable', 'getDetectorAffineTable'],
+    'CameraGeometryTableUtils': ['CameraGeometryTable', 'getCameraGeometryTable'],
+    'CompiledCameraUtils': ['CompiledCamera', 'CompiledDetector'],
+    'CameraCompilerUtils': ['compileCamera'],
+    'FootprintUtils': ['getDetectorFootprints', '_getDetectorFootprints'],
+    'HealpixCoverageUtils': ['healpix_coverage_dtype', 'getDetectorHealpixCoverage'],
+    'CatalogSpatialIndexUtils': ['CatalogSpatialIndex'],
+}
+
+# submodules whose names are not exported from the package, but which
+# can still be reached as attributes of it
+_other_submodules = ['LsstZernikeFitter']
+
+_submodules = list(_submodule_names) + _other_submodules
+
+_name_to_submodule = dict((name, submodule)
+                          for submodule, name_list in _submodule_names.items()
+                          for name in name_list)
+
+__all__ = [name for name_list in _submodule_names.values() for name in name_list]
+
+
+def __getattr__(name):
+    submodule = _name_to_submodule.get(name, None)
+    if submodule is not None:
+        value = getattr(importlib.import_module('.' + submodule, __name__), name)
+    elif name in _submodules:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_submodules))
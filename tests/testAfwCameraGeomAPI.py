@@ -13,6 +13,13 @@ from lsst.sims.coordUtils import focalPlaneCoordsFromRaDec
 from lsst.sims.coordUtils import pixelCoordsFromRaDec
 from lsst.sims.coordUtils import chipNameFromRaDec
 from lsst.sims.coordUtils import chipNameFromPupilCoords
+from lsst.sims.coordUtils import focalPlaneCoordsFromPupilCoords
+from lsst.sims.coordUtils import pupilCoordsFromFocalPlaneCoords
+from lsst.sims.coordUtils import pixelCoordsFromPupilCoords
+from lsst.sims.coordUtils import projectFromRaDec
+from lsst.sims.coordUtils import projectFromPupilCoords
+from lsst.sims.coordUtils import pupilCoordsFromPixelCoords
+from lsst.sims.utils import pupilCoordsFromRaDec
 
 
 def setup_module(module):
@@ -95,6 +102,127 @@ class AfwCameraGeomAPITestCase(unittest.TestCase):
         np.testing.assert_array_almost_equal(foc_y, self.pix_data['focal_y'],
                                              decimal=5)
 
+    def test_projectFromRaDec(self):
+        """
+        Verify that the single-pass projection agrees with the
+        individual chipName, pixel and focal plane methods
+        """
+        columns = ('chipName', 'detectorIndex', 'xFocal', 'yFocal', 'xPix', 'yPix')
+        output = projectFromRaDec(self.pix_data['ra'], self.pix_data['dec'],
+                                  obs_metadata=self.obs, camera=self.camera,
+                                  columns=columns)
+
+        self.assertEqual(set(output.keys()), set(columns))
+        np.testing.assert_array_equal(output['chipName'], self.pix_data['name'])
+        np.testing.assert_array_almost_equal(output['xFocal'], self.pix_data['focal_x'],
+                                             decimal=5)
+        np.testing.assert_array_almost_equal(output['yFocal'], self.pix_data['focal_y'],
+                                             decimal=5)
+        np.testing.assert_array_almost_equal(output['xPix'], self.pix_data['pixel_x'],
+                                             decimal=3)
+        np.testing.assert_array_almost_equal(output['yPix'], self.pix_data['pixel_y'],
+                                             decimal=3)
+
+        pix_x, pix_y = pixelCoordsFromRaDec(self.pix_data['ra'],
+                                            self.pix_data['dec'],
+                                            obs_metadata=self.obs,
+                                            camera=self.camera)
+        np.testing.assert_array_equal(output['xPix'], pix_x)
+        np.testing.assert_array_equal(output['yPix'], pix_y)
+
+        codes = chipNameFromRaDec(self.pix_data['ra'], self.pix_data['dec'],
+                                  obs_metadata=self.obs, camera=self.camera,
+                                  as_detector_index=True)
+        np.testing.assert_array_equal(output['detectorIndex'], codes)
+
+        # only the requested columns are returned
+        output = projectFromRaDec(self.pix_data['ra'], self.pix_data['dec'],
+                                  obs_metadata=self.obs, camera=self.camera,
+                                  columns=['xFocal'])
+        self.assertEqual(list(output.keys()), ['xFocal'])
+
+        with self.assertRaises(RuntimeError):
+            projectFromRaDec(self.pix_data['ra'], self.pix_data['dec'],
+                             obs_metadata=self.obs, camera=self.camera,
+                             columns=['ra'])
+
+    def test_projection_at_chip_edges(self):
+        """
+        Verify that projectFromPupilCoords and pixelCoordsFromPupilCoords
+        find the same chips as chipNameFromPupilCoords for points just
+        inside and just outside the edges of the detectors
+        """
+        x_pupil = []
+        y_pupil = []
+        for det in list(self.camera)[::9]:
+            bbox = det.getBBox()
+            for dx, dy in ((-0.5, 0.0), (0.5, 0.0), (0.0, -0.5), (0.0, 0.5)):
+                xpix = np.array([bbox.getMinX(), bbox.getMaxX(),
+                                 bbox.getMinX(), bbox.getMaxX()]) + dx
+                ypix = np.array([bbox.getMinY(), bbox.getMinY(),
+                                 bbox.getMaxY(), bbox.getMaxY()]) + dy
+                xp, yp = pupilCoordsFromPixelCoords(xpix, ypix, det.getName(),
+                                                    camera=self.camera)
+                x_pupil.append(xp)
+                y_pupil.append(yp)
+        x_pupil = np.concatenate(x_pupil)
+        y_pupil = np.concatenate(y_pupil)
+
+        codes = chipNameFromPupilCoords(x_pupil, y_pupil, camera=self.camera,
+                                        as_detector_index=True)
+        self.assertGreater(len(np.where(codes >= 0)[0]), 0)
+        self.assertGreater(len(np.where(codes < 0)[0]), 0)
+
+        output = projectFromPupilCoords(x_pupil, y_pupil, camera=self.camera,
+                                        columns=('detectorIndex', 'xPix', 'yPix'))
+        np.testing.assert_array_equal(output['detectorIndex'], codes)
+
+        pix_x, pix_y = pixelCoordsFromPupilCoords(x_pupil, y_pupil, camera=self.camera)
+        np.testing.assert_array_equal(np.isnan(pix_x), codes < 0)
+        np.testing.assert_array_equal(pix_x, output['xPix'])
+        np.testing.assert_array_equal(pix_y, output['yPix'])
+
+    def test_array_transforms(self):
+        """
+        Verify that the array-based transformations agree with
+        transforming the points one at a time
+        """
+        xpup, ypup = pupilCoordsFromRaDec(self.pix_data['ra'],
+                                          self.pix_data['dec'],
+                                          obs_metadata=self.obs)
+
+        foc_x, foc_y = focalPlaneCoordsFromPupilCoords(xpup, ypup,
+                                                       camera=self.camera)
+
+        pix_x, pix_y = pixelCoordsFromPupilCoords(xpup, ypup,
+                                                  chipName=self.pix_data['name'],
+                                                  camera=self.camera)
+
+        pup_x, pup_y = pupilCoordsFromFocalPlaneCoords(foc_x, foc_y,
+                                                       camera=self.camera)
+
+        for ii in range(len(xpup)):
+            foc = focalPlaneCoordsFromPupilCoords(xpup[ii], ypup[ii],
+                                                  camera=self.camera)
+            self.assertAlmostEqual(foc[0], foc_x[ii], 10)
+            self.assertAlmostEqual(foc[1], foc_y[ii], 10)
+
+            pix = pixelCoordsFromPupilCoords(xpup[ii], ypup[ii],
+                                             chipName=self.pix_data['name'][ii],
+                                             camera=self.camera)
+            self.assertAlmostEqual(pix[0], pix_x[ii], 8)
+            self.assertAlmostEqual(pix[1], pix_y[ii], 8)
+
+            pup = pupilCoordsFromFocalPlaneCoords(foc_x[ii], foc_y[ii],
+                                                  camera=self.camera)
+            self.assertAlmostEqual(pup[0], pup_x[ii], 14)
+            self.assertAlmostEqual(pup[1], pup_y[ii], 14)
+
+        np.testing.assert_array_almost_equal(foc_x, self.pix_data['focal_x'],
+                                             decimal=5)
+        np.testing.assert_array_almost_equal(pix_x, self.pix_data['pixel_x'],
+                                             decimal=3)
+
     def test_cornerRaDec(self):
         """
         Verify that getCornerRaDec has not changed
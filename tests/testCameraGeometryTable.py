@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+
+import lsst.utils.tests
+from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.coordUtils import getCameraGeometryTable
+from lsst.sims.coordUtils import getDetectorNameTable
+from lsst.sims.coordUtils import getCornerPixels
+from lsst.sims.coordUtils import DMtoCameraPixelTransformer
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class CameraGeometryTableTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_against_afw(self):
+        """
+        Test that every column of the table agrees with the afw detectors
+        """
+        table = getCameraGeometryTable(self.camera)
+        self.assertIs(getCameraGeometryTable(self.camera), table)
+        self.assertEqual(list(table.names), list(getDetectorNameTable(self.camera)))
+        self.assertEqual(len(table), len(table.names))
+
+        for column in (table.ids, table.det_types, table.bbox, table.center_mm,
+                       table.center_pix, table.corners_mm, table.orientation,
+                       table.pixel_size):
+            self.assertEqual(len(column), len(table))
+            self.assertFalse(column.flags.writeable)
+
+        for i_det, name in enumerate(table.names):
+            det = self.camera[name]
+            self.assertEqual(table.ids[i_det], det.getId())
+            self.assertEqual(table.det_types[i_det], int(det.getType()))
+
+            bbox = det.getBBox()
+            self.assertEqual(tuple(table.bbox[i_det]),
+                             (bbox.getMinX(), bbox.getMinY(), bbox.getMaxX(), bbox.getMaxY()))
+            self.assertEqual(getCornerPixels(name, self.camera),
+                             getCornerPixels(i_det, self.camera))
+
+            center = det.getCenter(FOCAL_PLANE)
+            self.assertEqual(tuple(table.center_mm[i_det]), (center.getX(), center.getY()))
+            center_pix = det.getTransform(FOCAL_PLANE, PIXELS).applyForward(center)
+            self.assertEqual(tuple(table.center_pix[i_det]),
+                             (center_pix.getX(), center_pix.getY()))
+
+            corners = det.getCorners(FOCAL_PLANE)
+            np.testing.assert_array_equal(table.corners_mm[i_det],
+                                          [(cc.getX(), cc.getY()) for cc in corners])
+
+            self.assertEqual(table.orientation[i_det][0],
+                             det.getOrientation().getYaw().asRadians())
+            self.assertEqual(tuple(table.pixel_size[i_det]),
+                             (det.getPixelSize().getX(), det.getPixelSize().getY()))
+
+    def test_pixel_transformer(self):
+        """
+        Test that DMtoCameraPixelTransformer reads the Camera team bounding
+        boxes and central pixels of detectors from the table
+        """
+        camera_wrapper = DMtoCameraPixelTransformer()
+        table = getCameraGeometryTable(camera_wrapper._camera)
+        for i_det, name in enumerate(table.names[::17]):
+            i_det = i_det*17
+            cam_bbox = camera_wrapper.getBBox(name)
+            self.assertEqual(cam_bbox.getMinX(), table.bbox[i_det][1])
+            self.assertEqual(cam_bbox.getMinY(), table.bbox[i_det][0])
+            self.assertEqual(cam_bbox.getMaxX(), table.bbox[i_det][3])
+            self.assertEqual(cam_bbox.getMaxY(), table.bbox[i_det][2])
+
+            center = camera_wrapper.getCenterPixel(name)
+            self.assertEqual(center.getX(), table.center_pix[i_det][1])
+            self.assertEqual(center.getY(), table.center_pix[i_det][0])
+
+        with self.assertRaises(RuntimeError):
+            getCornerPixels(None, self.camera)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
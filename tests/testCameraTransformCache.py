@@ -0,0 +1,216 @@
+import unittest
+import gc
+import threading
+import weakref
+import numpy as np
+
+import lsst.utils.tests
+import lsst.geom as geom
+from lsst.afw.cameraGeom import FIELD_ANGLE, FOCAL_PLANE, PIXELS
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.coordUtils import CameraTransformCache
+from lsst.sims.coordUtils import getCameraTransformCache
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class _MockCamera(object):
+    """
+    A stand-in for a camera; unlike object(), it can be weakly referenced
+    """
+    pass
+
+
+class CameraTransformCacheTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used camera is evicted along with
+        all of its entries, and that hits, misses and evictions are counted
+        """
+        cache = CameraTransformCache(maxcameras=2)
+        cam_a = _MockCamera()
+        cam_b = _MockCamera()
+        cam_c = _MockCamera()
+        self.assertEqual(cache.get(cam_a, 'x', lambda: 1), 1)
+        self.assertEqual(cache.get(cam_a, 'y', lambda: 2), 2)
+        self.assertEqual(cache.get(cam_b, 'x', lambda: 3), 3)
+        # touch cam_a so that cam_b is the least recently used
+        self.assertEqual(cache.get(cam_a, 'x', lambda: -1), 1)
+        self.assertEqual(cache.get(cam_c, 'x', lambda: 4), 4)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.get(cam_a, 'y', lambda: -1), 2)
+        self.assertEqual(cache.get(cam_b, 'x', lambda: 5), 5)
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 5)
+        self.assertEqual(stats['evictions'], 2)
+        self.assertEqual(stats['size'], 3)
+        self.assertEqual(stats['cameras'], 2)
+        self.assertEqual(stats['maxcameras'], 2)
+
+        cache.resetStats()
+        self.assertEqual(cache.stats()['misses'], 0)
+
+        with self.assertRaises(RuntimeError):
+            CameraTransformCache(maxcameras=0)
+
+    def test_many_entries_per_camera(self):
+        """
+        Test that each camera's entries are bounded by maxentries, evicting
+        its least recently used entries, without touching other cameras
+        """
+        cache = CameraTransformCache(maxcameras=2, maxentries=100)
+        cam = _MockCamera()
+        other_cam = _MockCamera()
+        cache.get(other_cam, 'x', lambda: 1)
+        for ii in range(5000):
+            cache.get(cam, ii, lambda: ii)
+            # keep entry 0 recently used
+            self.assertEqual(cache.get(cam, 0, lambda: -1), 0)
+        self.assertEqual(len(cache), 101)
+        self.assertEqual(cache.get(cam, 4999, lambda: -1), 4999)
+        self.assertEqual(cache.get(cam, 4000, lambda: -1), -1)
+        self.assertEqual(cache.get(other_cam, 'x', lambda: -1), 1)
+
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 0)
+        self.assertEqual(stats['entry_evictions'], 4901)
+        self.assertEqual(stats['maxentries'], 100)
+
+        cache.resize(2, maxentries=10)
+        self.assertEqual(len(cache), 11)
+        self.assertEqual(cache.maxentries, 10)
+
+        with self.assertRaises(RuntimeError):
+            CameraTransformCache(maxentries=0)
+
+    def test_weak_reference(self):
+        """
+        Test that the cache does not keep a camera alive and drops its
+        entries once it is garbage collected
+        """
+        cache = CameraTransformCache()
+        cam = _MockCamera()
+        cam_ref = weakref.ref(cam)
+        cache.get(cam, 'x', lambda: 1)
+        self.assertEqual(len(cache), 1)
+        del cam
+        gc.collect()
+        self.assertIsNone(cam_ref())
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['cameras'], 0)
+
+        # the weakref callback does not take the lock, so a camera can
+        # be released in one thread while another thread holds the lock
+        holder = [_MockCamera()]
+        cache.get(holder[0], 'x', lambda: 1)
+        with cache._lock:
+            collector = threading.Thread(target=holder.clear)
+            collector.start()
+            collector.join(timeout=10.0)
+            self.assertFalse(collector.is_alive())
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        """
+        Test that invalidate() can drop one camera or all cameras
+        """
+        cache = CameraTransformCache()
+        cam_a = _MockCamera()
+        cam_b = _MockCamera()
+        cache.get(cam_a, 'x', lambda: 1)
+        cache.get(cam_a, 'y', lambda: 2)
+        cache.get(cam_b, 'x', lambda: 3)
+        cache.invalidate(cam_a)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get(cam_a, 'x', lambda: 5), 5)
+        self.assertEqual(cache.get(cam_b, 'x', lambda: 6), 3)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_threads(self):
+        """
+        Test that concurrent use from many threads leaves the cache
+        bounded and consistent
+        """
+        cache = CameraTransformCache(maxcameras=4)
+        cameras = [_MockCamera() for ii in range(8)]
+        errors = []
+
+        def worker(seed):
+            rng = np.random.RandomState(seed)
+            for ii in range(2000):
+                i_cam = rng.randint(0, len(cameras))
+                key = rng.randint(0, 4)
+                value = cache.get(cameras[i_cam], key, lambda: (i_cam, key))
+                if value != (i_cam, key):
+                    errors.append(value)
+
+        thread_list = [threading.Thread(target=worker, args=(ii,)) for ii in range(8)]
+        for tt in thread_list:
+            tt.start()
+        for tt in thread_list:
+            tt.join()
+
+        self.assertEqual(len(errors), 0)
+        self.assertLessEqual(cache.stats()['cameras'], 4)
+        self.assertLessEqual(len(cache), 16)
+        stats = cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 8*2000)
+
+    def test_getTransform(self):
+        """
+        Test that cached transforms are re-used and agree with the
+        transforms provided by the camera
+        """
+        cache = getCameraTransformCache()
+        cache.invalidate()
+        cache.resetStats()
+
+        field_to_focal = cache.getTransform(self.camera, FIELD_ANGLE, FOCAL_PLANE)
+        self.assertIs(cache.getTransform(self.camera, FIELD_ANGLE, FOCAL_PLANE),
+                      field_to_focal)
+
+        det_name = 'R22_S11'
+        focal_to_pixels = cache.getTransform(self.camera, FOCAL_PLANE, PIXELS,
+                                             detectorName=det_name)
+        self.assertIs(cache.getTransform(self.camera, FOCAL_PLANE, PIXELS,
+                                         detectorName=det_name),
+                      focal_to_pixels)
+
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['hits'], 2)
+
+        control = self.camera[det_name].getTransform(FOCAL_PLANE, PIXELS)
+        pt = geom.Point2D(1.2, -3.4)
+        self.assertAlmostEqual(focal_to_pixels.applyForward(pt).getX(),
+                               control.applyForward(pt).getX(), 10)
+        self.assertAlmostEqual(focal_to_pixels.applyForward(pt).getY(),
+                               control.applyForward(pt).getY(), 10)
+
+        clean_up_lsst_camera()
+        self.assertEqual(len(cache), 0)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
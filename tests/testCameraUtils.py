@@ -1,11 +1,21 @@
 from builtins import zip
 import unittest
+import warnings
+from unittest import mock
 import numpy as np
 import lsst.utils.tests
+import lsst.geom as geom
+from lsst.afw.cameraGeom import FOCAL_PLANE
 from lsst.sims.coordUtils import (chipNameFromPupilCoords,
                                   _chipNameFromRaDec, chipNameFromRaDec,
                                   _pixelCoordsFromRaDec, pixelCoordsFromRaDec,
-                                  pixelCoordsFromPupilCoords)
+                                  pixelCoordsFromPupilCoords,
+                                  pupilCoordsFromPixelCoords,
+                                  pupilCoordsFromFocalPlaneCoords,
+                                  getDetectorNameTable,
+                                  getChipLookupGrid, ChipLookupGrid,
+                                  detectorIndicesFromPupilCoords,
+                                  MultipleChipWarning)
 from lsst.sims.utils import pupilCoordsFromRaDec, radiansFromArcsec
 from lsst.sims.utils import ObservationMetaData
 from lsst.obs.lsst.phosim import PhosimMapper
@@ -58,6 +68,144 @@ class ChipNameTestCase(unittest.TestCase):
                 ct_none += 1
         self.assertGreater(ct_none, 0)
 
+    def _cornerPupilCoords(self):
+        """
+        Return the names of the detectors and the pupil coordinates of
+        points one pixel inside each corner of every detector
+        """
+        x_pix = []
+        y_pix = []
+        names = []
+        for det in self.camera:
+            bbox = det.getBBox()
+            for xx in (bbox.getMinX()+1.0, bbox.getMaxX()-1.0):
+                for yy in (bbox.getMinY()+1.0, bbox.getMaxY()-1.0):
+                    x_pix.append(xx)
+                    y_pix.append(yy)
+                    names.append(det.getName())
+
+        names = np.array(names)
+        xp, yp = pupilCoordsFromPixelCoords(np.array(x_pix), np.array(y_pix),
+                                            names, camera=self.camera)
+        return names, xp, yp
+
+    def test_detector_edges(self):
+        """
+        Test that points just inside the corners of every detector are
+        still found on that detector (i.e. that the field of view
+        pre-filter in chipNameFromPupilCoords does not reject them)
+        """
+        names, xp, yp = self._cornerPupilCoords()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=MultipleChipWarning)
+            found = chipNameFromPupilCoords(xp, yp, camera=self.camera,
+                                            allow_multiple_chips=True)
+
+        for name, found_name in zip(names, found):
+            self.assertIsNotNone(found_name)
+            self.assertIn(name, found_name)
+
+    def test_detector_indices(self):
+        """
+        Test that detectorIndicesFromPupilCoords returns every chip seen
+        by each point, consistently with chipNameFromPupilCoords, and that
+        points on more than one chip trigger a single MultipleChipWarning
+        """
+        names, xp, yp = self._cornerPupilCoords()
+        xp = np.append(xp, [np.NaN, 1.0])
+        yp = np.append(yp, [0.0, 1.0])
+
+        offsets, indices = detectorIndicesFromPupilCoords(xp, yp, camera=self.camera)
+        self.assertEqual(len(offsets), len(xp)+1)
+        self.assertEqual(offsets[-1], len(indices))
+        self.assertEqual(indices.dtype, np.int16)
+        n_hits = np.diff(offsets)
+        self.assertEqual(n_hits[-1], 0)
+        self.assertEqual(n_hits[-2], 0)
+
+        name_table = getDetectorNameTable(self.camera)
+        for i_pt, name in enumerate(names):
+            self.assertIn(name, name_table[indices[offsets[i_pt]:offsets[i_pt+1]]])
+
+        multiple = np.where(n_hits > 1)[0]
+        control = chipNameFromPupilCoords(xp, yp, camera=self.camera, allow_multiple_chips=True)
+        for i_pt in range(len(xp)):
+            hit_names = [str(nn) for nn in name_table[indices[offsets[i_pt]:offsets[i_pt+1]]]]
+            if len(hit_names) == 0:
+                self.assertIsNone(control[i_pt])
+            elif len(hit_names) == 1:
+                self.assertEqual(control[i_pt], hit_names[0])
+            else:
+                self.assertEqual(control[i_pt], str(hit_names))
+
+        with warnings.catch_warnings(record=True) as warning_list:
+            warnings.simplefilter('always')
+            first = chipNameFromPupilCoords(xp, yp, camera=self.camera, as_detector_index=True)
+        multi_warnings = [ww for ww in warning_list
+                          if issubclass(ww.category, MultipleChipWarning)]
+        if len(multiple) > 0:
+            self.assertEqual(len(multi_warnings), 1)
+            np.testing.assert_array_equal(multi_warnings[0].message.indices, multiple)
+        else:
+            self.assertEqual(len(multi_warnings), 0)
+
+        on_chip = np.where(n_hits > 0)
+        np.testing.assert_array_equal(first[on_chip], indices[offsets[:-1][on_chip]])
+        np.testing.assert_array_equal(first[np.where(n_hits == 0)], -1)
+
+    def test_multiple_chip_warning(self):
+        """
+        Test that points landing on more than one chip trigger exactly one
+        MultipleChipWarning listing all of them, and that
+        allow_multiple_chips=True reports every chip instead
+        """
+        # a camera in which R22_S12 is moved on top of R22_S11, so that
+        # every point on one of them lands on both
+        builder = self.camera.rebuild()
+        builder['R22_S12'].setOrientation(builder['R22_S11'].getOrientation())
+        camera = builder.finish()
+
+        name_table = [str(nn) for nn in getDetectorNameTable(camera)]
+        i_overlap = sorted([name_table.index('R22_S11'), name_table.index('R22_S12')])
+
+        # points landing on: R22_S11 and R22_S12; R10_S22 alone; nothing;
+        # R22_S11 and R22_S12 again
+        focal_points = [camera['R22_S11'].getCenter(FOCAL_PLANE),
+                        camera['R10_S22'].getCenter(FOCAL_PLANE),
+                        geom.Point2D(1.0e4, 1.0e4),
+                        camera['R22_S11'].getCenter(FOCAL_PLANE) + geom.Extent2D(1.0, -2.0)]
+        xf = np.array([pp.getX() for pp in focal_points])
+        yf = np.array([pp.getY() for pp in focal_points])
+        xp, yp = pupilCoordsFromFocalPlaneCoords(xf, yf, camera=camera)
+
+        # afw's own membership test is the control
+        control = camera.findDetectorsList([geom.Point2D(xx, yy) for xx, yy in zip(xf, yf)],
+                                           FOCAL_PLANE)
+        self.assertEqual([sorted(det.getName() for det in dets) for dets in control],
+                         [['R22_S11', 'R22_S12'], ['R10_S22'], [], ['R22_S11', 'R22_S12']])
+
+        with warnings.catch_warnings(record=True) as warning_list:
+            warnings.simplefilter('always')
+            first = chipNameFromPupilCoords(xp, yp, camera=camera, as_detector_index=True)
+        multi_warnings = [ww for ww in warning_list
+                          if issubclass(ww.category, MultipleChipWarning)]
+        self.assertEqual(len(multi_warnings), 1)
+        np.testing.assert_array_equal(multi_warnings[0].message.indices, [0, 3])
+        np.testing.assert_array_equal(first, [i_overlap[0], name_table.index('R10_S22'),
+                                              -1, i_overlap[0]])
+
+        with warnings.catch_warnings(record=True) as warning_list:
+            warnings.simplefilter('always')
+            names = chipNameFromPupilCoords(xp, yp, camera=camera, allow_multiple_chips=True)
+        self.assertEqual(len(warning_list), 0)
+
+        overlap_names = str([name_table[ii] for ii in i_overlap])
+        self.assertEqual(names[0], overlap_names)
+        self.assertEqual(names[1], 'R10_S22')
+        self.assertIsNone(names[2])
+        self.assertEqual(names[3], overlap_names)
+
     def test_chip_center(self):
         """
         Test that, if we ask for the chip at the bore site,
@@ -98,6 +246,246 @@ class ChipNameTestCase(unittest.TestCase):
         self.assertGreater(is_none, 0)
         self.assertLess(is_none, (3*len(ra_list))//4)
 
+    def test_pixel_coords_chip_groups(self):
+        """
+        Test that pixelCoordsFromPupilCoords gives the same answer
+        when passed an array of mixed chip names as when each chip's
+        points are passed with a single chip name
+        """
+        ra = 145.0
+        dec = -25.0
+        obs = ObservationMetaData(pointingRA=ra, pointingDec=dec,
+                                  mjd=59580.0, rotSkyPos=113.0)
+        rng = np.random.RandomState(8812)
+        theta = rng.random_sample(500)*2.0*np.pi
+        rr = rng.random_sample(len(theta))*2.0
+        xp, yp = pupilCoordsFromRaDec(ra + rr*np.cos(theta),
+                                      dec + rr*np.sin(theta),
+                                      obs_metadata=obs)
+
+        name_list = chipNameFromPupilCoords(xp, yp, camera=self.camera)
+        self.assertIn(None, list(name_list))
+        x_pix, y_pix = pixelCoordsFromPupilCoords(xp, yp, chipName=name_list,
+                                                  camera=self.camera)
+
+        is_none = np.array([nn is None for nn in name_list])
+        np.testing.assert_array_equal(np.isnan(x_pix), is_none)
+        np.testing.assert_array_equal(np.isnan(y_pix), is_none)
+
+        unique_names = set(name_list[np.logical_not(is_none)])
+        self.assertGreater(len(unique_names), 10)
+        for name in unique_names:
+            dexes = np.where(name_list == name)
+            x_control, y_control = pixelCoordsFromPupilCoords(xp[dexes], yp[dexes],
+                                                              chipName=name,
+                                                              camera=self.camera)
+            np.testing.assert_array_equal(x_pix[dexes], x_control)
+            np.testing.assert_array_equal(y_pix[dexes], y_control)
+
+    def test_detector_index(self):
+        """
+        Test that as_detector_index=True returns indices into
+        getDetectorNameTable and that those indices can be passed
+        in place of chip names
+        """
+        ra = 145.0
+        dec = -25.0
+        obs = ObservationMetaData(pointingRA=ra, pointingDec=dec,
+                                  mjd=59580.0, rotSkyPos=113.0)
+        rng = np.random.RandomState(4421)
+        theta = rng.random_sample(300)*2.0*np.pi
+        rr = rng.random_sample(len(theta))*2.0
+        ra_list = ra + rr*np.cos(theta)
+        dec_list = dec + rr*np.sin(theta)
+
+        name_table = getDetectorNameTable(self.camera)
+        self.assertEqual(len(name_table), len(self.camera))
+
+        names = chipNameFromRaDec(ra_list, dec_list, obs_metadata=obs,
+                                  camera=self.camera)
+        codes = chipNameFromRaDec(ra_list, dec_list, obs_metadata=obs,
+                                  camera=self.camera, as_detector_index=True)
+        self.assertEqual(codes.dtype, np.int16)
+        self.assertGreater((codes == -1).sum(), 0)
+
+        # the index path never builds or parses chip names
+        with mock.patch('lsst.sims.coordUtils.CameraUtils._chipNameFromDetectorIndex',
+                        side_effect=AssertionError('built chip names')):
+            with mock.patch('lsst.sims.coordUtils.CameraUtils._detectorIndexFromChipName',
+                            side_effect=AssertionError('parsed chip names')):
+                np.testing.assert_array_equal(chipNameFromRaDec(ra_list, dec_list,
+                                                                obs_metadata=obs,
+                                                                camera=self.camera,
+                                                                as_detector_index=True),
+                                              codes)
+        for nn, cc in zip(names, codes):
+            if nn is None:
+                self.assertEqual(cc, -1)
+            else:
+                self.assertEqual(name_table[cc], nn)
+
+        xpix_name, ypix_name = pixelCoordsFromRaDec(ra_list, dec_list, chipName=names,
+                                                    obs_metadata=obs, camera=self.camera)
+        xpix_code, ypix_code = pixelCoordsFromRaDec(ra_list, dec_list, chipName=codes,
+                                                    obs_metadata=obs, camera=self.camera)
+        np.testing.assert_array_equal(xpix_name, xpix_code)
+        np.testing.assert_array_equal(ypix_name, ypix_code)
+
+        on_chip = np.where(codes >= 0)
+        xpup_name, ypup_name = pupilCoordsFromPixelCoords(xpix_name[on_chip], ypix_name[on_chip],
+                                                          names[on_chip], camera=self.camera)
+        xpup_code, ypup_code = pupilCoordsFromPixelCoords(xpix_name[on_chip], ypix_name[on_chip],
+                                                          codes[on_chip], camera=self.camera)
+        np.testing.assert_array_equal(xpup_name, xpup_code)
+        np.testing.assert_array_equal(ypup_name, ypup_code)
+
+        # a single index applies to every point
+        i_center = int(np.where(name_table == 'R22_S11')[0][0])
+        xpix_name, ypix_name = pixelCoordsFromRaDec(ra_list, dec_list, chipName='R22_S11',
+                                                    obs_metadata=obs, camera=self.camera)
+        xpix_code, ypix_code = pixelCoordsFromRaDec(ra_list, dec_list, chipName=i_center,
+                                                    obs_metadata=obs, camera=self.camera)
+        np.testing.assert_array_equal(xpix_name, xpix_code)
+        np.testing.assert_array_equal(ypix_name, ypix_code)
+
+        self.assertEqual(chipNameFromRaDec(ra, dec, obs_metadata=obs, camera=self.camera,
+                                           as_detector_index=True), i_center)
+
+        with self.assertRaises(RuntimeError):
+            chipNameFromRaDec(ra_list, dec_list, obs_metadata=obs, camera=self.camera,
+                              as_detector_index=True, allow_multiple_chips=True)
+
+    def test_pupil_from_pixel_groups(self):
+        """
+        Test that pupilCoordsFromPixelCoords, which transforms points chip
+        by chip, agrees with transforming the points one at a time, and
+        that points with no chip come back as NaN
+        """
+        rng = np.random.RandomState(3317)
+        name_table = getDetectorNameTable(self.camera)
+        n_pts = 500
+        chip_names = rng.choice(name_table, size=n_pts).astype(object)
+        chip_names[::7] = None
+        chip_names[3::11] = 'None'
+        xpix = rng.random_sample(n_pts)*4000.0
+        ypix = rng.random_sample(n_pts)*4000.0
+
+        for includeDistortion in (True, False):
+            xpup, ypup = pupilCoordsFromPixelCoords(xpix, ypix, chip_names,
+                                                    camera=self.camera,
+                                                    includeDistortion=includeDistortion)
+            for ii in range(n_pts):
+                if chip_names[ii] is None or chip_names[ii] == 'None':
+                    self.assertTrue(np.isnan(xpup[ii]))
+                    self.assertTrue(np.isnan(ypup[ii]))
+                    continue
+                xx, yy = pupilCoordsFromPixelCoords(xpix[ii], ypix[ii], chip_names[ii],
+                                                    camera=self.camera,
+                                                    includeDistortion=includeDistortion)
+                self.assertAlmostEqual(xpup[ii], xx, 12)
+                self.assertAlmostEqual(ypup[ii], yy, 12)
+
+    def test_lookup_grid(self):
+        """
+        Test that chip names found with the raster lookup grid agree
+        exactly with those found by testing every point against the
+        detectors
+        """
+        rng = np.random.RandomState(8812)
+        n_pts = 3000
+        xpup = (rng.random_sample(n_pts)-0.5)*0.03
+        ypup = (rng.random_sample(n_pts)-0.5)*0.03
+        xpup[:2] = np.NaN
+
+        grid = getChipLookupGrid(self.camera, n_cells=128)
+        self.assertIs(getChipLookupGrid(self.camera, n_cells=128), grid)
+        self.assertEqual(grid.grid.shape, (128, 128))
+        self.assertGreater(grid.ambiguous_fraction, 0.0)
+        self.assertLess(grid.ambiguous_fraction, 1.0)
+        self.assertFalse(grid.grid.flags.writeable)
+
+        # every point the grid claims to resolve must be on that detector
+        grid_codes = grid.lookup(xpup, ypup)
+        control_codes = chipNameFromPupilCoords(xpup, ypup, camera=self.camera,
+                                                as_detector_index=True)
+        resolved = np.where(grid_codes != ChipLookupGrid.AMBIGUOUS)
+        np.testing.assert_array_equal(grid_codes[resolved], control_codes[resolved])
+
+        for allow_multiple in (False, True):
+            with warnings.catch_warnings(record=True) as w_control:
+                warnings.simplefilter('always')
+                control = chipNameFromPupilCoords(xpup, ypup, camera=self.camera,
+                                                  allow_multiple_chips=allow_multiple)
+            with warnings.catch_warnings(record=True) as w_test:
+                warnings.simplefilter('always')
+                test = chipNameFromPupilCoords(xpup, ypup, camera=self.camera,
+                                               allow_multiple_chips=allow_multiple,
+                                               use_lookup_grid=True,
+                                               lookup_grid_cells=128)
+            self.assertEqual(list(control), list(test))
+            self.assertEqual(len(w_control), len(w_test))
+
+        test_codes = chipNameFromPupilCoords(xpup, ypup, camera=self.camera,
+                                             as_detector_index=True,
+                                             use_lookup_grid=True,
+                                             lookup_grid_cells=128)
+        np.testing.assert_array_equal(test_codes, control_codes)
+
+        with self.assertRaises(RuntimeError):
+            ChipLookupGrid(self.camera, n_cells=1)
+
+    def test_invalid_inputs(self):
+        """
+        Test that masked and non-finite inputs come back as NaN (or None)
+        and that the other points match running on the valid points alone
+        """
+        rng = np.random.RandomState(5523)
+        n_pts = 400
+        obs = ObservationMetaData(pointingRA=25.0, pointingDec=-12.0,
+                                  rotSkyPos=17.0, mjd=59580.0)
+        ra = obs.pointingRA + (rng.random_sample(n_pts)-0.5)*3.0
+        dec = obs.pointingDec + (rng.random_sample(n_pts)-0.5)*3.0
+        pm_ra = rng.random_sample(n_pts)*2.0 - 1.0
+
+        mask = np.zeros(n_pts, dtype=bool)
+        mask[::9] = True
+        ra_masked = np.ma.masked_array(ra, mask=mask)
+        dec_bad = np.copy(dec)
+        dec_bad[4::13] = np.NaN
+        pm_ra[7::17] = np.inf
+
+        invalid = np.logical_or(mask, np.logical_or(np.isnan(dec_bad), np.isinf(pm_ra)))
+        valid = np.where(np.logical_not(invalid))[0]
+        invalid = np.where(invalid)[0]
+
+        names = chipNameFromRaDec(ra_masked, dec_bad, pm_ra=pm_ra,
+                                  obs_metadata=obs, camera=self.camera)
+        control_names = chipNameFromRaDec(ra[valid], dec[valid], pm_ra=pm_ra[valid],
+                                          obs_metadata=obs, camera=self.camera)
+        self.assertEqual(list(names[valid]), list(control_names))
+        self.assertTrue(all(nn is None for nn in names[invalid]))
+
+        xpix, ypix = pixelCoordsFromRaDec(ra_masked, dec_bad, pm_ra=pm_ra,
+                                          obs_metadata=obs, camera=self.camera)
+        control_x, control_y = pixelCoordsFromRaDec(ra[valid], dec[valid], pm_ra=pm_ra[valid],
+                                                    obs_metadata=obs, camera=self.camera)
+        np.testing.assert_array_equal(xpix[valid], control_x)
+        np.testing.assert_array_equal(ypix[valid], control_y)
+        self.assertTrue(np.isnan(xpix[invalid]).all())
+        self.assertTrue(np.isnan(ypix[invalid]).all())
+
+        # masked pixel coordinates on a named chip
+        name_table = getDetectorNameTable(self.camera)
+        xpix = np.ma.masked_array(rng.random_sample(n_pts)*4000.0, mask=mask)
+        ypix = rng.random_sample(n_pts)*4000.0
+        xpup, ypup = pupilCoordsFromPixelCoords(xpix, ypix, name_table[11], camera=self.camera)
+        control = pupilCoordsFromPixelCoords(xpix.data[~mask], ypix[~mask], name_table[11],
+                                             camera=self.camera)
+        np.testing.assert_array_equal(xpup[~mask], control[0])
+        np.testing.assert_array_equal(ypup[~mask], control[1])
+        self.assertTrue(np.isnan(xpup[mask]).all())
+        self.assertTrue(np.isnan(ypup[mask]).all())
+
 
 class MotionTestCase(unittest.TestCase):
     """
@@ -0,0 +1,146 @@
+import unittest
+import numpy as np
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.utils import angularSeparation
+from lsst.sims.coordUtils import CatalogSpatialIndex
+from lsst.sims.coordUtils import chipNameFromRaDec, pixelCoordsFromRaDec
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class CatalogSpatialIndexTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_query(self):
+        """
+        Test that queries find exactly the sources within the circle,
+        including circles straddling RA=0 and containing a pole
+        """
+        rng = np.random.RandomState(661)
+        n_obj = 50000
+        ra = rng.random_sample(n_obj)*360.0
+        dec = np.degrees(np.arcsin(rng.random_sample(n_obj)*2.0-1.0))
+        index = CatalogSpatialIndex(ra, dec)
+        self.assertEqual(len(index), n_obj)
+
+        for ra_center, dec_center, radius in ((112.0, -31.0, 4.0), (0.5, 12.0, 3.0),
+                                              (359.0, -60.0, 5.0), (45.0, 88.0, 6.0),
+                                              (200.0, 0.0, 0.01)):
+            dist = angularSeparation(ra_center, dec_center, ra, dec)
+            control = np.where(dist <= radius)[0]
+            test = index.query(ra_center, dec_center, radius)
+            np.testing.assert_array_equal(test, control)
+
+    def test_against_catalog_methods(self):
+        """
+        Test that the visit-centric methods agree with chipNameFromRaDec
+        and pixelCoordsFromRaDec run on the whole catalog
+        """
+        rng = np.random.RandomState(8812)
+        n_obj = 20000
+        ra = 10.0 + rng.random_sample(n_obj)*30.0
+        dec = -40.0 + rng.random_sample(n_obj)*20.0
+        pm_ra = rng.random_sample(n_obj)*0.1 - 0.05
+        pm_dec = rng.random_sample(n_obj)*0.1 - 0.05
+        parallax = rng.random_sample(n_obj)*0.01
+        v_rad = rng.random_sample(n_obj)*100.0 - 50.0
+        index = CatalogSpatialIndex(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                    parallax=parallax, v_rad=v_rad)
+
+        obs = ObservationMetaData(pointingRA=25.0, pointingDec=-30.0,
+                                  rotSkyPos=27.0, mjd=60100.0)
+
+        chip_control = chipNameFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                         parallax=parallax, v_rad=v_rad,
+                                         obs_metadata=obs, camera=self.camera)
+        on_chip = np.where(np.not_equal(chip_control, None))[0]
+        self.assertGreater(len(on_chip), 0)
+        self.assertLess(len(on_chip), n_obj)
+
+        indices, chip_test = index.chipNameFromRaDec(obs, self.camera)
+        np.testing.assert_array_equal(indices, on_chip)
+        np.testing.assert_array_equal(chip_test, chip_control[on_chip])
+
+        indices, pix_test = index.pixelCoordsFromRaDec(obs, self.camera)
+        np.testing.assert_array_equal(indices, on_chip)
+        pix_control = pixelCoordsFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec,
+                                           parallax=parallax, v_rad=v_rad,
+                                           obs_metadata=obs, camera=self.camera)
+        np.testing.assert_allclose(pix_test, pix_control[:, on_chip], rtol=0.0, atol=1.0e-9)
+
+    def test_scalar_motion(self):
+        """
+        Test that a proper motion, parallax and radial velocity given as
+        numbers apply to every source
+        """
+        rng = np.random.RandomState(3301)
+        n_obj = 5000
+        ra = 20.0 + rng.random_sample(n_obj)*10.0
+        dec = -35.0 + rng.random_sample(n_obj)*10.0
+        index = CatalogSpatialIndex(ra, dec, pm_ra=0.02, pm_dec=-0.03,
+                                    parallax=0.005, v_rad=10.0)
+
+        obs = ObservationMetaData(pointingRA=25.0, pointingDec=-30.0,
+                                  rotSkyPos=27.0, mjd=60100.0)
+
+        chip_control = chipNameFromRaDec(ra, dec, pm_ra=np.full(n_obj, 0.02),
+                                         pm_dec=np.full(n_obj, -0.03),
+                                         parallax=np.full(n_obj, 0.005),
+                                         v_rad=np.full(n_obj, 10.0),
+                                         obs_metadata=obs, camera=self.camera)
+        on_chip = np.where(np.not_equal(chip_control, None))[0]
+        self.assertGreater(len(on_chip), 0)
+
+        indices, chip_test = index.chipNameFromRaDec(obs, self.camera)
+        np.testing.assert_array_equal(indices, on_chip)
+        np.testing.assert_array_equal(chip_test, chip_control[on_chip])
+
+    def test_empty_field(self):
+        """
+        Test that a visit containing no source returns empty arrays
+        """
+        rng = np.random.RandomState(4417)
+        n_obj = 1000
+        ra = 20.0 + rng.random_sample(n_obj)*10.0
+        dec = -35.0 + rng.random_sample(n_obj)*10.0
+        index = CatalogSpatialIndex(ra, dec)
+
+        obs = ObservationMetaData(pointingRA=205.0, pointingDec=30.0,
+                                  rotSkyPos=27.0, mjd=60100.0)
+        self.assertEqual(len(index.fieldIndices(obs, self.camera)), 0)
+
+        indices, chip_names = index.chipNameFromRaDec(obs, self.camera)
+        self.assertEqual(len(indices), 0)
+        self.assertEqual(len(chip_names), 0)
+        self.assertEqual(chip_names.dtype, object)
+
+        indices, codes = index.chipNameFromRaDec(obs, self.camera, as_detector_index=True)
+        self.assertEqual(len(indices), 0)
+        self.assertEqual(codes.dtype, np.int16)
+
+        indices, pix = index.pixelCoordsFromRaDec(obs, self.camera)
+        self.assertEqual(len(indices), 0)
+        self.assertEqual(pix.shape, (2, 0))
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
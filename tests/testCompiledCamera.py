@@ -0,0 +1,208 @@
+import unittest
+import subprocess
+import sys
+import json
+import warnings
+import numpy as np
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.coordUtils import compileCamera, CompiledCamera
+from lsst.sims.coordUtils import getDetectorNameTable
+from lsst.sims.coordUtils import getCameraGeometryTable
+from lsst.sims.coordUtils import projectFromRaDec
+from lsst.sims.coordUtils import chipNameFromRaDec, pixelCoordsFromRaDec
+from lsst.sims.coordUtils import pupilCoordsFromPixelCoords
+from lsst.sims.coordUtils import focalPlaneCoordsFromPupilCoords, chipNameFromPupilCoords
+from lsst.sims.coordUtils import getCornerPixels
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class CompiledCameraTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_against_afw(self):
+        """
+        Test that a CompiledCamera reproduces the afw camera to within
+        the tolerance it was compiled with
+        """
+        with lsst.utils.tests.getTempFilePath('.npz') as file_name:
+            compileCamera(self.camera, file_name, tolerance_pixels=1.0e-4)
+            compiled = CompiledCamera(file_name)
+
+        self.assertEqual(compiled.getName(), self.camera.getName())
+        self.assertEqual(len(compiled), len(self.camera))
+        self.assertEqual(list(getDetectorNameTable(compiled)),
+                         list(getDetectorNameTable(self.camera)))
+        for name in getDetectorNameTable(self.camera)[:10]:
+            self.assertEqual(getCornerPixels(name, compiled),
+                             getCornerPixels(name, self.camera))
+            self.assertEqual(compiled[name].getType(), int(self.camera[name].getType()))
+
+        compiled_geometry = getCameraGeometryTable(compiled)
+        control_geometry = getCameraGeometryTable(self.camera)
+        for column in ('ids', 'det_types', 'bbox', 'corners_mm', 'orientation', 'pixel_size',
+                       'center_mm', 'center_pix'):
+            np.testing.assert_array_equal(getattr(compiled_geometry, column),
+                                          getattr(control_geometry, column))
+
+        rng = np.random.RandomState(88)
+        n_obj = 2000
+        ra = 25.0 + (rng.random_sample(n_obj)-0.5)*4.0
+        dec = -44.0 + (rng.random_sample(n_obj)-0.5)*4.0
+        obs = ObservationMetaData(pointingRA=25.0, pointingDec=-44.0,
+                                  rotSkyPos=12.0, mjd=59900.0)
+        columns = ('detectorIndex', 'xFocal', 'yFocal', 'xPix', 'yPix')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            control = projectFromRaDec(ra, dec, obs_metadata=obs, camera=self.camera,
+                                       columns=columns)
+            test = projectFromRaDec(ra, dec, obs_metadata=obs, camera=compiled,
+                                    columns=columns)
+            control_names = chipNameFromRaDec(ra, dec, obs_metadata=obs, camera=self.camera)
+            test_names = chipNameFromRaDec(ra, dec, obs_metadata=obs, camera=compiled)
+
+        self.assertGreater((control['detectorIndex'] >= 0).sum(), 0)
+        # points within a fraction of a pixel of a detector edge may
+        # legitimately be assigned differently
+        agree = (control['detectorIndex'] == test['detectorIndex'])
+        self.assertGreater(agree.sum(), n_obj-5)
+        self.assertGreater((control_names == test_names).sum(), n_obj-5)
+
+        # the compiled distortion is only defined within the circle
+        # bounding the detectors
+        in_field = np.isfinite(test['xFocal'])
+        self.assertTrue(in_field[control['detectorIndex'] >= 0].all())
+        pixel_size = compiled[getDetectorNameTable(compiled)[0]].getPixelSize()[0]
+        for cc in ('xFocal', 'yFocal'):
+            np.testing.assert_allclose(test[cc][in_field], control[cc][in_field], rtol=0.0,
+                                       atol=1.0e-4*pixel_size)
+        for cc in ('xPix', 'yPix'):
+            np.testing.assert_allclose(test[cc][agree], control[cc][agree], rtol=0.0,
+                                       atol=1.0e-4)
+
+        name = getDetectorNameTable(self.camera)[0]
+        xPix = rng.random_sample(20)*1000.0
+        yPix = rng.random_sample(20)*1000.0
+        np.testing.assert_allclose(pupilCoordsFromPixelCoords(xPix, yPix, name, camera=compiled),
+                                   pupilCoordsFromPixelCoords(xPix, yPix, name,
+                                                              camera=self.camera),
+                                   rtol=0.0, atol=1.0e-9)
+
+        x_single, y_single = pixelCoordsFromRaDec(ra[0], dec[0], obs_metadata=obs,
+                                                  camera=compiled, chipName=name)
+        x_control, y_control = pixelCoordsFromRaDec(ra[0], dec[0], obs_metadata=obs,
+                                                    camera=self.camera, chipName=name)
+        self.assertAlmostEqual(x_single, x_control, 3)
+        self.assertAlmostEqual(y_single, y_control, 3)
+
+        # TAN_PIXELS cannot be compiled
+        with self.assertRaises(RuntimeError):
+            pixelCoordsFromRaDec(ra, dec, obs_metadata=obs, camera=compiled,
+                                 includeDistortion=False)
+
+    def test_detector_lookup(self):
+        """
+        Test that a CompiledCamera looks up detectors by name and,
+        as afw does, by detector ID
+        """
+        with lsst.utils.tests.getTempFilePath('.npz') as file_name:
+            compileCamera(self.camera, file_name)
+            compiled = CompiledCamera(file_name)
+
+        geometry = getCameraGeometryTable(self.camera)
+        for name, det_id in zip(geometry.names[:10], geometry.ids[:10]):
+            self.assertEqual(compiled[int(det_id)].getName(), self.camera[int(det_id)].getName())
+            self.assertEqual(compiled[int(det_id)].getName(), name)
+            self.assertEqual(compiled[name].getId(), det_id)
+
+        with self.assertRaises(KeyError):
+            compiled[int(geometry.ids.max())+1]
+        with self.assertRaises(KeyError):
+            compiled['not_a_detector']
+
+    def test_without_afw(self):
+        """
+        Test that a compiled camera can be loaded and used without
+        importing afw or the camera's obs package
+        """
+        script = """
+import json
+import sys
+import numpy
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.coordUtils import CompiledCamera, projectFromRaDec
+compiled = CompiledCamera(sys.argv[1])
+obs = ObservationMetaData(pointingRA=25.0, pointingDec=-44.0, rotSkyPos=12.0, mjd=59900.0)
+ra = 25.0 + numpy.linspace(-1.0, 1.0, 100)
+dec = -44.0 + numpy.linspace(-1.0, 1.0, 100)
+output = projectFromRaDec(ra, dec, obs_metadata=obs, camera=compiled)
+print(json.dumps({'n_on_chip': int(sum(name is not None for name in output['chipName'])),
+                  'modules': [mm for mm in sys.modules
+                              if mm.startswith('lsst.obs.lsst') or mm.startswith('lsst.afw')
+                              or mm.split('.')[:2] == ['lsst', 'geom']]}))
+"""
+        with lsst.utils.tests.getTempFilePath('.npz') as file_name:
+            compileCamera(self.camera, file_name)
+            output = subprocess.check_output([sys.executable, '-c', script, file_name])
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        self.assertEqual(result['modules'], [])
+        self.assertGreater(result['n_on_chip'], 0)
+
+    def test_outside_fit(self):
+        """
+        Test that points outside of the circle covered by the compiled
+        distortion fits come out as NaN and land on no detector
+        """
+        with lsst.utils.tests.getTempFilePath('.npz') as file_name:
+            compileCamera(self.camera, file_name)
+            compiled = CompiledCamera(file_name)
+
+        xPupil = np.array([0.0, 0.1, -0.1])
+        yPupil = np.array([0.0, 0.0, 0.1])
+        focal = focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=compiled)
+        self.assertTrue(np.isfinite(focal[:, 0]).all())
+        self.assertTrue(np.isnan(focal[:, 1:]).all())
+
+        codes = chipNameFromPupilCoords(xPupil, yPupil, camera=compiled,
+                                        as_detector_index=True)
+        control = chipNameFromPupilCoords(xPupil, yPupil, camera=self.camera,
+                                          as_detector_index=True)
+        np.testing.assert_array_equal(codes, control)
+        np.testing.assert_array_equal(codes[1:], [-1, -1])
+
+    def test_version(self):
+        """
+        Test that files written by other versions of compileCamera are rejected
+        """
+        with lsst.utils.tests.getTempFilePath('.npz') as file_name:
+            compileCamera(self.camera, file_name)
+            with np.load(file_name) as data:
+                contents = dict(data)
+            contents['version'] = np.array(-1)
+            np.savez(file_name, **contents)
+            with self.assertRaises(RuntimeError):
+                CompiledCamera(file_name)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
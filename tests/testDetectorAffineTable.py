@@ -0,0 +1,121 @@
+import unittest
+import numpy as np
+
+import lsst.utils.tests
+from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS, TAN_PIXELS, DetectorType
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.coordUtils import getDetectorAffineTable
+from lsst.sims.coordUtils import getDetectorNameTable
+from lsst.sims.coordUtils import getCameraGeometryTable
+from lsst.sims.coordUtils.CameraUtils import _pixelCoordsFromFocalPlaneCoords
+from lsst.sims.coordUtils.CameraUtils import _focalPlaneCoordsFromPixelCoords
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class DetectorAffineTableTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_against_afw(self):
+        """
+        Test that the affine matrices reproduce the afw FOCAL_PLANE to
+        PIXELS transforms (and their inverses) on every science detector
+        """
+        table = getDetectorAffineTable(self.camera)
+        self.assertIs(getDetectorAffineTable(self.camera), table)
+        self.assertEqual(list(table.names), list(getDetectorNameTable(self.camera)))
+        self.assertFalse(table.forward.flags.writeable)
+
+        rng = np.random.RandomState(5512)
+        n_tested = 0
+        for i_det, name in enumerate(table.names):
+            det = self.camera[name]
+            if det.getType() != DetectorType.SCIENCE:
+                continue
+            self.assertTrue(table.is_affine[i_det], msg=name)
+            n_tested += 1
+
+            bbox = det.getBBox()
+            xPix = rng.random_sample(50)*(bbox.getMaxX()-bbox.getMinX()) + bbox.getMinX()
+            yPix = rng.random_sample(50)*(bbox.getMaxY()-bbox.getMinY()) + bbox.getMinY()
+            codes = np.full(len(xPix), i_det, dtype=np.int16)
+
+            pixels_to_focal = det.getTransform(PIXELS, FOCAL_PLANE).getMapping()
+            focal_control = pixels_to_focal.applyForward(np.array([xPix, yPix]))
+            focal_test = table.pixelsToFocal(xPix, yPix, codes)
+            np.testing.assert_allclose(focal_test, focal_control, rtol=0.0, atol=1.0e-9)
+
+            pix_test = table.focalToPixels(focal_control[0], focal_control[1], codes)
+            np.testing.assert_allclose(pix_test, np.array([xPix, yPix]), rtol=0.0, atol=1.0e-6)
+
+        self.assertGreater(n_tested, 0)
+
+    def test_science_detectors_affine(self):
+        """
+        Test that every LSST science detector is reproduced by its affine
+        matrix to within the default tolerance
+        """
+        table = getDetectorAffineTable(self.camera)
+        science = np.array([self.camera[name].getType() == DetectorType.SCIENCE
+                            for name in table.names])
+        self.assertEqual(science.sum(), 189)
+        not_affine = [name for name, is_science, is_affine
+                      in zip(table.names, science, table.is_affine)
+                      if is_science and not is_affine]
+        self.assertEqual(not_affine, [])
+
+    def test_tan_pixels(self):
+        """
+        Test that TAN_PIXELS, which undo the optical distortion, are
+        flagged as not affine on every detector, and that points on
+        non-affine detectors are transformed with afw
+        """
+        table = getDetectorAffineTable(self.camera, pixelType=TAN_PIXELS)
+        self.assertEqual(table.pixelType, TAN_PIXELS)
+        self.assertFalse(table.is_affine.any())
+        self.assertTrue(np.isnan(table.forward).all())
+
+        # points scattered over every detector, in a mixed order
+        rng = np.random.RandomState(1187)
+        geometry = getCameraGeometryTable(self.camera)
+        n_det = len(table.names)
+        codes = rng.permutation(np.repeat(np.arange(n_det, dtype=np.int16), 5))
+        corners = geometry.corners_mm[codes]
+        frac = rng.random_sample((len(codes), 2))
+        xFocal = corners[:, :, 0].min(axis=1) + frac[:, 0]*np.ptp(corners[:, :, 0], axis=1)
+        yFocal = corners[:, :, 1].min(axis=1) + frac[:, 1]*np.ptp(corners[:, :, 1], axis=1)
+
+        pix_test = _pixelCoordsFromFocalPlaneCoords(xFocal, yFocal, codes, self.camera,
+                                                    TAN_PIXELS)
+        focal_test = _focalPlaneCoordsFromPixelCoords(pix_test[0], pix_test[1], codes,
+                                                      self.camera, TAN_PIXELS)
+        for i_det, name in enumerate(table.names):
+            det = self.camera[name]
+            dexes = np.where(codes == i_det)[0]
+            to_pixels = det.getTransform(FOCAL_PLANE, TAN_PIXELS).getMapping()
+            np.testing.assert_array_equal(pix_test[:, dexes],
+                                          to_pixels.applyForward(np.array([xFocal[dexes],
+                                                                           yFocal[dexes]])))
+            to_focal = det.getTransform(TAN_PIXELS, FOCAL_PLANE).getMapping()
+            np.testing.assert_array_equal(focal_test[:, dexes],
+                                          to_focal.applyForward(pix_test[:, dexes]))
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import numpy as np
+
+import lsst.utils.tests
+from lsst.afw.cameraGeom import FIELD_ANGLE, FOCAL_PLANE
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.coordUtils import getDistortionSurrogate
+from lsst.sims.coordUtils import ChebyshevTransformSurrogate
+from lsst.sims.coordUtils import focalPlaneCoordsFromPupilCoords
+from lsst.sims.coordUtils import pupilCoordsFromFocalPlaneCoords
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class DistortionSurrogateTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+        cls.pixel_size = min(det.getPixelSize().getX() for det in cls.camera)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_tolerance(self):
+        """
+        Test that the surrogate transformations agree with afw to within
+        the requested tolerance, in both directions
+        """
+        tolerance = 1.0e-4
+        for fromSys, toSys in ((FIELD_ANGLE, FOCAL_PLANE), (FOCAL_PLANE, FIELD_ANGLE)):
+            surrogate = getDistortionSurrogate(self.camera, fromSys, toSys,
+                                               tolerance_pixels=tolerance)
+            self.assertTrue(surrogate.converged)
+            self.assertLessEqual(surrogate.max_residual_pixels, tolerance)
+            self.assertIs(getDistortionSurrogate(self.camera, fromSys, toSys,
+                                                 tolerance_pixels=tolerance),
+                          surrogate)
+
+        rng = np.random.RandomState(2291)
+        n_pts = 20000
+        # extend past the fit region to exercise the fall back to afw
+        radius = 1.2*getDistortionSurrogate(self.camera, FIELD_ANGLE, FOCAL_PLANE).radius
+        xPupil = (rng.random_sample(n_pts)-0.5)*2.0*radius
+        yPupil = (rng.random_sample(n_pts)-0.5)*2.0*radius
+        xPupil[:3] = np.NaN
+
+        control = focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=self.camera)
+        test = focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=self.camera,
+                                               use_surrogate=True,
+                                               surrogate_tolerance=tolerance)
+        np.testing.assert_array_equal(np.isnan(test), np.isnan(control))
+        dd = np.sqrt(np.nanmax((test[0]-control[0])**2 + (test[1]-control[1])**2))
+        self.assertLess(dd/self.pixel_size, tolerance)
+
+        pupil_test = pupilCoordsFromFocalPlaneCoords(control[0], control[1],
+                                                     camera=self.camera,
+                                                     use_surrogate=True,
+                                                     surrogate_tolerance=tolerance)
+        np.testing.assert_array_equal(np.isnan(pupil_test), np.isnan(control))
+        focal_round = focalPlaneCoordsFromPupilCoords(pupil_test[0], pupil_test[1],
+                                                      camera=self.camera)
+        dd = np.sqrt(np.nanmax((focal_round[0]-control[0])**2 +
+                               (focal_round[1]-control[1])**2))
+        self.assertLess(dd/self.pixel_size, tolerance)
+
+    def test_rim(self):
+        """
+        Test that the surrogate meets its tolerance all the way out to
+        the edge of its domain, where the Chebyshev error is largest
+        """
+        tolerance = 1.0e-4
+        surrogate = getDistortionSurrogate(self.camera, FIELD_ANGLE, FOCAL_PLANE,
+                                           tolerance_pixels=tolerance)
+        self.assertTrue(surrogate.converged)
+
+        rng = np.random.RandomState(1187)
+        n_pts = 5000
+        theta = rng.random_sample(n_pts)*2.0*np.pi
+        rr = surrogate.radius*(1.0 - rng.random_sample(n_pts)*0.01)
+        rr[:100] = surrogate.radius*(1.0 - 1.0e-12)
+        xPupil = rr*np.cos(theta)
+        yPupil = rr*np.sin(theta)
+        self.assertTrue(surrogate.inDomain(xPupil, yPupil).all())
+
+        control = focalPlaneCoordsFromPupilCoords(xPupil, yPupil, camera=self.camera)
+        test = surrogate.apply(xPupil, yPupil)
+        dd = np.sqrt(np.max((test[0]-control[0])**2 + (test[1]-control[1])**2))
+        self.assertLess(dd/self.pixel_size, tolerance)
+
+    def test_fall_back(self):
+        """
+        Test that an unattainable tolerance leaves the surrogate unconverged
+        and the methods on the exact afw path
+        """
+        surrogate = ChebyshevTransformSurrogate(self.camera, FOCAL_PLANE, FIELD_ANGLE,
+                                                tolerance_pixels=0.0, max_degree=2)
+        self.assertFalse(surrogate.converged)
+        self.assertGreater(surrogate.max_residual_pixels, 0.0)
+
+        xFocal = np.linspace(-100.0, 100.0, 50)
+        yFocal = np.linspace(80.0, -120.0, 50)
+        control = pupilCoordsFromFocalPlaneCoords(xFocal, yFocal, camera=self.camera)
+        test = pupilCoordsFromFocalPlaneCoords(xFocal, yFocal, camera=self.camera,
+                                               use_surrogate=True, surrogate_tolerance=0.0)
+        np.testing.assert_array_equal(test, control)
+
+        with self.assertRaises(RuntimeError):
+            ChebyshevTransformSurrogate(self.camera, FIELD_ANGLE, FIELD_ANGLE)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
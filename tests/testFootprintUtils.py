@@ -0,0 +1,106 @@
+import unittest
+import numpy as np
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.utils import angularSeparation
+from lsst.sims.coordUtils import getDetectorFootprints
+from lsst.sims.coordUtils import getCornerRaDec
+from lsst.sims.coordUtils import getDetectorNameTable
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class DetectorFootprintsTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_against_corners(self):
+        """
+        Test that the footprint vertices agree with getCornerRaDec
+        for every detector and every pointing
+        """
+        obs_list = [ObservationMetaData(pointingRA=25.0, pointingDec=-32.0,
+                                        rotSkyPos=11.0, mjd=59580.0),
+                    ObservationMetaData(pointingRA=211.0, pointingDec=14.0,
+                                        rotSkyPos=287.0, mjd=60012.5)]
+
+        footprints = getDetectorFootprints(self.camera, obs_list)
+        names = getDetectorNameTable(self.camera)
+        self.assertEqual(list(footprints['detectorName']), list(names))
+        self.assertEqual(footprints['ra'].shape, (2, len(names), 4))
+        self.assertEqual(footprints['capRadius'].shape, (2, len(names)))
+
+        # getCornerRaDec orders its corners as
+        # (xmin, ymin), (xmin, ymax), (xmax, ymin), (xmax, ymax)
+        order = [0, 3, 1, 2]
+        for i_obs, obs in enumerate(obs_list):
+            for i_det, name in enumerate(names):
+                corners = np.array(getCornerRaDec(name, self.camera, obs))
+                np.testing.assert_allclose(footprints['ra'][i_obs, i_det][order],
+                                           corners[:, 0], rtol=0.0, atol=1.0e-10)
+                np.testing.assert_allclose(footprints['dec'][i_obs, i_det][order],
+                                           corners[:, 1], rtol=0.0, atol=1.0e-10)
+
+    def test_caps(self):
+        """
+        Test that the bounding caps contain every vertex of edge-sampled
+        polygons, and that a single ObservationMetaData drops the pointing axis
+        """
+        obs = ObservationMetaData(pointingRA=145.0, pointingDec=-25.0,
+                                  rotSkyPos=113.0, mjd=59580.0)
+        names = getDetectorNameTable(self.camera)[:10]
+        footprints = getDetectorFootprints(self.camera, obs, detector_names=names,
+                                           n_per_edge=3)
+        self.assertEqual(footprints['ra'].shape, (10, 12))
+        self.assertEqual(footprints['capRA'].shape, (10,))
+
+        for i_det in range(len(names)):
+            dist = angularSeparation(footprints['capRA'][i_det], footprints['capDec'][i_det],
+                                     footprints['ra'][i_det], footprints['dec'][i_det])
+            self.assertLessEqual(dist.max(), footprints['capRadius'][i_det] + 1.0e-10)
+            self.assertGreater(footprints['capRadius'][i_det], 0.0)
+
+        # the first vertex on each edge is a corner of the detector
+        corners = getDetectorFootprints(self.camera, obs, detector_names=names)
+        np.testing.assert_allclose(footprints['ra'][:, ::3], corners['ra'],
+                                   rtol=0.0, atol=1.0e-10)
+
+    def test_visit_table(self):
+        """
+        Test that pointings can be passed as a table of visits
+        """
+        visits = {'pointingRA': np.array([25.0, 211.0]),
+                  'pointingDec': np.array([-32.0, 14.0]),
+                  'rotSkyPos': np.array([11.0, 287.0]),
+                  'mjd': np.array([59580.0, 60012.5])}
+        footprints = getDetectorFootprints(self.camera, visits, detector_names=[0, 5])
+        obs = ObservationMetaData(pointingRA=211.0, pointingDec=14.0,
+                                  rotSkyPos=287.0, mjd=60012.5)
+        control = getDetectorFootprints(self.camera, obs, detector_names=[0, 5])
+        np.testing.assert_array_equal(footprints['ra'][1], control['ra'])
+        np.testing.assert_array_equal(footprints['dec'][1], control['dec'])
+
+        with self.assertRaises(RuntimeError) as context:
+            getDetectorFootprints(self.camera, {'pointingRA': visits['pointingRA']})
+        self.assertIn('getDetectorFootprints', context.exception.args[0])
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import numpy as np
+
+try:
+    import healpy
+    _has_healpy = True
+except ImportError:
+    _has_healpy = False
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.coordUtils import getDetectorHealpixCoverage, healpix_coverage_dtype
+from lsst.sims.coordUtils import chipNameFromRaDec, pixelCoordsFromRaDec
+from lsst.sims.coordUtils import getDetectorNameTable
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+@unittest.skipIf(not _has_healpy, "healpy is not installed")
+class HealpixCoverageTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_against_chip_name(self):
+        """
+        Test that every point landing on a detector lies in one of the pixels
+        that detector covers, and that the centers of fully covered pixels
+        lie on the detector
+        """
+        nside = 1024
+        obs = ObservationMetaData(pointingRA=35.0, pointingDec=-42.0,
+                                  rotSkyPos=21.0, mjd=59580.0)
+        coverage = getDetectorHealpixCoverage(self.camera, obs, nside)
+        self.assertGreater(len(coverage), 0)
+        np.testing.assert_array_equal(coverage['visit'], 0)
+        self.assertTrue((coverage['fraction'] > 0.0).all())
+        self.assertTrue((coverage['fraction'] <= 1.0).all())
+
+        names = getDetectorNameTable(self.camera)
+        covered = set(zip(coverage['detector'], coverage['hpid']))
+
+        rng = np.random.RandomState(81123)
+        n_obj = 20000
+        rr = np.radians(1.8)*np.sqrt(rng.random_sample(n_obj))
+        theta = rng.random_sample(n_obj)*2.0*np.pi
+        ra = obs.pointingRA + np.degrees(rr*np.cos(theta))/np.cos(np.radians(obs.pointingDec))
+        dec = obs.pointingDec + np.degrees(rr*np.sin(theta))
+        chip_names = chipNameFromRaDec(ra, dec, obs_metadata=obs, camera=self.camera)
+        hpid = healpy.ang2pix(nside, ra, dec, lonlat=True)
+
+        name_to_code = dict((name, ii) for ii, name in enumerate(names))
+        n_on_chip = 0
+        for name, pix in zip(chip_names, hpid):
+            if name is None:
+                continue
+            n_on_chip += 1
+            self.assertIn((name_to_code[name], pix), covered)
+        self.assertGreater(n_on_chip, n_obj//10)
+
+        full = np.where(coverage['fraction'] == 1.0)
+        self.assertGreater(len(full[0]), 0)
+        ra_full, dec_full = healpy.pix2ang(nside, coverage['hpid'][full], lonlat=True)
+        chip_full = names[coverage['detector'][full]]
+        xPix, yPix = pixelCoordsFromRaDec(ra_full, dec_full, chipName=chip_full,
+                                          obs_metadata=obs, camera=self.camera)
+        for name, xx, yy in zip(chip_full, xPix, yPix):
+            bbox = self.camera[name].getBBox()
+            self.assertGreaterEqual(xx, bbox.getMinX())
+            self.assertLessEqual(xx, bbox.getMaxX())
+            self.assertGreaterEqual(yy, bbox.getMinY())
+            self.assertLessEqual(yy, bbox.getMaxY())
+
+    def test_tan_pixels(self):
+        """
+        Test that, without distortion, the centers of fully covered pixels
+        lie on the detector in TAN_PIXELS
+        """
+        nside = 1024
+        names = getDetectorNameTable(self.camera)
+        obs = ObservationMetaData(pointingRA=35.0, pointingDec=-42.0,
+                                  rotSkyPos=21.0, mjd=59580.0)
+        coverage = getDetectorHealpixCoverage(self.camera, obs, nside,
+                                              detector_names=names[:10],
+                                              includeDistortion=False)
+        self.assertEqual(len(np.unique(coverage['detector'])), 10)
+
+        full = np.where(coverage['fraction'] == 1.0)
+        self.assertGreater(len(full[0]), 0)
+        ra_full, dec_full = healpy.pix2ang(nside, coverage['hpid'][full], lonlat=True)
+        chip_full = names[coverage['detector'][full]]
+        xPix, yPix = pixelCoordsFromRaDec(ra_full, dec_full, chipName=chip_full,
+                                          obs_metadata=obs, camera=self.camera,
+                                          includeDistortion=False)
+        for name, xx, yy in zip(chip_full, xPix, yPix):
+            bbox = self.camera[name].getBBox()
+            self.assertGreaterEqual(xx, bbox.getMinX()-0.5)
+            self.assertLess(xx, bbox.getMaxX()+0.5)
+            self.assertGreaterEqual(yy, bbox.getMinY()-0.5)
+            self.assertLess(yy, bbox.getMaxY()+0.5)
+
+    def test_many_visits(self):
+        """
+        Test that many visits give the same result as one visit at a time,
+        and that the NESTED scheme is supported
+        """
+        nside = 256
+        names = getDetectorNameTable(self.camera)[:20]
+        obs_list = [ObservationMetaData(pointingRA=25.0, pointingDec=-32.0,
+                                        rotSkyPos=11.0, mjd=59580.0),
+                    ObservationMetaData(pointingRA=211.0, pointingDec=14.0,
+                                        rotSkyPos=287.0, mjd=60012.5)]
+
+        coverage = getDetectorHealpixCoverage(self.camera, obs_list, nside,
+                                              detector_names=names)
+        coverage_nest = getDetectorHealpixCoverage(self.camera, obs_list, nside, nest=True,
+                                                   detector_names=names)
+        np.testing.assert_array_equal(coverage['hpid'],
+                                      healpy.nest2ring(nside, coverage_nest['hpid']))
+
+        for i_visit, obs in enumerate(obs_list):
+            control = getDetectorHealpixCoverage(self.camera, obs, nside,
+                                                 detector_names=names)
+            test = coverage[np.where(coverage['visit'] == i_visit)]
+            np.testing.assert_array_equal(test['detector'], control['detector'])
+            np.testing.assert_array_equal(test['hpid'], control['hpid'])
+            np.testing.assert_array_equal(test['fraction'], control['fraction'])
+
+            self.assertEqual(len(np.unique(test['detector'])), len(names))
+
+    def test_no_coverage(self):
+        """
+        Test that visits in which no pixels are covered give an empty table
+        """
+        obs = ObservationMetaData(pointingRA=25.0, pointingDec=-32.0,
+                                  rotSkyPos=11.0, mjd=59580.0)
+        for visits in (obs, [obs, obs]):
+            coverage = getDetectorHealpixCoverage(self.camera, visits, 64, detector_names=[])
+            self.assertEqual(coverage.dtype, healpix_coverage_dtype)
+            self.assertEqual(len(coverage), 0)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
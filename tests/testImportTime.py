@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+import builtins
+import importlib
+import os
+import subprocess
+import sys
+import json
+
+import lsst.utils.tests
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+# time, in seconds, that importing lsst.sims.coordUtils and looking up
+# chipNameFromPupilCoords may add on top of importing afw.  The default
+# only catches gross regressions (e.g. importing lsst.obs.lsst), so that
+# the test does not fail on a loaded machine; set
+# SIMS_COORDUTILS_IMPORT_BUDGET to check a tighter budget.
+_import_budget = float(os.environ.get('SIMS_COORDUTILS_IMPORT_BUDGET', 5.0))
+
+_import_script = """
+import json
+import sys
+import time
+import numpy
+import lsst.geom
+import lsst.afw.cameraGeom
+t_start = time.perf_counter()
+import lsst.sims.coordUtils
+from lsst.sims.coordUtils import chipNameFromPupilCoords
+t_import = time.perf_counter() - t_start
+# the other catalog-scale entry points defer lsst.sims.utils, too
+from lsst.sims.coordUtils import visitProjectionFromRaDec, projectFromRaDecChunks
+from lsst.sims.coordUtils import getDetectorFootprints, getDetectorHealpixCoverage
+from lsst.sims.coordUtils import ProjectionExecutor, CatalogSpatialIndex
+print(json.dumps({'time': t_import,
+                  'modules': [mm for mm in ('lsst.obs.lsst', 'palpy', 'lsst.sims.utils',
+                                            'lsst.sims.coordUtils.LsstZernikeFitter',
+                                            'lsst.sims.coordUtils.DMtoCameraModule')
+                              if mm in sys.modules]}))
+"""
+
+
+class ImportTimeTestCase(unittest.TestCase):
+
+    def test_import_time(self):
+        """
+        Test that importing lsst.sims.coordUtils and the chip-finding
+        methods does not import heavy dependencies, and stays within a
+        time budget
+        """
+        output = subprocess.check_output([sys.executable, '-c', _import_script])
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        self.assertEqual(result['modules'], [])
+        self.assertLess(result['time'], _import_budget)
+
+    def test_sims_utils_resolved_once(self):
+        """
+        Test that the CameraUtils wrappers around lsst.sims.utils only
+        import it on their first call
+        """
+        import lsst.sims.coordUtils.CameraUtils as CameraUtils
+        CameraUtils.radiansFromArcsec(1.0)
+        with mock.patch.object(builtins, '__import__', side_effect=AssertionError):
+            self.assertAlmostEqual(CameraUtils.radiansFromArcsec(3600.0), 0.0174532925, 9)
+            CameraUtils._validate_inputs([1.0, 2.0], ['a', 'b'], 'test')
+
+    def test_public_names(self):
+        """
+        Test that every name in the package's __all__ can be loaded, that
+        the lazy name table agrees with the __all__ of each submodule and
+        that no public name hides a submodule
+        """
+        import lsst.sims.coordUtils as coordUtils
+        # every submodule is listed; all but LsstZernikeFitter (which needs
+        # obs_lsst and sims_data) export their names from the package
+        package_dir = os.path.dirname(coordUtils.__file__)
+        submodule_files = [file_name[:-3] for file_name in os.listdir(package_dir)
+                           if file_name.endswith('.py') and file_name != '__init__.py']
+        self.assertEqual(sorted(coordUtils._submodules), sorted(submodule_files))
+        self.assertEqual(coordUtils._other_submodules, ['LsstZernikeFitter'])
+
+        for submodule, name_list in coordUtils._submodule_names.items():
+            module = importlib.import_module('lsst.sims.coordUtils.' + submodule)
+            self.assertEqual(sorted(module.__all__), sorted(name_list), msg=submodule)
+            self.assertIs(getattr(coordUtils, submodule), module)
+            for name in name_list:
+                self.assertNotIn(name, coordUtils._submodules)
+                self.assertIs(getattr(coordUtils, name), getattr(module, name))
+
+        self.assertIsInstance(coordUtils.CameraTransformCache, type)
+        with mock.patch('lsst.sims.coordUtils.CameraTransformCacheUtils.getCameraTransformCache',
+                        return_value='patched'):
+            from lsst.sims.coordUtils import CameraTransformCacheUtils
+            self.assertEqual(CameraTransformCacheUtils.getCameraTransformCache(), 'patched')
+        self.assertIn('chipNameFromPupilCoords', dir(coordUtils))
+        self.assertIn('LsstZernikeFitter', dir(coordUtils))
+
+        # submodules are attributes of the package even if nothing has
+        # imported them yet
+        script = ("import lsst.sims.coordUtils as coordUtils; "
+                  "print(coordUtils.CameraUtils.__name__, coordUtils.ParallelUtils.__name__)")
+        output = subprocess.check_output([sys.executable, '-c', script])
+        self.assertEqual(output.decode('utf-8').split()[-2:],
+                         ['lsst.sims.coordUtils.CameraUtils', 'lsst.sims.coordUtils.ParallelUtils'])
+        with self.assertRaises(AttributeError):
+            coordUtils.notAName
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
@@ -0,0 +1,263 @@
+import unittest
+import warnings
+from unittest import mock
+import numpy as np
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.coordUtils import visitProjectionFromRaDec
+from lsst.sims.coordUtils import visitProjectionChunksFromRaDec, visit_projection_dtype
+from lsst.sims.coordUtils import chipNameFromRaDec, pixelCoordsFromRaDec
+from lsst.sims.coordUtils import clean_up_lsst_camera, MultipleChipWarning
+import lsst.sims.coordUtils.MultiVisitUtils as MultiVisitUtils
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class MultiVisitProjectionTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def setUp(self):
+        rng = np.random.RandomState(61)
+        n_obj = 400
+        self.ra = 34.0 + (rng.random_sample(n_obj)-0.5)*5.0
+        self.dec = -31.0 + (rng.random_sample(n_obj)-0.5)*5.0
+        self.pm_ra = rng.random_sample(n_obj)*20.0 - 10.0
+        self.pm_dec = rng.random_sample(n_obj)*20.0 - 10.0
+        self.parallax = rng.random_sample(n_obj)*0.5
+        self.v_rad = rng.random_sample(n_obj)*600.0 - 300.0
+
+        n_visit = 7
+        self.visits = np.zeros(n_visit, dtype=np.dtype([('pointingRA', float),
+                                                        ('pointingDec', float),
+                                                        ('rotSkyPos', float),
+                                                        ('mjd', float)]))
+        self.visits['pointingRA'] = 34.0 + (rng.random_sample(n_visit)-0.5)*2.0
+        self.visits['pointingDec'] = -31.0 + (rng.random_sample(n_visit)-0.5)*2.0
+        self.visits['rotSkyPos'] = rng.random_sample(n_visit)*360.0
+        self.visits['mjd'] = 59580.0 + rng.random_sample(n_visit)*3650.0
+
+    def test_against_single_visit(self):
+        """
+        Test that visitProjectionFromRaDec reproduces running
+        chipNameFromRaDec and pixelCoordsFromRaDec one visit at a time
+        """
+        obs_list = [ObservationMetaData(pointingRA=vv['pointingRA'],
+                                        pointingDec=vv['pointingDec'],
+                                        rotSkyPos=vv['rotSkyPos'],
+                                        mjd=vv['mjd'])
+                    for vv in self.visits]
+
+        for visits in (self.visits, obs_list):
+            for chunk_size in (1, 3, 100):
+                table = visitProjectionFromRaDec(self.ra, self.dec, visits, camera=self.camera,
+                                                 pm_ra=self.pm_ra, pm_dec=self.pm_dec,
+                                                 parallax=self.parallax, v_rad=self.v_rad,
+                                                 visit_chunk_size=chunk_size)
+
+                self.assertGreater(len(table), 0)
+                ct_rows = 0
+                for i_visit, obs in enumerate(obs_list):
+                    codes = chipNameFromRaDec(self.ra, self.dec,
+                                              pm_ra=self.pm_ra, pm_dec=self.pm_dec,
+                                              parallax=self.parallax, v_rad=self.v_rad,
+                                              obs_metadata=obs, camera=self.camera,
+                                              as_detector_index=True)
+                    xpix, ypix = pixelCoordsFromRaDec(self.ra, self.dec,
+                                                      pm_ra=self.pm_ra, pm_dec=self.pm_dec,
+                                                      parallax=self.parallax, v_rad=self.v_rad,
+                                                      obs_metadata=obs, camera=self.camera)
+
+                    on_chip = np.where(codes >= 0)[0]
+                    visit_rows = table[np.where(table['visit'] == i_visit)]
+                    np.testing.assert_array_equal(visit_rows['source'], on_chip)
+                    np.testing.assert_array_equal(visit_rows['detector'], codes[on_chip])
+                    np.testing.assert_array_equal(visit_rows['xPix'], xpix[on_chip])
+                    np.testing.assert_array_equal(visit_rows['yPix'], ypix[on_chip])
+                    ct_rows += len(on_chip)
+
+                self.assertEqual(ct_rows, len(table))
+
+    def test_invalid_sources(self):
+        """
+        Test that masked and non-finite sources are left out of the table
+        and that the other sources keep their indices in the input catalog
+        """
+        ra = np.ma.masked_array(self.ra, mask=np.zeros(len(self.ra), dtype=bool))
+        ra[::5] = np.ma.masked
+        parallax = np.copy(self.parallax)
+        parallax[2::7] = np.NaN
+
+        valid = np.where(np.logical_and(np.logical_not(np.ma.getmaskarray(ra)),
+                                        np.isfinite(parallax)))[0]
+
+        table = visitProjectionFromRaDec(ra, self.dec, self.visits, camera=self.camera,
+                                         pm_ra=self.pm_ra, pm_dec=self.pm_dec,
+                                         parallax=parallax, v_rad=self.v_rad)
+        control = visitProjectionFromRaDec(self.ra[valid], self.dec[valid], self.visits,
+                                           camera=self.camera,
+                                           pm_ra=self.pm_ra[valid], pm_dec=self.pm_dec[valid],
+                                           parallax=parallax[valid], v_rad=self.v_rad[valid])
+        self.assertGreater(len(table), 0)
+        np.testing.assert_array_equal(table['source'], valid[control['source']])
+        for col in ('visit', 'detector', 'xPix', 'yPix'):
+            np.testing.assert_array_equal(table[col], control[col])
+
+    def test_chunks(self):
+        """
+        Test that visitProjectionChunksFromRaDec yields one table per chunk of
+        visits, that together they reproduce visitProjectionFromRaDec, and that
+        bad arguments are reported before the generator is advanced
+        """
+        control = visitProjectionFromRaDec(self.ra, self.dec, self.visits, camera=self.camera,
+                                           pm_ra=self.pm_ra, pm_dec=self.pm_dec,
+                                           parallax=self.parallax, v_rad=self.v_rad)
+
+        chunk_list = list(visitProjectionChunksFromRaDec(self.ra, self.dec, self.visits,
+                                                         camera=self.camera,
+                                                         pm_ra=self.pm_ra, pm_dec=self.pm_dec,
+                                                         parallax=self.parallax,
+                                                         v_rad=self.v_rad,
+                                                         visit_chunk_size=3))
+        self.assertEqual(len(chunk_list), 3)
+        for i_chunk, chunk in enumerate(chunk_list):
+            self.assertTrue(np.all(chunk['visit']//3 == i_chunk))
+        np.testing.assert_array_equal(np.concatenate(chunk_list), control)
+
+        # without any valid source, every chunk is still yielded (empty)
+        ra_nan = np.full(len(self.ra), np.NaN)
+        chunk_list = list(visitProjectionChunksFromRaDec(ra_nan, self.dec, self.visits,
+                                                         camera=self.camera,
+                                                         visit_chunk_size=3))
+        self.assertEqual(len(chunk_list), 3)
+        for chunk in chunk_list:
+            self.assertEqual(len(chunk), 0)
+            self.assertEqual(chunk.dtype, visit_projection_dtype)
+
+        with self.assertRaises(RuntimeError):
+            visitProjectionChunksFromRaDec(self.ra, self.dec, self.visits)
+        with self.assertRaises(RuntimeError):
+            visitProjectionChunksFromRaDec(self.ra, self.dec, self.visits, camera=self.camera,
+                                           visit_chunk_size=0)
+
+    def test_field_of_view_cut(self):
+        """
+        Test that sources far from every visit are not sent through the
+        astrometry, and that they do not change the output
+        """
+        ra = np.concatenate([self.ra, self.ra + 90.0])
+        dec = np.concatenate([self.dec, self.dec])
+        control = visitProjectionFromRaDec(self.ra, self.dec, self.visits, camera=self.camera)
+
+        with mock.patch.object(MultiVisitUtils, '_pupilCoordsFromRaDec',
+                               wraps=MultiVisitUtils._pupilCoordsFromRaDec) as pupil_coords:
+            table = visitProjectionFromRaDec(ra, dec, self.visits, camera=self.camera)
+
+        self.assertEqual(pupil_coords.call_count, len(self.visits))
+        for call in pupil_coords.call_args_list:
+            self.assertLess(len(call[0][0]), len(self.ra))
+        np.testing.assert_array_equal(table, control)
+
+    def test_moving_sources(self):
+        """
+        Test that sources that move onto the camera between epoch and
+        a visit are not lost by the field of view cut
+        """
+        rng = np.random.RandomState(88)
+        n_obj = 2000
+        ra = 34.0 + (rng.random_sample(n_obj)-0.5)*8.0
+        dec = -31.0 + (rng.random_sample(n_obj)-0.5)*8.0
+        pm_ra = rng.random_sample(n_obj)*400.0 - 200.0
+        pm_dec = rng.random_sample(n_obj)*400.0 - 200.0
+        parallax = rng.random_sample(n_obj)*0.5
+
+        table = visitProjectionFromRaDec(ra, dec, self.visits, camera=self.camera,
+                                         pm_ra=pm_ra, pm_dec=pm_dec, parallax=parallax,
+                                         margin=0.0)
+
+        # brute force: every source goes through the astrometry in every visit
+        ct_rows = 0
+        for i_visit, vv in enumerate(self.visits):
+            obs = ObservationMetaData(pointingRA=vv['pointingRA'], pointingDec=vv['pointingDec'],
+                                      rotSkyPos=vv['rotSkyPos'], mjd=vv['mjd'])
+            codes = chipNameFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=pm_dec, parallax=parallax,
+                                      obs_metadata=obs, camera=self.camera,
+                                      as_detector_index=True)
+            visit_rows = table[np.where(table['visit'] == i_visit)]
+            np.testing.assert_array_equal(visit_rows['source'], np.where(codes >= 0)[0])
+            ct_rows += len(visit_rows)
+        self.assertEqual(ct_rows, len(table))
+
+        # without the motion bound, some of those sources are lost
+        with mock.patch.object(MultiVisitUtils, '_motionBound', return_value=(0.0, 0.0)):
+            static_table = visitProjectionFromRaDec(ra, dec, self.visits, camera=self.camera,
+                                                    pm_ra=pm_ra, pm_dec=pm_dec,
+                                                    parallax=parallax, margin=0.0)
+        self.assertLess(len(static_table), len(table))
+
+    def test_multiple_chip_warning(self):
+        """
+        Test that a MultipleChipWarning raised while projecting a visit reports
+        the offending objects by their indices in the input catalog
+        """
+        ra = np.concatenate([self.ra + 90.0, self.ra])
+        dec = np.concatenate([self.dec, self.dec])
+        dec[1] = np.NaN
+
+        project_exactly = MultiVisitUtils.projectFromPupilCoords
+
+        def project(xPupil, yPupil, **kwargs):
+            warnings.warn(MultipleChipWarning.fromIndices(np.array([0, 2]), 'pupil coordinate'))
+            return project_exactly(xPupil, yPupil, **kwargs)
+
+        with mock.patch.object(MultiVisitUtils, 'projectFromPupilCoords', side_effect=project):
+            with warnings.catch_warnings(record=True) as warning_list:
+                warnings.simplefilter('always')
+                visitProjectionFromRaDec(ra, dec, self.visits[:1], camera=self.camera)
+
+        # the objects handed to projectFromPupilCoords, as rows of the input catalog
+        valid_rows = np.delete(np.arange(len(ra)), 1)
+        obs = ObservationMetaData(pointingRA=self.visits['pointingRA'][0],
+                                  pointingDec=self.visits['pointingDec'][0],
+                                  rotSkyPos=self.visits['rotSkyPos'][0],
+                                  mjd=self.visits['mjd'][0])
+        spatial_index = MultiVisitUtils.CatalogSpatialIndex(ra[valid_rows], dec[valid_rows])
+        in_field = valid_rows[spatial_index.fieldIndices(obs, self.camera)]
+
+        chip_warnings = [ww for ww in warning_list
+                         if issubclass(ww.category, MultipleChipWarning)]
+        self.assertEqual(len(chip_warnings), 1)
+        np.testing.assert_array_equal(chip_warnings[0].message.indices, in_field[[0, 2]])
+        self.assertEqual(chip_warnings[0].message.point_label, 'pupil coordinate')
+
+    def test_bad_visits(self):
+        """
+        Test that visits missing needed information raise errors
+        """
+        with self.assertRaises(RuntimeError):
+            visitProjectionFromRaDec(self.ra, self.dec, self.visits[['pointingRA', 'pointingDec']],
+                                     camera=self.camera)
+
+        obs = ObservationMetaData(pointingRA=34.0, pointingDec=-31.0, mjd=59580.0)
+        with self.assertRaises(RuntimeError):
+            visitProjectionFromRaDec(self.ra, self.dec, [obs], camera=self.camera)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
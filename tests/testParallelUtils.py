@@ -0,0 +1,123 @@
+import unittest
+import warnings
+from concurrent.futures import Future
+import numpy as np
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.coordUtils import ProjectionExecutor
+from lsst.sims.coordUtils import projectFromRaDec, projectFromPupilCoords
+from lsst.sims.coordUtils import MultipleChipWarning
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class ProjectionExecutorTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def test_against_serial(self):
+        """
+        Test that ProjectionExecutor returns exactly what the serial
+        projection methods return, in the same order
+        """
+        rng = np.random.RandomState(7723)
+        n_obj = 1000
+        ra = 112.0 + (rng.random_sample(n_obj)-0.5)*4.0
+        dec = 14.0 + (rng.random_sample(n_obj)-0.5)*4.0
+        pm_ra = rng.random_sample(n_obj)*20.0 - 10.0
+        parallax = rng.random_sample(n_obj)*0.5
+        obs = ObservationMetaData(pointingRA=112.0, pointingDec=14.0,
+                                  rotSkyPos=77.0, mjd=60123.0)
+        columns = ('chipName', 'detectorIndex', 'xFocal', 'yFocal', 'xPix', 'yPix')
+
+        control = projectFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=2.0, parallax=parallax,
+                                   obs_metadata=obs, camera=self.camera, columns=columns)
+        pupil_control = projectFromPupilCoords(control['xFocal']*1.0e-5,
+                                               control['yFocal']*1.0e-5,
+                                               camera=self.camera, columns=columns,
+                                               includeDistortion=False)
+
+        with ProjectionExecutor(n_workers=2, shard_size=300) as executor:
+            test = executor.projectFromRaDec(ra, dec, pm_ra=pm_ra, pm_dec=2.0,
+                                             parallax=parallax, obs_metadata=obs,
+                                             columns=columns)
+            pupil_test = executor.projectFromPupilCoords(control['xFocal']*1.0e-5,
+                                                         control['yFocal']*1.0e-5,
+                                                         columns=columns,
+                                                         includeDistortion=False)
+            empty = executor.projectFromRaDec(np.zeros(0), np.zeros(0), obs_metadata=obs,
+                                              columns=columns)
+            chunk_list = list(executor.projectFromRaDecChunks(ra, dec, pm_ra=pm_ra, pm_dec=2.0,
+                                                              parallax=parallax,
+                                                              obs_metadata=obs,
+                                                              columns=columns))
+
+        self.assertGreater((control['detectorIndex'] >= 0).sum(), 0)
+        for cc in columns:
+            np.testing.assert_array_equal(test[cc], control[cc])
+            np.testing.assert_array_equal(pupil_test[cc], pupil_control[cc])
+            self.assertEqual(len(empty[cc]), 0)
+
+        self.assertEqual([len(chunk['xPix']) for chunk in chunk_list], [300, 300, 300, 100])
+        for cc in columns:
+            np.testing.assert_array_equal(np.concatenate([chunk[cc] for chunk in chunk_list]),
+                                          control[cc])
+
+    def test_worker_warnings(self):
+        """
+        Test that warnings returned by a worker are re-emitted, with the
+        indices of a MultipleChipWarning counted from the start of the input
+        """
+        future = Future()
+        future.set_result(({'xPix': np.zeros(5)},
+                           [MultipleChipWarning.fromIndices(np.array([1, 4]), 'focal plane'),
+                            UserWarning('another warning')]))
+        with ProjectionExecutor(n_workers=1) as executor:
+            with warnings.catch_warnings(record=True) as warning_list:
+                warnings.simplefilter('always')
+                result = executor._shardResult(300, future)
+
+        self.assertEqual(len(result['xPix']), 5)
+        self.assertEqual(len(warning_list), 2)
+        self.assertTrue(issubclass(warning_list[0].category, MultipleChipWarning))
+        np.testing.assert_array_equal(warning_list[0].message.indices, [301, 304])
+        self.assertIn('[301, 304]', str(warning_list[0].message))
+        self.assertTrue(issubclass(warning_list[1].category, UserWarning))
+
+    def test_bad_input(self):
+        """
+        Test that bad executor parameters and non-array inputs are rejected
+        """
+        with self.assertRaises(RuntimeError):
+            ProjectionExecutor(n_workers=0)
+        with self.assertRaises(RuntimeError):
+            ProjectionExecutor(shard_size=0)
+        with self.assertRaises(RuntimeError):
+            ProjectionExecutor(max_pending_shards=0)
+        with ProjectionExecutor(n_workers=1) as executor:
+            self.assertEqual(executor.max_pending_shards, 2)
+            with self.assertRaises(RuntimeError):
+                executor.projectFromPupilCoords(0.0, 0.0)
+            with self.assertRaises(RuntimeError):
+                executor.projectFromPupilCoordsChunks(0.0, 0.0)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
@@ -5,6 +5,9 @@ import lsst.utils.tests
 import lsst.obs.lsst.phosim as obs_lsst_phosim
 from lsst.sims.coordUtils import DMtoCameraPixelTransformer
 from lsst.sims.coordUtils import pupilCoordsFromPixelCoords
+from lsst.sims.coordUtils import pixelCoordsFromPupilCoords
+from lsst.sims.coordUtils import chipNameFromPupilCoords
+from lsst.sims.coordUtils import getDetectorNameTable
 from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS
 
 
@@ -58,6 +61,124 @@ class PixelTransformerTestCase(unittest.TestCase):
         del camera_wrapper
         del camera
 
+    def test_mixed_detectors(self):
+        """
+        Test that arrays of points on many different detectors are
+        converted as if each point were converted on its own
+        """
+        camera_wrapper = DMtoCameraPixelTransformer()
+        rng = np.random.RandomState(6124)
+        name_table = getDetectorNameTable(camera_wrapper._camera)
+        npts = 1000
+        codes = rng.randint(0, len(name_table), size=npts)
+        det_names = name_table[codes]
+        cam_x_in = rng.random_sample(npts)*4000.0
+        cam_y_in = rng.random_sample(npts)*4000.0
+
+        for chipName in (det_names, list(det_names), codes):
+            dm_x, dm_y = camera_wrapper.dmPixFromCameraPix(cam_x_in, cam_y_in, chipName)
+            cam_x, cam_y = camera_wrapper.cameraPixFromDMPix(dm_x, dm_y, chipName)
+            np.testing.assert_array_almost_equal(cam_x_in, cam_x, decimal=10)
+            np.testing.assert_array_almost_equal(cam_y_in, cam_y, decimal=10)
+
+            for ii in range(0, npts, 37):
+                xx, yy = camera_wrapper.dmPixFromCameraPix(cam_x_in[ii], cam_y_in[ii],
+                                                           det_names[ii])
+                self.assertEqual(xx, dm_x[ii])
+                self.assertEqual(yy, dm_y[ii])
+
+        del camera_wrapper
+
+    def test_no_detector(self):
+        """
+        Test that asking for a single detector with no chip (None or index -1)
+        raises rather than silently using the last detector
+        """
+        camera_wrapper = DMtoCameraPixelTransformer()
+        name_table = getDetectorNameTable(camera_wrapper._camera)
+        for chipName in (None, 'None', -1, np.int16(-1)):
+            with self.assertRaises(RuntimeError):
+                camera_wrapper.getBBox(chipName)
+            with self.assertRaises(RuntimeError):
+                camera_wrapper.getCenterPixel(chipName)
+            with self.assertRaises(RuntimeError):
+                camera_wrapper.cameraPixFromDMPix(1.0, 2.0, chipName)
+            with self.assertRaises(RuntimeError):
+                camera_wrapper.dmPixFromCameraPix(1.0, 2.0, chipName)
+
+        # scalar detector indices are still accepted
+        i_det = len(name_table)-1
+        self.assertEqual(camera_wrapper.cameraPixFromDMPix(1.0, 2.0, i_det),
+                         camera_wrapper.cameraPixFromDMPix(1.0, 2.0, name_table[i_det]))
+        self.assertEqual(camera_wrapper.getCenterPixel(i_det).getX(),
+                         camera_wrapper.getCenterPixel(name_table[i_det]).getX())
+
+        # in arrays, points with no chip are NaN
+        cam_x, cam_y = camera_wrapper.cameraPixFromDMPix(np.array([1.0, 2.0]),
+                                                         np.array([3.0, 4.0]),
+                                                         [None, name_table[0]])
+        self.assertTrue(np.isnan(cam_x[0]))
+        self.assertTrue(np.isfinite(cam_x[1]))
+
+        del camera_wrapper
+
+    def test_pixel_convention(self):
+        """
+        Test that asking CameraUtils for Camera team pixels agrees with
+        converting DM pixels with DMtoCameraPixelTransformer, and that
+        the inverse transformation accepts Camera team pixels
+        """
+        camera = obs_lsst_phosim.PhosimMapper().camera
+        camera_wrapper = DMtoCameraPixelTransformer(camera=camera)
+        self.assertIs(camera_wrapper._camera, camera)
+
+        rng = np.random.RandomState(4491)
+        npts = 2000
+        xpup = (rng.random_sample(npts)-0.5)*0.03
+        ypup = (rng.random_sample(npts)-0.5)*0.03
+        xpup[:3] = np.NaN
+
+        for includeDistortion in (True, False):
+            dm_x, dm_y = pixelCoordsFromPupilCoords(xpup, ypup, camera=camera,
+                                                    includeDistortion=includeDistortion)
+            cam_x, cam_y = pixelCoordsFromPupilCoords(xpup, ypup, camera=camera,
+                                                      includeDistortion=includeDistortion,
+                                                      pixelConvention='camera')
+            on_chip = np.where(np.isfinite(dm_x))[0]
+            self.assertGreater(len(on_chip), npts//10)
+            self.assertTrue(np.isnan(cam_x[3:][np.isnan(dm_x[3:])]).all())
+
+            chip_names = chipNameFromPupilCoords(xpup[on_chip], ypup[on_chip], camera=camera)
+            control_x, control_y = camera_wrapper.cameraPixFromDMPix(dm_x[on_chip],
+                                                                     dm_y[on_chip],
+                                                                     chip_names)
+            np.testing.assert_allclose(cam_x[on_chip], control_x, rtol=0.0, atol=1.0e-6)
+            np.testing.assert_allclose(cam_y[on_chip], control_y, rtol=0.0, atol=1.0e-6)
+
+            pupil = pupilCoordsFromPixelCoords(cam_x[on_chip], cam_y[on_chip], chip_names,
+                                               camera=camera,
+                                               includeDistortion=includeDistortion,
+                                               pixelConvention='camera')
+            np.testing.assert_allclose(pupil[0], xpup[on_chip], rtol=0.0, atol=1.0e-12)
+            np.testing.assert_allclose(pupil[1], ypup[on_chip], rtol=0.0, atol=1.0e-12)
+
+            ii = on_chip[0]
+            single = pixelCoordsFromPupilCoords(xpup[ii], ypup[ii], camera=camera,
+                                                includeDistortion=includeDistortion,
+                                                pixelConvention='camera')
+            np.testing.assert_allclose(single, [cam_x[ii], cam_y[ii]], rtol=0.0, atol=1.0e-6)
+            single = pupilCoordsFromPixelCoords(cam_x[ii], cam_y[ii], chip_names[0],
+                                                camera=camera,
+                                                includeDistortion=includeDistortion,
+                                                pixelConvention='camera')
+            np.testing.assert_allclose(single, [xpup[ii], ypup[ii]], rtol=0.0, atol=1.0e-12)
+
+        with self.assertRaises(RuntimeError):
+            pixelCoordsFromPupilCoords(xpup, ypup, camera=camera, pixelConvention='phosim')
+
+        del camera_wrapper
+        del camera
+
 
 class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
     pass
@@ -0,0 +1,134 @@
+import unittest
+import numpy as np
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.utils import ObservationMetaData
+from lsst.sims.coordUtils import projectFromRaDec
+from lsst.sims.coordUtils import projectFromRaDecChunks, projectFromRaDecToNpy
+from lsst.sims.coordUtils import _projectFromRaDecChunks
+from lsst.sims.coordUtils import iterateCatalogChunks
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class StreamingProjectionTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def setUp(self):
+        rng = np.random.RandomState(1172)
+        n_obj = 1000
+        self.catalog = np.zeros(n_obj, dtype=np.dtype([('ra', float), ('dec', float),
+                                                       ('pm_ra', float), ('pm_dec', float),
+                                                       ('parallax', float), ('v_rad', float)]))
+        self.catalog['ra'] = 34.0 + (rng.random_sample(n_obj)-0.5)*4.0
+        self.catalog['dec'] = -31.0 + (rng.random_sample(n_obj)-0.5)*4.0
+        self.catalog['pm_ra'] = rng.random_sample(n_obj)*20.0 - 10.0
+        self.catalog['pm_dec'] = rng.random_sample(n_obj)*20.0 - 10.0
+        self.catalog['parallax'] = rng.random_sample(n_obj)*0.5
+        self.catalog['v_rad'] = rng.random_sample(n_obj)*600.0 - 300.0
+        self.obs = ObservationMetaData(pointingRA=34.0, pointingDec=-31.0,
+                                       rotSkyPos=21.0, mjd=59780.0)
+        self.columns = ('detectorIndex', 'xFocal', 'yFocal', 'xPix', 'yPix')
+
+        self.control = projectFromRaDec(self.catalog['ra'], self.catalog['dec'],
+                                        pm_ra=self.catalog['pm_ra'],
+                                        pm_dec=self.catalog['pm_dec'],
+                                        parallax=self.catalog['parallax'],
+                                        v_rad=self.catalog['v_rad'],
+                                        obs_metadata=self.obs, camera=self.camera,
+                                        columns=self.columns)
+
+    def test_chunks(self):
+        """
+        Test that projecting a catalog in chunks reproduces projecting it
+        all at once, whether the chunks come from an array, a file or an
+        iterable of dicts
+        """
+        self.assertGreater((self.control['detectorIndex'] >= 0).sum(), 0)
+
+        with lsst.utils.tests.getTempFilePath('.npy') as in_path:
+            np.save(in_path, self.catalog)
+
+            dict_chunks = [dict((name, self.catalog[name][ii:ii+300])
+                                for name in self.catalog.dtype.names)
+                           for ii in range(0, len(self.catalog), 300)]
+
+            for catalog in (self.catalog, in_path, dict_chunks):
+                results = list(projectFromRaDecChunks(catalog, obs_metadata=self.obs,
+                                                      camera=self.camera,
+                                                      columns=self.columns,
+                                                      chunk_size=300))
+                self.assertEqual(len(results), 4)
+                for cc in self.columns:
+                    np.testing.assert_array_equal(np.concatenate([rr[cc] for rr in results]),
+                                                  self.control[cc])
+
+    def test_to_npy(self):
+        """
+        Test that projectFromRaDecToNpy writes the same results as
+        projecting the catalog all at once
+        """
+        with lsst.utils.tests.getTempFilePath('.npy') as in_path:
+            np.save(in_path, self.catalog)
+            with lsst.utils.tests.getTempFilePath('.npy') as out_path:
+                n_rows = projectFromRaDecToNpy(in_path, out_path, obs_metadata=self.obs,
+                                               camera=self.camera, columns=self.columns,
+                                               chunk_size=333)
+                self.assertEqual(n_rows, len(self.catalog))
+                output = np.load(out_path)
+                self.assertEqual(output['detectorIndex'].dtype, np.int16)
+                for cc in self.columns:
+                    np.testing.assert_array_equal(output[cc], self.control[cc])
+
+                with self.assertRaises(RuntimeError):
+                    projectFromRaDecToNpy(in_path, out_path, obs_metadata=self.obs,
+                                          camera=self.camera, columns=('chipName',))
+
+    def test_bad_input(self):
+        """
+        Test that unstructured arrays and bad chunk sizes are rejected
+        """
+        with self.assertRaises(RuntimeError):
+            iterateCatalogChunks(np.zeros(10))
+        with self.assertRaises(RuntimeError):
+            iterateCatalogChunks(self.catalog, chunk_size=0)
+
+    def test_eager_errors(self):
+        """
+        Test that bad arguments to the chunked projections are reported when
+        they are called, rather than when their generators are first advanced
+        """
+        with self.assertRaises(RuntimeError):
+            projectFromRaDecChunks(self.catalog, obs_metadata=self.obs)
+        with self.assertRaises(RuntimeError):
+            projectFromRaDecChunks(self.catalog, camera=self.camera)
+        with self.assertRaises(RuntimeError):
+            projectFromRaDecChunks(self.catalog, obs_metadata=self.obs, camera=self.camera,
+                                   chunk_size=0)
+        with self.assertRaises(RuntimeError):
+            _projectFromRaDecChunks(self.catalog, obs_metadata=self.obs, camera=self.camera,
+                                    columns=('xPix', 'magnitude'))
+        with self.assertRaises(RuntimeError):
+            _projectFromRaDecChunks(self.catalog, obs_metadata=self.obs, camera=self.camera,
+                                    epoch=None)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
@@ -0,0 +1,242 @@
+import unittest
+from unittest import mock
+import os
+import tempfile
+import time
+import numpy as np
+
+import lsst.utils.tests
+from lsst.obs.lsst.phosim import PhosimMapper
+from lsst.sims.coordUtils.LsstZernikeFitter import LsstZernikeFitter
+from lsst.sims.coordUtils.LsstZernikeFitter import _readZernikeCache, _writeZernikeCache
+from lsst.sims.coordUtils import clean_up_lsst_camera
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class ZernikeCacheTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.camera = PhosimMapper().camera
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.camera
+        clean_up_lsst_camera()
+
+    def setUp(self):
+        rng = np.random.RandomState(7123)
+        self.n_grid = [0, 1, 1, 2, 2, 2]
+        self.m_grid = [0, -1, 1, -2, 0, 2]
+        self.coeffs = {'n_grid': np.array(self.n_grid),
+                       'm_grid': np.array(self.m_grid),
+                       'pupil_to_focal': rng.random_sample((6, 2, len(self.n_grid))),
+                       'focal_to_pupil': rng.random_sample((6, 2, len(self.n_grid)))}
+
+    def test_round_trip(self):
+        """
+        Test that coefficients are read back only with the key they were
+        written with
+        """
+        with lsst.utils.tests.getTempFilePath('.npz') as file_name:
+            self.assertIsNone(_readZernikeCache(file_name, 'abc'))
+
+            _writeZernikeCache(file_name, 'abc', self.coeffs)
+            self.assertTrue(os.path.exists(file_name))
+
+            test = _readZernikeCache(file_name, 'abc')
+            for name in self.coeffs:
+                np.testing.assert_array_equal(test[name], self.coeffs[name])
+            self.assertIsNone(_readZernikeCache(file_name, 'abd'))
+
+            # a damaged file is treated as a cache miss
+            with open(file_name, 'wb') as output_file:
+                output_file.write(b'not an npz file')
+            self.assertIsNone(_readZernikeCache(file_name, 'abc'))
+
+            # overwriting replaces the damaged file
+            _writeZernikeCache(file_name, 'abc', self.coeffs)
+            self.assertIsNotNone(_readZernikeCache(file_name, 'abc'))
+
+        # a failed write leaves no temporary file behind
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch('numpy.savez', side_effect=RuntimeError):
+                with self.assertRaises(RuntimeError):
+                    _writeZernikeCache(os.path.join(cache_dir, 'coeffs.npz'), 'abc', self.coeffs)
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_coefficient_dicts(self):
+        """
+        Test that the coefficients are unpacked into the dicts used by
+        LsstZernikeFitter and packed back into the same arrays
+        """
+        fitter = LsstZernikeFitter.__new__(LsstZernikeFitter)
+        fitter._int_to_band = 'ugrizy'
+        fitter._n_grid = self.n_grid
+        fitter._m_grid = self.m_grid
+        fitter._coeffs_from_arrays(self.coeffs)
+
+        self.assertEqual(list(fitter._pupil_to_focal['g']['y'].keys()),
+                         list(zip(self.n_grid, self.m_grid)))
+        self.assertEqual(fitter._focal_to_pupil['z']['x'][(2, -2)],
+                         self.coeffs['focal_to_pupil'][4, 0, 3])
+
+        test = fitter._coeffs_to_arrays()
+        for name in self.coeffs:
+            np.testing.assert_array_equal(test[name], self.coeffs[name])
+
+    def _bareFitter(self, camera):
+        fitter = LsstZernikeFitter.__new__(LsstZernikeFitter)
+        fitter._camera = camera
+        fitter._n_grid = self.n_grid
+        fitter._m_grid = self.m_grid
+        fitter._rr = 500.0
+        return fitter
+
+    def _movedCamera(self):
+        """
+        Return a copy of the camera in which one detector has been moved
+        """
+        builder = self.camera.rebuild()
+        builder['R22_S12'].setOrientation(builder['R22_S11'].getOrientation())
+        return builder.finish()
+
+    def test_cache_keys(self):
+        """
+        Test that the cache file is keyed on the camera geometry and the
+        Zernike polynomials fit, that the manifest of the FocalPlaneData is
+        found without reading them and that their checksum depends on
+        their contents
+        """
+        fitter = self._bareFitter(self.camera)
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            os.makedirs(os.path.join(data_dir, 'PhoSimData'))
+            file_name = os.path.join(data_dir, 'PhoSimData', 'centroid.txt')
+            with open(file_name, 'w') as output_file:
+                output_file.write('1 2 3\n')
+            os.utime(file_name, ns=(10**18, 10**18))
+
+            key = fitter._cache_key()
+            manifest = fitter._manifest(data_dir)
+            checksum = fitter._content_checksum(data_dir)
+            with mock.patch('builtins.open', side_effect=AssertionError):
+                self.assertEqual(fitter._manifest(data_dir), manifest)
+
+            # the same size and modification time, but different contents;
+            # the change time still moves on (wait so that it cannot land
+            # in the same tick of a coarse file system clock)
+            time.sleep(0.1)
+            with open(file_name, 'w') as output_file:
+                output_file.write('1 2 4\n')
+            os.utime(file_name, ns=(10**18, 10**18))
+            self.assertNotEqual(fitter._manifest(data_dir), manifest)
+            self.assertNotEqual(fitter._content_checksum(data_dir), checksum)
+            self.assertEqual(fitter._cache_key(), key)
+
+            # the same detector names, but different geometry
+            moved = self._bareFitter(self._movedCamera())
+            self.assertNotEqual(moved._cache_key(), key)
+
+            fitter._n_grid = self.n_grid[:-1]
+            fitter._m_grid = self.m_grid[:-1]
+            self.assertNotEqual(fitter._cache_key(), key)
+
+    def test_constructor(self):
+        """
+        Test that an LsstZernikeFitter can be built for a camera, that the
+        coefficients are then read from the cache and that force_refit fits
+        them again
+        """
+        rng = np.random.RandomState(5512)
+
+        def fake_fit(fitter):
+            n_terms = len(fitter._n_grid)
+            fitter._coeffs_from_arrays({'n_grid': np.array(fitter._n_grid),
+                                        'm_grid': np.array(fitter._m_grid),
+                                        'pupil_to_focal': rng.random_sample((6, 2, n_terms)),
+                                        'focal_to_pupil': rng.random_sample((6, 2, n_terms))})
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            os.makedirs(os.path.join(data_dir, 'FocalPlaneData'))
+            centroid_name = os.path.join(data_dir, 'FocalPlaneData', 'centroid.txt')
+            with open(centroid_name, 'w') as output_file:
+                output_file.write('1 2 3\n')
+            cache_dir = os.path.join(data_dir, 'cache')
+
+            with mock.patch('lsst.sims.coordUtils.LsstZernikeFitter.getPackageDir',
+                            return_value=data_dir), \
+                 mock.patch.object(LsstZernikeFitter, '_build_transformations',
+                                   autospec=True, side_effect=fake_fit) as build:
+                fitter = LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+                self.assertIs(fitter._camera, self.camera)
+                self.assertIs(fitter._pixel_transformer._camera, self.camera)
+                self.assertEqual(build.call_count, 1)
+
+                focal_plane_dir = os.path.join(data_dir, 'FocalPlaneData')
+                cache_files = os.listdir(cache_dir)
+                self.assertEqual(len(cache_files), 1)
+                cache_file = os.path.join(cache_dir, cache_files[0])
+                with np.load(cache_file) as data:
+                    self.assertEqual(str(data['key']), fitter._cache_key())
+                    self.assertEqual(str(data['checksum']),
+                                     fitter._content_checksum(focal_plane_dir))
+
+                with mock.patch.object(LsstZernikeFitter, '_content_checksum',
+                                       side_effect=AssertionError):
+                    cached = LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+                self.assertEqual(build.call_count, 1)
+                control = fitter._coeffs_to_arrays()
+                test = cached._coeffs_to_arrays()
+                for name in control:
+                    np.testing.assert_array_equal(test[name], control[name])
+
+                LsstZernikeFitter(cache_dir=cache_dir, force_refit=True, camera=self.camera)
+                self.assertEqual(build.call_count, 2)
+
+                # touching a file makes the contents be checked again,
+                # but does not invalidate the cache
+                time.sleep(0.1)
+                os.utime(centroid_name)
+                LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+                self.assertEqual(build.call_count, 2)
+                with mock.patch.object(LsstZernikeFitter, '_content_checksum',
+                                       side_effect=AssertionError):
+                    LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+
+                # changing the contents of a file, but not its size or
+                # modification time, invalidates the cache
+                time.sleep(0.1)
+                stat = os.stat(centroid_name)
+                with open(centroid_name, 'w') as output_file:
+                    output_file.write('1 2 4\n')
+                os.utime(centroid_name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+                self.assertEqual(build.call_count, 3)
+                LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+                self.assertEqual(build.call_count, 3)
+
+                # so does changing the camera geometry
+                LsstZernikeFitter(cache_dir=cache_dir, camera=self._movedCamera())
+                self.assertEqual(build.call_count, 4)
+
+                # a damaged cache file is fit again and rewritten
+                with open(cache_file, 'wb') as output_file:
+                    output_file.write(b'not an npz file')
+                LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+                self.assertEqual(build.call_count, 5)
+                self.assertIsNotNone(_readZernikeCache(cache_file, fitter._cache_key()))
+                LsstZernikeFitter(cache_dir=cache_dir, camera=self.camera)
+                self.assertEqual(build.call_count, 5)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()